@@ -0,0 +1,78 @@
+# ============================================
+# benchmarks/bench_simulations.py - Débit scalaire vs vectorisé
+# ============================================
+"""
+Compare `calculate_simulation_results` (un scénario à la fois) et
+`calculate_simulation_results_batch` (NumPy) sur une grille aléatoire,
+et vérifie que les résultats sont identiques.
+
+Usage (depuis backend/) :
+    python -m benchmarks.bench_simulations --size 20000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from models.scenario import ScenarioParameters
+from services.batch_calculations import RESULT_FIELDS, run_batch
+from services.calculations import PERIOD_MULTIPLIERS, calculate_simulation_results
+
+GRIDS = {
+    'promotion': {'discount': (0, 50), 'marketing_budget': (0, 200000), 'traffic_increase': (0, 60)},
+    'new_store': {'monthly_revenue': (0, 400000), 'investment': (0, 1000000)},
+    'cost_optimization': {'cost_reduction': (0, 20), 'implementation_cost': (0, 100000)},
+    'price_change': {'price_change': (-30, 30)},
+}
+
+def random_inputs(simulation_type: str, size: int, rng: np.random.Generator) -> dict:
+    inputs = {
+        name: np.round(rng.uniform(low, high, size), 2).tolist()
+        for name, (low, high) in GRIDS[simulation_type].items()
+    }
+    inputs['period'] = rng.choice(list(PERIOD_MULTIPLIERS), size).tolist()
+    return inputs
+
+def bench(simulation_type: str, size: int, rng: np.random.Generator):
+    inputs = random_inputs(simulation_type, size, rng)
+    names = [n for n in inputs if n != 'period']
+
+    start = time.perf_counter()
+    scalar = [
+        calculate_simulation_results(
+            simulation_type,
+            ScenarioParameters(**{n: inputs[n][i] for n in names}),
+            inputs['period'][i],
+        )
+        for i in range(size)
+    ]
+    scalar_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = run_batch(simulation_type, inputs, '6_months', size)
+    batch_time = time.perf_counter() - start
+
+    mismatches = sum(
+        1 for i, result in enumerate(scalar)
+        for field in RESULT_FIELDS
+        if getattr(result, field) != batch[field][i]
+    )
+
+    print(
+        f"{simulation_type:<18} {size:>8} | scalaire {size / scalar_time:>12,.0f} sim/s"
+        f" | vectorisé {size / batch_time:>14,.0f} sim/s | x{scalar_time / batch_time:>6.1f}"
+        f" | écarts {mismatches}"
+    )
+    return mismatches
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark des simulations en lot")
+    parser.add_argument("--size", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    total = sum(bench(t, args.size, rng) for t in GRIDS)
+    if total:
+        raise SystemExit(f"❌ {total} résultats différents du calcul scalaire")
+    print("✅ Résultats identiques au calcul scalaire")
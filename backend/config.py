@@ -20,11 +20,115 @@ class Settings(BaseSettings):
     DB_NAME: str = "epm_retail"
     DB_PORT: int = 5433
     
+    # Pools par classe de charge : écritures (primaire) et lectures analytiques
+    # (réplicas, sinon second pool du primaire) ; délais d'acquisition en secondes
+    DB_WRITE_POOL_MIN: int = 2
+    DB_WRITE_POOL_MAX: int = 10
+    DB_WRITE_ACQUIRE_TIMEOUT: float = 5.0
+    DB_ANALYTICS_POOL_MIN: int = 2
+    DB_ANALYTICS_POOL_MAX: int = 10
+    DB_ANALYTICS_ACQUIRE_TIMEOUT: float = 30.0
+    
+    # Réplicas en lecture : "hôte[:port],hôte[:port]" (vide = primaire seul),
+    # retard maximal toléré et fréquence de mesure du retard
+    DB_REPLICA_HOSTS: str = ""
+    DB_REPLICA_MAX_LAG_SECONDS: float = 30.0
+    DB_REPLICA_CHECK_SECONDS: float = 10.0
+    
+    # Cache de statements asyncpg (requêtes hors registre) par connexion
+    DB_STATEMENT_CACHE_SIZE: int = 256
+    DB_MAX_CACHED_STATEMENT_LIFETIME: int = 3600
+    DB_MAX_CACHEABLE_STATEMENT_SIZE: int = 32 * 1024
+    
     # Serveur
     PORT: int = 3131
     
     # Webhook n8n
     N8N_WEBHOOK_URL: str = "http://localhost:5678/webhook-test/analyse-chiffres"
+    N8N_TIMEOUT: float = 10.0
+    N8N_POOL_SIZE: int = 10
+    N8N_MAX_PER_HOST: int = 4
+    N8N_KEEPALIVE_EXPIRY: float = 30.0
+    N8N_BREAKER_THRESHOLD: int = 5
+    N8N_BREAKER_COOLDOWN: float = 30.0
+    
+    # File d'analyses n8n ; flux SSE : attente maximale du résultat et
+    # intervalle des commentaires heartbeat
+    ANALYSIS_WORKERS: int = 2
+    ANALYSIS_QUEUE_SIZE: int = 100
+    ANALYSIS_TTL_SECONDS: int = 900
+    ANALYSIS_STREAM_TIMEOUT_SECONDS: float = 120.0
+    ANALYSIS_STREAM_HEARTBEAT_SECONDS: float = 15.0
+    
+    # Dashboard groupé : délai maximal par widget (secondes)
+    DASHBOARD_WIDGET_TIMEOUT: float = 5.0
+    
+    # Cache des réponses
+    CACHE_ENABLED: bool = True
+    CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    
+    # Simulations en lot : nombre maximal de jeux de paramètres
+    SIMULATION_BATCH_MAX: int = 200000
+    
+    # Monte Carlo : pool de processus et nombre maximal de tirages
+    MONTE_CARLO_WORKERS: int = 2
+    MONTE_CARLO_MAX_DRAWS: int = 500000
+    
+    # Cumuls de ventes (0 = rafraîchissement désactivé)
+    ROLLUP_REFRESH_SECONDS: int = 60
+    
+    # Import de ventes en masse : lignes par COPY, rejets détaillés renvoyés
+    BULK_CHUNK_LINES: int = 20000
+    BULK_MAX_REJECTS: int = 1000
+    
+    # Exports en flux : lignes lues par aller-retour du curseur et par paquet
+    EXPORT_BATCH_ROWS: int = 10000
+    
+    # Répartition des impacts par magasin : historique et durée de vie des poids
+    STORE_WEIGHTS_DAYS: int = 90
+    STORE_WEIGHTS_TTL_SECONDS: int = 3600
+    
+    # Profilage : jeton de l'en-tête X-Profile (vide = désactivé), une requête
+    # sur N profilée (0 = désactivé), dossier et nombre de profils gardés
+    PROFILE_TOKEN: str = ""
+    PROFILE_EVERY_N: int = 0
+    PROFILE_DIR: str = "profiles"
+    PROFILE_KEEP: int = 50
+    
+    # Requêtes lentes : seuil (0 = désactivé), taille du journal, part des
+    # requêtes lentes expliquées et délai minimal entre deux EXPLAIN d'une requête
+    SLOW_QUERY_MS: float = 200
+    SLOW_QUERY_LOG_SIZE: int = 200
+    SLOW_QUERY_EXPLAIN_SAMPLE: float = 0.1
+    SLOW_QUERY_EXPLAIN_INTERVAL: int = 300
+    
+    # Séries temporelles : nombre maximal de points par réponse
+    TIMESERIES_MAX_POINTS: int = 2000
+    
+    # Prévisions : calcul périodique (0 = désactivé), premier délai avant un
+    # nouvel essai après une erreur (doublé à chaque échec), mois
+    # d'historique, mois prévus et mois réservés au backtest
+    FORECAST_REFRESH_SECONDS: int = 86400
+    FORECAST_RETRY_SECONDS: int = 60
+    FORECAST_HISTORY_MONTHS: int = 36
+    FORECAST_HORIZON_MONTHS: int = 6
+    FORECAST_BACKTEST_MONTHS: int = 3
+    
+    # Alertes de stock en mémoire (LISTEN/NOTIFY) : regroupement des
+    # notifications, délai de reconnexion, file et heartbeat des abonnés SSE
+    STOCK_ALERTS_ENABLED: bool = True
+    STOCK_ALERTS_DEBOUNCE_MS: int = 200
+    STOCK_ALERTS_RETRY_SECONDS: float = 5.0
+    STOCK_ALERTS_QUEUE_SIZE: int = 1000
+    STOCK_ALERTS_HEARTBEAT_SECONDS: float = 15.0
+    
+    # Flux dashboard (SSE) : regroupement des changements, heartbeat, délai de
+    # reconnexion et messages en attente par connexion (au-delà : snapshot)
+    DASHBOARD_STREAM_ENABLED: bool = True
+    DASHBOARD_STREAM_DEBOUNCE_MS: int = 1000
+    DASHBOARD_STREAM_HEARTBEAT_SECONDS: float = 15.0
+    DASHBOARD_STREAM_RETRY_MS: int = 3000
+    DASHBOARD_STREAM_BUFFER_BYTES: int = 256 * 1024
     
     model_config = SettingsConfigDict(env_file=".env", case_sensitive=True)
     
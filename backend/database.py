@@ -1,41 +1,251 @@
 # ============================================
 # app/database.py - Gestion de la connexion DB
 # ============================================
+"""
+Un pool par classe de charge, pour qu'une lecture analytique lente ne puisse
+pas affamer les écritures :
+
+- WRITE (défaut) : pool du primaire, écritures transactionnelles et
+  lectures qui doivent voir les écritures récentes (scénarios)
+- ANALYTICS : lectures d'agrégats (KPIs, consolidation, exports...). Elles
+  sont réparties sur les réplicas (DB_REPLICA_HOSTS) en choisissant le moins
+  chargé parmi ceux dont le retard de réplication est sous
+  DB_REPLICA_MAX_LAG_SECONDS ; sans réplica disponible, elles passent par un
+  second pool du primaire, distinct du pool d'écriture.
+
+Chaque classe a sa taille de pool et son délai d'acquisition (Settings).
+
+Lecture de ses propres écritures : un réplica peut avoir jusqu'à
+DB_REPLICA_MAX_LAG_SECONDS de retard. Les lectures ANALYTICS faites dans un
+bloc `primary_reads()` (rechargement du cache juste après une invalidation,
+recalcul du dashboard après une notification) passent par le pool
+analytique du primaire.
+"""
+import asyncio
 import asyncpg
-from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import AsyncGenerator, Dict, List, Optional
 
+import queries
 from config import settings
+from services import slow_queries
+from services.metrics import POOL_ACQUIRE_DURATION, Gauge, pool_gauges, request_stats
 
-# Pool de connexions global
-_pool: asyncpg.Pool | None = None
+# Classes de charge
+WRITE = "write"
+ANALYTICS = "analytics"
 
-async def init_db():
-    """Initialise le pool de connexions"""
-    global _pool
-    _pool = await asyncpg.create_pool(
-        host=settings.DB_HOST,
+# Pools ouverts, par nom : "primary", "analytics", "replica:<hôte>:<port>"
+_pools: Dict[str, asyncpg.Pool] = {}
+
+@dataclass
+class Replica:
+    name: str
+    pool: asyncpg.Pool
+    lag: Optional[float] = None     # secondes, None tant que non mesuré
+    healthy: bool = False
+
+_replicas: List[Replica] = []
+_lag_task: Optional[asyncio.Task] = None
+
+# Lectures ANALYTICS forcées sur le primaire (hérité par les tâches créées dans le bloc)
+_primary_reads: ContextVar[bool] = ContextVar("primary_reads", default=False)
+
+# Taille, connexions libres et utilisées de chaque pool, lues sur /metrics
+pool_gauges(lambda: _pools)
+Gauge(
+    "epm_db_replica_lag_seconds",
+    "Retard de réplication mesuré par réplica",
+    lambda: {(r.name,): r.lag for r in _replicas if r.lag is not None},
+    ("pool",),
+)
+Gauge(
+    "epm_db_replica_healthy",
+    "Réplica utilisé pour les lectures analytiques (1) ou écarté (0)",
+    lambda: {(r.name,): int(r.healthy) for r in _replicas},
+    ("pool",),
+)
+
+# Retard de réplication : 0 si tout le WAL reçu est rejoué, sinon âge de la
+# dernière transaction rejouée ; 0 sur un serveur qui n'est pas en réplication
+REPLICA_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+class Connection(asyncpg.Connection):
+    """Connexion qui garde les requêtes du registre préparées (nom -> statement)"""
+    __slots__ = ("prepared",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = {}
+
+async def _init_connection(conn):
+    """Nouvelle connexion : registre préparé et journal des requêtes lentes"""
+    await queries.prepare(conn)
+    if settings.SLOW_QUERY_MS > 0:
+        conn.add_query_logger(slow_queries.log_query)
+
+async def _create_pool(host: str, port: int, min_size: int, max_size: int) -> asyncpg.Pool:
+    return await asyncpg.create_pool(
+        host=host,
         user=settings.DB_USER,
         password=settings.DB_PASSWORD,
         database=settings.DB_NAME,
-        port=settings.DB_PORT,
-        min_size=5,
-        max_size=20,
+        port=port,
+        min_size=min_size,
+        max_size=max_size,
+        connection_class=Connection,
+        # Nouvelle connexion : préparation de tout le registre ;
+        # à chaque acquisition : requêtes enregistrées depuis
+        init=_init_connection,
+        setup=queries.prepare,
+        statement_cache_size=settings.DB_STATEMENT_CACHE_SIZE,
+        max_cached_statement_lifetime=settings.DB_MAX_CACHED_STATEMENT_LIFETIME,
+        max_cacheable_statement_size=settings.DB_MAX_CACHEABLE_STATEMENT_SIZE,
     )
-    print("✅ Pool de connexions PostgreSQL créé")
+
+def _replica_addresses() -> List[tuple]:
+    """DB_REPLICA_HOSTS : "hôte[:port],hôte[:port]" (port par défaut DB_PORT)"""
+    addresses = []
+    for item in settings.DB_REPLICA_HOSTS.split(","):
+        item = item.strip()
+        if item:
+            host, _, port = item.partition(":")
+            addresses.append((host, int(port) if port else settings.DB_PORT))
+    return addresses
+
+async def check_replicas():
+    """Mesure le retard de chaque réplica ; injoignable ou en retard = écarté"""
+    for replica in _replicas:
+        try:
+            async with replica.pool.acquire(timeout=settings.DB_ANALYTICS_ACQUIRE_TIMEOUT) as conn:
+                replica.lag = float(await conn.fetchval(REPLICA_LAG_SQL))
+            healthy = replica.lag <= settings.DB_REPLICA_MAX_LAG_SECONDS
+        except Exception as e:
+            replica.lag = None
+            healthy = False
+            print(f"⚠️ Réplica {replica.name} injoignable: {e}")
+        if healthy != replica.healthy:
+            print(f"{'✅' if healthy else '⚠️'} Réplica {replica.name} {'utilisé' if healthy else 'écarté'} (retard: {replica.lag})")
+        replica.healthy = healthy
+
+async def _check_replicas_loop():
+    while True:
+        await asyncio.sleep(settings.DB_REPLICA_CHECK_SECONDS)
+        await check_replicas()
+
+async def init_db():
+    """Initialise les pools de connexions (primaire, analytique, réplicas)"""
+    global _lag_task
+    _pools["primary"] = await _create_pool(
+        settings.DB_HOST, settings.DB_PORT, settings.DB_WRITE_POOL_MIN, settings.DB_WRITE_POOL_MAX
+    )
+    _pools["analytics"] = await _create_pool(
+        settings.DB_HOST, settings.DB_PORT, settings.DB_ANALYTICS_POOL_MIN, settings.DB_ANALYTICS_POOL_MAX
+    )
+    for host, port in _replica_addresses():
+        name = f"replica:{host}:{port}"
+        try:
+            pool = await _create_pool(host, port, settings.DB_ANALYTICS_POOL_MIN, settings.DB_ANALYTICS_POOL_MAX)
+        except Exception as e:
+            print(f"⚠️ Réplica {name} non connecté: {e}")
+            continue
+        _pools[name] = pool
+        _replicas.append(Replica(name, pool))
+
+    if _replicas:
+        await check_replicas()
+        _lag_task = asyncio.create_task(_check_replicas_loop())
+
+    slow_queries.init(_pools["analytics"], queries.is_registered)
+    print(f"✅ Pools de connexions PostgreSQL créés ({', '.join(_pools)})")
 
 async def close_db():
-    """Ferme le pool de connexions"""
-    global _pool
-    if _pool:
-        await _pool.close()
-        print("✅ Pool de connexions fermé")
+    """Ferme les pools de connexions"""
+    global _lag_task
+    if _lag_task is not None:
+        _lag_task.cancel()
+        _lag_task = None
+    if _pools:
+        await asyncio.gather(*(pool.close() for pool in _pools.values()))
+        _pools.clear()
+        _replicas.clear()
+        print("✅ Pools de connexions fermés")
+
+def _mark_unhealthy(name: str, error: Exception):
+    for replica in _replicas:
+        if replica.name == name and replica.healthy:
+            replica.healthy = False
+            print(f"⚠️ Réplica {name} écarté: {error}")
+
+@contextmanager
+def primary_reads():
+    """Lectures ANALYTICS du bloc sur le primaire : elles voient les dernières écritures"""
+    token = _primary_reads.set(True)
+    try:
+        yield
+    finally:
+        _primary_reads.reset(token)
+
+def _route(workload: str) -> tuple:
+    """Pool (nom, pool, délai d'acquisition) d'une classe de charge"""
+    if workload == WRITE:
+        return "primary", _pools["primary"], settings.DB_WRITE_ACQUIRE_TIMEOUT
+    if workload != ANALYTICS:
+        raise ValueError(f"Classe de charge inconnue: {workload}")
+
+    healthy = [r for r in _replicas if r.healthy] if not _primary_reads.get() else []
+    if healthy:
+        # Réplica le moins chargé (connexions utilisées)
+        replica = min(healthy, key=lambda r: r.pool.get_size() - r.pool.get_idle_size())
+        return replica.name, replica.pool, settings.DB_ANALYTICS_ACQUIRE_TIMEOUT
+    return "analytics", _pools["analytics"], settings.DB_ANALYTICS_ACQUIRE_TIMEOUT
 
 @asynccontextmanager
-async def get_db() -> AsyncGenerator[asyncpg.Connection, None]:
-    """Récupère une connexion du pool"""
-    if not _pool:
+async def get_db(workload: str = WRITE) -> AsyncGenerator[asyncpg.Connection, None]:
+    """Récupère une connexion du pool de la classe de charge (WRITE ou ANALYTICS)"""
+    if not _pools:
         raise RuntimeError("Le pool de connexions n'est pas initialisé")
-    
-    async with _pool.acquire() as conn:
-        yield conn
+
+    name, pool, timeout = _route(workload)
+    stats = request_stats.get()
+    start = time.perf_counter()
+    try:
+        conn = await pool.acquire(timeout=timeout)
+    except (OSError, asyncio.TimeoutError, asyncpg.PostgresConnectionError) as e:
+        if not name.startswith("replica:"):
+            raise
+        # Réplica tombé entre deux mesures : écarté, lecture sur le primaire
+        _mark_unhealthy(name, e)
+        name, pool = "analytics", _pools["analytics"]
+        conn = await pool.acquire(timeout=timeout)
+
+    wait = time.perf_counter() - start
+    POOL_ACQUIRE_DURATION.labels(name).observe(wait)
+    try:
+        if stats is None:
+            yield conn
+            return
+
+        stats["pool_wait"] += wait
+
+        def count_query(record):
+            # Les requêtes du registre sont comptées par queries.Query
+            if not queries.is_registered(record.query):
+                stats["queries"] += 1
+
+        conn.add_query_logger(count_query)
+        try:
+            yield conn
+        finally:
+            conn.remove_query_logger(count_query)
+    finally:
+        await pool.release(conn)
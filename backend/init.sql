@@ -0,0 +1,137 @@
+-- ============================================
+-- init.sql - Schéma de la base EPM Retail
+-- ============================================
+-- Tables lues et écrites par les routers de l'API. Les tables de cumuls
+-- sont créées par `python -m services.rollups install`.
+
+CREATE TABLE IF NOT EXISTS regions (
+    id  SERIAL PRIMARY KEY,
+    nom TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS groupes (
+    id  SERIAL PRIMARY KEY,
+    nom TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS enseignes (
+    id        SERIAL PRIMARY KEY,
+    nom       TEXT NOT NULL,
+    groupe_id INTEGER REFERENCES groupes (id)
+);
+
+CREATE TABLE IF NOT EXISTS magasins (
+    id                  SERIAL PRIMARY KEY,
+    nom                 TEXT NOT NULL,
+    code_magasin        TEXT NOT NULL UNIQUE,
+    region_id           INTEGER REFERENCES regions (id),
+    enseigne_id         INTEGER REFERENCES enseignes (id),
+    objectif_ca_mensuel NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    statut              TEXT NOT NULL DEFAULT 'actif',
+    date_ouverture      DATE NOT NULL DEFAULT CURRENT_DATE
+);
+
+CREATE TABLE IF NOT EXISTS categories (
+    id  SERIAL PRIMARY KEY,
+    nom TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS produits (
+    id             SERIAL PRIMARY KEY,
+    nom            TEXT NOT NULL,
+    categorie_id   INTEGER REFERENCES categories (id),
+    prix_vente     NUMERIC(12, 2) NOT NULL,
+    prix_achat     NUMERIC(12, 2) NOT NULL,
+    stock_minimum  INTEGER NOT NULL DEFAULT 0,
+    stock_securite INTEGER NOT NULL DEFAULT 0,
+    actif          BOOLEAN NOT NULL DEFAULT TRUE
+);
+
+CREATE TABLE IF NOT EXISTS clients (
+    id               SERIAL PRIMARY KEY,
+    nom              TEXT NOT NULL,
+    date_inscription DATE NOT NULL DEFAULT CURRENT_DATE
+);
+
+CREATE TABLE IF NOT EXISTS ventes (
+    id          BIGSERIAL PRIMARY KEY,
+    magasin_id  INTEGER NOT NULL REFERENCES magasins (id),
+    client_id   INTEGER REFERENCES clients (id),
+    date_vente  TIMESTAMP NOT NULL,
+    montant_ht  NUMERIC(12, 2) NOT NULL,
+    montant_ttc NUMERIC(12, 2) NOT NULL,
+    statut      TEXT NOT NULL DEFAULT 'validee',
+    -- Clé d'idempotence des imports (POST /api/ventes/bulk)
+    reference_externe TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_ventes_date ON ventes (date_vente);
+CREATE INDEX IF NOT EXISTS idx_ventes_magasin_date ON ventes (magasin_id, date_vente);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_ventes_reference_externe ON ventes (reference_externe);
+
+CREATE TABLE IF NOT EXISTS lignes_ventes (
+    id                BIGSERIAL PRIMARY KEY,
+    vente_id          BIGINT NOT NULL REFERENCES ventes (id),
+    produit_id        INTEGER NOT NULL REFERENCES produits (id),
+    quantite          INTEGER NOT NULL,
+    prix_unitaire_ht  NUMERIC(12, 2) NOT NULL,
+    montant_total_ht  NUMERIC(12, 2) NOT NULL,
+    montant_total_ttc NUMERIC(12, 2) NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_lignes_ventes_vente ON lignes_ventes (vente_id);
+CREATE INDEX IF NOT EXISTS idx_lignes_ventes_produit ON lignes_ventes (produit_id);
+
+CREATE TABLE IF NOT EXISTS stock (
+    magasin_id        INTEGER NOT NULL REFERENCES magasins (id),
+    produit_id        INTEGER NOT NULL REFERENCES produits (id),
+    quantite          INTEGER NOT NULL DEFAULT 0,
+    quantite_reservee INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (magasin_id, produit_id)
+);
+
+CREATE TABLE IF NOT EXISTS budgets (
+    id              SERIAL PRIMARY KEY,
+    annee           INTEGER NOT NULL,
+    mois            INTEGER NOT NULL,
+    categorie       TEXT NOT NULL,
+    montant_prevu   NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    montant_realise NUMERIC(14, 2) NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_budgets_annee ON budgets (annee);
+
+CREATE TABLE IF NOT EXISTS scenarios (
+    id             TEXT PRIMARY KEY,
+    name           TEXT NOT NULL,
+    description    TEXT,
+    scenario_type  TEXT NOT NULL,
+    parameters     JSONB NOT NULL DEFAULT '{}',
+    revenue_impact NUMERIC(16, 2) NOT NULL DEFAULT 0,
+    cost_impact    NUMERIC(16, 2) NOT NULL DEFAULT 0,
+    margin_impact  NUMERIC(16, 2) NOT NULL DEFAULT 0,
+    probability    NUMERIC(5, 2) NOT NULL DEFAULT 0,
+    status         TEXT NOT NULL DEFAULT 'draft',
+    created_by     TEXT NOT NULL DEFAULT 'system',
+    created_at     BIGINT NOT NULL,
+    updated_at     BIGINT NOT NULL,
+    base_period    TIMESTAMP,
+    deleted        BOOLEAN NOT NULL DEFAULT FALSE,
+    -- Résultats calculés, enregistrés avec le scénario
+    results        JSONB,
+    evolution_data JSONB,
+    store_impact   JSONB,
+    monte_carlo    JSONB,
+    model_version  INTEGER,
+    version        INTEGER NOT NULL DEFAULT 1
+);
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS idx_scenarios_liste
+    ON scenarios (created_at DESC, id DESC) WHERE deleted = FALSE;
+CREATE INDEX IF NOT EXISTS idx_scenarios_status
+    ON scenarios (status, created_at DESC, id DESC) WHERE deleted = FALSE;
+CREATE INDEX IF NOT EXISTS idx_scenarios_scenario_type
+    ON scenarios (scenario_type, created_at DESC, id DESC) WHERE deleted = FALSE;
+CREATE INDEX IF NOT EXISTS idx_scenarios_simulation_type
+    ON scenarios ((parameters->>'simulation_type'), created_at DESC, id DESC) WHERE deleted = FALSE;
+CREATE INDEX IF NOT EXISTS idx_scenarios_created_by
+    ON scenarios (created_by, created_at DESC, id DESC) WHERE deleted = FALSE;
+CREATE INDEX IF NOT EXISTS idx_scenarios_name_trgm
+    ON scenarios USING gin (name gin_trgm_ops) WHERE deleted = FALSE;
@@ -7,16 +7,26 @@ from contextlib import asynccontextmanager
 
 from config import settings
 from database import init_db, close_db
-from routers import kpis, stores, products, clients, scenarios, simulations
+from routers import kpis, stores, products, clients, scenarios, simulations, dashboard, analyses, sales, exports, monitoring, timeseries, previsions
+from services import rollups, forecasts, stock_alerts, dashboard_stream, analysis_queue, n8n_webhook, monte_carlo, metrics, profiling
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Gestion du cycle de vie de l'application"""
     # Startup
     await init_db()
+    rollups.start_refresher()
+    await forecasts.ensure_schema()
+    forecasts.start_scheduler()
+    stock_alerts.start_listener()
+    dashboard_stream.start()
+    n8n_webhook.init_client()
+    analysis_queue.start_workers()
     print(f"🚀 Serveur EPM Retail démarré sur le port {settings.PORT}")
     print(f"📊 Endpoints disponibles:")
     print(f"   - GET  /api/health")
+    print(f"   - GET  /api/dashboard")
+    print(f"   - GET  /api/stream/dashboard")
     print(f"   - GET  /api/kpis")
     print(f"   - GET  /api/store-performance")
     print(f"   - GET  /api/monthly-trend")
@@ -24,13 +34,32 @@ async def lifespan(app: FastAPI):
     print(f"   - GET  /api/budget-data")
     print(f"   - GET  /api/produits/top")
     print(f"   - GET  /api/stock/alertes")
+    print(f"   - GET  /api/stock/alertes/stream")
     print(f"   - GET  /api/clients/actifs")
     print(f"   - GET  /api/consolidation-data")
+    print(f"   - GET  /api/consolidation/hierarchie")
+    print(f"   - GET  /api/series")
+    print(f"   - GET  /api/previsions")
+    print(f"   - GET  /api/previsions/backtest")
+    print(f"   - GET  /api/analyses/{{analysis_id}}")
     print(f"   - POST /api/scenarios")
+    print(f"   - GET  /api/exports/consolidation")
+    print(f"   - GET  /api/exports/ventes")
+    print(f"   - POST /api/ventes/bulk")
+    print(f"   - GET  /api/monitoring/queries")
+    print(f"   - GET  /api/monitoring/slow-queries")
+    print(f"   - GET  /metrics")
     print(f"   - POST /api/simulations")    
     yield
     
     # Shutdown
+    await analysis_queue.stop_workers()
+    await n8n_webhook.close_client()
+    monte_carlo.shutdown_executor()
+    await dashboard_stream.stop()
+    await stock_alerts.stop_listener()
+    await forecasts.stop_scheduler()
+    await rollups.stop_refresher()
     await close_db()
     print("👋 Serveur arrêté")
 
@@ -50,6 +79,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Durée des requêtes par route et temps de sérialisation des réponses (/metrics)
+app.add_middleware(metrics.MetricsMiddleware)
+# Profilage à la demande (en-tête X-Profile) ou d'une requête sur PROFILE_EVERY_N
+app.add_middleware(profiling.ProfilerMiddleware)
+metrics.instrument_serialization()
+
 # Inclusion des routers
 app.include_router(kpis.router, prefix="/api", tags=["KPIs"])
 app.include_router(stores.router, prefix="/api", tags=["Magasins"])
@@ -57,6 +92,14 @@ app.include_router(products.router, prefix="/api", tags=["Produits"])
 app.include_router(clients.router, prefix="/api", tags=["Clients"])
 app.include_router(scenarios.router, prefix="/api", tags=["Scénarios"])
 app.include_router(simulations.router, prefix="/api", tags=["Simulations"])
+app.include_router(dashboard.router, prefix="/api", tags=["Dashboard"])
+app.include_router(analyses.router, prefix="/api", tags=["Analyses"])
+app.include_router(sales.router, prefix="/api", tags=["Ventes"])
+app.include_router(exports.router, prefix="/api", tags=["Exports"])
+app.include_router(timeseries.router, prefix="/api", tags=["Séries"])
+app.include_router(previsions.router, prefix="/api", tags=["Prévisions"])
+app.include_router(monitoring.router, prefix="/api", tags=["Monitoring"])
+app.include_router(monitoring.metrics_router, tags=["Monitoring"])
 
 # @app.get("/api/health")
 # async def health_check():
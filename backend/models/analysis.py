@@ -0,0 +1,10 @@
+# ============================================
+# app/models/analysis.py - Modèles Analyses n8n
+# ============================================
+from pydantic import BaseModel
+
+class AnalysisStatus(BaseModel):
+    """État d'une analyse n8n"""
+    id: str
+    status: str  # 'pending', 'done', 'error', 'rejected'
+    result: dict | None = None
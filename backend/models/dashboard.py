@@ -0,0 +1,16 @@
+# ============================================
+# app/models/dashboard.py - Modèles Dashboard groupé
+# ============================================
+from typing import Any, Dict, Optional
+from pydantic import BaseModel
+
+class WidgetResult(BaseModel):
+    """Résultat d'un widget du dashboard"""
+    status: str  # 'ok', 'error', 'timeout'
+    data: Any = None
+    error: Optional[str] = None
+    duration_ms: float
+
+class DashboardResponse(BaseModel):
+    """Réponse de l'endpoint dashboard"""
+    widgets: Dict[str, WidgetResult]
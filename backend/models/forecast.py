@@ -0,0 +1,43 @@
+# ============================================
+# app/models/forecast.py - Modèles Prévisions
+# ============================================
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+class ForecastPoint(BaseModel):
+    """Prévision de CA HT d'un mois"""
+    mois: date
+    prevision: float
+    horizon: int = Field(..., description="0 = prévision à un pas d'un mois passé, n = mois à venir")
+
+class ForecastResponse(BaseModel):
+    """Réponse de l'endpoint prévisions"""
+    calcule_le: Optional[datetime] = None
+    points: List[ForecastPoint]
+
+class BacktestSummary(BaseModel):
+    """MAPE d'un modèle sur l'ensemble des séries"""
+    series: int
+    mape_moyen: Optional[float] = None
+    mape_median: Optional[float] = None
+
+class BacktestSeries(BaseModel):
+    """Backtest d'une série magasin × catégorie"""
+    magasin_id: int
+    magasin: Optional[str] = None
+    categorie_id: int
+    categorie: Optional[str] = None
+    mape_holt_winters: Optional[float] = None
+    mape_saisonnier: Optional[float] = None
+    modele: str
+    mape: Optional[float] = None
+
+class BacktestReport(BaseModel):
+    """Rapport de backtest des prévisions"""
+    calcule_le: Optional[datetime] = None
+    mois_test: Optional[int] = None
+    resume: Dict[str, BacktestSummary]
+    modeles_retenus: Dict[str, int]
+    series: List[BacktestSeries]
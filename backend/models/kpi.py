@@ -31,6 +31,8 @@ class StorePerformanceResponse(BaseModel):
     """Réponse de l'endpoint store-performance"""
     data: list[StorePerformance]
     analysis: dict | None = None
+    analysis_id: str | None = None
+    analysis_status: str | None = None
 
 class MonthlyTrend(BaseModel):
     """Tendance mensuelle"""
@@ -43,6 +45,8 @@ class MonthlyTrendResponse(BaseModel):
     """Réponse de l'endpoint monthly-trend"""
     data: list[MonthlyTrend]
     analysis: dict | None = None
+    analysis_id: str | None = None
+    analysis_status: str | None = None
 
 class CategoryData(BaseModel):
     """Données par catégorie"""
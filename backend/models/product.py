@@ -12,6 +12,8 @@ class TopProduct(BaseModel):
 
 class StockAlert(BaseModel):
     """Alerte de stock"""
+    magasin_id: int | None = None
+    produit_id: int | None = None
     magasin: str
     produit: str
     quantite: int
@@ -0,0 +1,49 @@
+# ============================================
+# app/models/sale.py - Modèles Import de ventes
+# ============================================
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+class LigneVenteImport(BaseModel):
+    """Ligne d'une vente importée (montants calculés si absents)"""
+    produit_id: int
+    quantite: int = Field(gt=0)
+    prix_unitaire_ht: float = Field(ge=0)
+    montant_total_ht: Optional[float] = None
+    montant_total_ttc: Optional[float] = None
+
+class VenteImport(BaseModel):
+    """Vente importée en NDJSON, avec ses lignes"""
+    reference: str = Field(min_length=1, max_length=100, description="Clé d'idempotence (ticket de caisse, n° de commande)")
+    magasin_id: int
+    client_id: Optional[int] = None
+    date_vente: datetime
+    statut: str = 'validee'
+    lignes: List[LigneVenteImport] = Field(min_length=1)
+
+class LigneVenteCsv(LigneVenteImport):
+    """Ligne CSV : une ligne de vente avec les colonnes de sa vente"""
+    reference: str = Field(min_length=1, max_length=100)
+    magasin_id: int
+    client_id: Optional[int] = None
+    date_vente: datetime
+    statut: str = 'validee'
+
+class ImportReject(BaseModel):
+    """Enregistrement rejeté"""
+    ligne: int
+    reference: Optional[str] = None
+    erreur: str
+
+class BulkImportResult(BaseModel):
+    """Bilan d'un import de ventes"""
+    ventes_recues: int
+    ventes_inserees: int
+    ventes_dupliquees: int
+    lignes_inserees: int
+    rejets_total: int
+    rejets: List[ImportReject]
+    duree_ms: float
+    lignes_par_seconde: float
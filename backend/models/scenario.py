@@ -3,7 +3,7 @@
 # ============================================
 from typing import List, Optional
 from pydantic import BaseModel, Field
-from models.simulation import SimulationRequest, SimulationResult, EvolutionItem, StoreImpact
+from models.simulation import SimulationRequest, SimulationResult, EvolutionItem, StoreImpact, MonteCarloConfig, MonteCarloResult
 
 # ============================================
 # Models
@@ -33,6 +33,7 @@ class ScenarioCreate(BaseModel):
     period: str  # 1_month, 3_months, 6_months, 12_months
     parameters: ScenarioParameters
     created_by: Optional[str] = "system"
+    monte_carlo: Optional[MonteCarloConfig] = None  # probabilité et bandes issues des tirages
 
 class ScenarioUpdate(BaseModel):
     name: Optional[str] = None
@@ -56,8 +57,31 @@ class ScenarioResponse(BaseModel):
     created_at: int
     created_by: str
 
+class ScenarioListItem(BaseModel):
+    """Ligne de la liste des scénarios (sans les paramètres)"""
+    id: str
+    name: str
+    description: Optional[str]
+    scenario_type: str
+    simulation_type: str
+    period: str
+    revenue_impact: float
+    cost_impact: float
+    margin_impact: float
+    probability: float
+    status: str
+    created_at: int
+    created_by: str
+
+class ScenarioPage(BaseModel):
+    """Page de scénarios ; next_cursor est None sur la dernière page"""
+    items: List[ScenarioListItem]
+    next_cursor: Optional[str] = None
+
 class ScenarioDetail(ScenarioResponse):
+    version: int = 1  # incrémentée à chaque modification (ETag)
     results: Optional[SimulationResult] = None
+    monte_carlo: Optional[MonteCarloResult] = None
 
     # Remplacer Optional[List[...]] = None par Field(default_factory=list)
     evolution_data: List[EvolutionItem] = Field(default_factory=list)
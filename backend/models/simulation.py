@@ -1,8 +1,44 @@
 # =============================================
 # app/models/simulation.py - Modèles Simulation
 # =============================================
-from typing import List, Optional
-from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+from pydantic import AliasChoices, BaseModel, Field
+
+class Distribution(BaseModel):
+    """Loi de tirage d'une entrée incertaine (Monte Carlo)"""
+    kind: str = Field("normal", description="Loi: normal, uniform, triangular, lognormal")
+    mean: Optional[float] = Field(None, description="Moyenne (normal, lognormal), par défaut la valeur du paramètre")
+    std: Optional[float] = Field(None, description="Écart-type (normal, lognormal)")
+    low: Optional[float] = Field(None, description="Borne basse (uniform, triangular)")
+    high: Optional[float] = Field(None, description="Borne haute (uniform, triangular)")
+    mode: Optional[float] = Field(None, description="Mode (triangular), par défaut la valeur du paramètre")
+
+class MonteCarloConfig(BaseModel):
+    """Paramètres du mode Monte Carlo"""
+    draws: int = Field(20000, ge=100, description="Nombre de tirages")
+    seed: Optional[int] = Field(None, description="Graine pour des résultats reproductibles")
+    distributions: Dict[str, Distribution] = Field(
+        default_factory=dict,
+        description="Lois par entrée (traffic_increase, elasticity, monthly_revenue...)"
+    )
+
+class PercentileBands(BaseModel):
+    p10: float
+    p50: float
+    p90: float
+
+class MonteCarloResult(BaseModel):
+    draws: int
+    probability_positive_net_gain: float = Field(
+        ...,
+        # Ancien nom, encore présent dans les scénarios enregistrés
+        validation_alias=AliasChoices("probability_positive_net_gain", "probability_positive_roi"),
+        description="Part des tirages où le gain net est positif"
+    )
+    revenue_impact: PercentileBands
+    margin_impact: PercentileBands
+    cost_impact: PercentileBands
+    roi: PercentileBands
 
 class SimulationRequest(BaseModel):
     """Paramètres de simulation what-if"""
@@ -12,6 +48,7 @@ class SimulationRequest(BaseModel):
     period: str = Field("6_months", description="Période de simulation")
     simulation_type: str = Field("promotion", description="Type de simulation: price_change, promotion, new_store, cost_optimization")
     parameters: Optional[dict] = Field(default_factory=dict, description="Paramètres additionnels pour la simulation")  
+    monte_carlo: Optional[MonteCarloConfig] = Field(None, description="Active le mode Monte Carlo")
     # Pour des simulations plus avancées, on pourrait ajouter d'autres paramètres ici       
     # created_by: str = Field("user", description="Identifiant de l'utilisateur ayant créé la simulation")
     # name:"Optimisation coûts opérationnels"
@@ -37,6 +74,8 @@ class SimulationResult(BaseModel):
 
 class StoreImpact(BaseModel):
     id: str
+    store: Optional[str] = None
+    region: Optional[str] = None
     impact: float
     # Utilisez Field(default=...) pour que ces champs soient vraiment optionnels lors de la création à partir d'un dict.
     ca_prevu: float = Field(default=0.0) 
@@ -63,9 +102,24 @@ class EvolutionItem(BaseModel):
 
 class SimulationResponse(BaseModel):
     results: Optional[SimulationResult] = None
+    monte_carlo: Optional[MonteCarloResult] = None
 
     # Remplacer Optional[List[...]] = None par Field(default_factory=list)
     evolution_data: List[EvolutionItem] = Field(default_factory=list)
     
     # Remplacer Optional[List[...]] = None par Field(default_factory=list)
-    store_impact: List[StoreImpact] = Field(default_factory=list)
\ No newline at end of file
+    store_impact: List[StoreImpact] = Field(default_factory=list)
+
+class BatchSimulationRequest(BaseModel):
+    """Simulations en lot : grille de paramètres ou liste de jeux de paramètres"""
+    simulation_type: str = Field("promotion", description="Type de simulation: price_change, promotion, new_store, cost_optimization")
+    period: str = Field("6_months", description="Période par défaut des jeux de paramètres")
+    grid: Optional[Dict[str, List[Any]]] = Field(None, description="Valeurs par paramètre, combinées en produit cartésien (\"period\" accepté)")
+    parameter_sets: Optional[List[Dict[str, Any]]] = Field(None, description="Jeux de paramètres explicites")
+
+class BatchSimulationResponse(BaseModel):
+    """Résultats en colonnes : une valeur par jeu de paramètres"""
+    simulation_type: str
+    count: int
+    parameters: Dict[str, List[Any]]
+    results: Dict[str, List[float]]
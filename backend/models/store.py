@@ -1,6 +1,9 @@
 # ============================================
 # app/models/store.py - Modèles Magasins
 # ============================================
+from datetime import date
+from typing import List, Optional
+
 from pydantic import BaseModel
 
 class ConsolidationData(BaseModel):
@@ -15,4 +18,24 @@ class ConsolidationData(BaseModel):
     marge: str
     stock: int
     transactions: int
-    clients: int
\ No newline at end of file
+    clients: int
+
+class ConsolidationNode(BaseModel):
+    """Nœud de la hiérarchie groupe → enseigne → région → magasin"""
+    id: str                 # chemin du nœud : "", "g1", "g1/e2", "g1/e2/r3", "g1/e2/r3/m45"
+    niveau: str             # 'total', 'groupe', 'enseigne', 'region', 'magasin'
+    nom: str
+    ca: int                 # milliers d'euros
+    objectif: int           # milliers d'euros
+    ecart: str
+    marge: str
+    transactions: int
+    magasins: int
+    a_enfants: bool
+    enfants: Optional[List["ConsolidationNode"]] = None    # None = non chargés
+
+class ConsolidationHierarchy(BaseModel):
+    """Réponse de l'endpoint consolidation hiérarchique"""
+    date_debut: date
+    date_fin: date
+    noeud: ConsolidationNode
@@ -0,0 +1,25 @@
+# ============================================
+# app/models/timeseries.py - Modèles Séries temporelles
+# ============================================
+from datetime import date
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+class SeriesPoint(BaseModel):
+    """Une période de la série"""
+    periode: str = Field(..., description="2024-03-15, 2024-W11, 2024-03, 2024-T1 ou 2024")
+    debut: date
+    fin: date
+    ca: float = Field(..., description="Chiffre d'affaires HT en euros")
+    marge: float = Field(..., description="Marge brute en euros")
+    taux_marge: Optional[float] = Field(None, description="Marge en pourcentage du CA")
+    transactions: int
+    objectif: Optional[float] = Field(None, description="Objectif de CA en euros (absent par catégorie)")
+
+class SeriesResponse(BaseModel):
+    """Réponse de l'endpoint séries temporelles"""
+    granularite: str
+    date_debut: date
+    date_fin: date
+    points: List[SeriesPoint]
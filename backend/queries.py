@@ -0,0 +1,140 @@
+# ============================================
+# app/queries.py - Registre des requêtes SQL
+# ============================================
+"""
+Chaque requête statique est enregistrée une fois sous un nom :
+
+    STORE_PERFORMANCE = register("kpis.store_performance", \"\"\"SELECT ...\"\"\")
+    rows = await STORE_PERFORMANCE.fetch(conn)
+
+Les requêtes du registre sont préparées sur chaque connexion du pool (hooks
+`init` et `setup` de `database.init_db`) et exécutées via leur statement
+préparé ; leur durée alimente l'histogramme epm_db_query_duration_seconds
+(libellé : nom de la requête) exposé sur /metrics.
+
+Les valeurs variables (intervalles compris) passent toujours en paramètres :
+le texte d'une requête ne change jamais.
+"""
+import time
+from typing import Any, Dict, List, Optional, Set
+
+import asyncpg
+
+from services import slow_queries
+from services.metrics import QUERY_DURATION, QUERY_ERRORS, request_stats
+
+class Query:
+    """Requête nommée avec ses statistiques d'exécution"""
+
+    __slots__ = ("name", "sql", "duration", "errors")
+
+    def __init__(self, name: str, sql: str):
+        self.name = name
+        self.sql = sql
+        self.duration = QUERY_DURATION.labels(name)
+        self.errors = QUERY_ERRORS.labels(name)
+
+    def _observe(self, args: tuple, start: float, error: Optional[BaseException]):
+        elapsed = time.perf_counter() - start
+        self.duration.observe(elapsed)
+        if error is not None:
+            self.errors.inc()
+        stats = request_stats.get()
+        if stats is not None:
+            stats["queries"] += 1
+        slow_queries.record(self.name, self.sql, args, elapsed, error)
+
+    async def _run(self, conn, method: str, args: tuple):
+        prepared = getattr(conn, "prepared", None)
+        statement = prepared.get(self.name) if prepared else None
+
+        start = time.perf_counter()
+        error = None
+        try:
+            if statement is None:
+                return await getattr(conn, method)(self.sql, *args)
+            try:
+                return await getattr(statement, method)(*args)
+            except (asyncpg.InvalidCachedStatementError, asyncpg.FeatureNotSupportedError):
+                # Schéma modifié depuis la préparation : on repasse par le cache d'asyncpg
+                prepared[self.name] = None
+                return await getattr(conn, method)(self.sql, *args)
+        except BaseException as e:
+            # Annulation comprise (timeout d'un widget) : pas un succès lent
+            error = e
+            raise
+        finally:
+            self._observe(args, start, error)
+
+    async def fetch(self, conn, *args) -> List[asyncpg.Record]:
+        return await self._run(conn, "fetch", args)
+
+    async def fetchrow(self, conn, *args):
+        return await self._run(conn, "fetchrow", args)
+
+    async def fetchval(self, conn, *args):
+        return await self._run(conn, "fetchval", args)
+
+    async def execute(self, conn, *args) -> str:
+        # Les statements préparés n'ont pas d'execute : cache de la connexion
+        start = time.perf_counter()
+        error = None
+        try:
+            return await conn.execute(self.sql, *args)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._observe(args, start, error)
+
+REGISTRY: Dict[str, Query] = {}
+_texts: Set[str] = set()
+
+def register(name: str, sql: str) -> Query:
+    """Enregistre une requête ; un nom ne peut désigner qu'un seul texte"""
+    existing = REGISTRY.get(name)
+    if existing is not None:
+        if existing.sql != sql:
+            raise ValueError(f"Requête déjà enregistrée avec un autre texte: {name}")
+        return existing
+    query = REGISTRY[name] = Query(name, sql)
+    _texts.add(sql)
+    return query
+
+def is_registered(sql: str) -> bool:
+    return sql in _texts
+
+async def prepare(conn):
+    """
+    Prépare sur la connexion les requêtes du registre qui ne le sont pas
+    encore. Une requête qui échoue (table absente, cumuls non installés...)
+    est marquée et exécutée sans préparation explicite sur cette connexion.
+    """
+    prepared = getattr(conn, "prepared", None)
+    if prepared is None or len(prepared) == len(REGISTRY):
+        return
+    for name, query in list(REGISTRY.items()):
+        if name in prepared:
+            continue
+        try:
+            prepared[name] = await conn.prepare(query.sql)
+        except asyncpg.PostgresError as e:
+            prepared[name] = None
+            print(f"⚠️ Requête {name} non préparée: {e}")
+
+def statistics() -> List[Dict[str, Any]]:
+    """Exécutions et temps cumulé par requête, les plus coûteuses d'abord"""
+    return sorted(
+        (
+            {
+                "name": q.name,
+                "calls": q.duration.count,
+                "errors": q.errors.value,
+                "total_ms": round(q.duration.sum * 1000, 3),
+                "mean_ms": round(q.duration.sum * 1000 / q.duration.count, 3) if q.duration.count else 0.0,
+            }
+            for q in REGISTRY.values()
+        ),
+        key=lambda s: s["total_ms"],
+        reverse=True,
+    )
@@ -0,0 +1,56 @@
+# ============================================
+# app/routers/analyses.py - Endpoints Analyses n8n
+# ============================================
+import asyncio
+import json
+import time
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from config import settings
+from models.analysis import AnalysisStatus
+from services import analysis_queue
+
+router = APIRouter()
+
+def _to_status(entry) -> AnalysisStatus:
+    return AnalysisStatus(id=entry.id, status=entry.status, result=entry.result)
+
+@router.get("/analyses/{analysis_id}", response_model=AnalysisStatus)
+async def get_analysis(
+    analysis_id: str,
+    wait: float = Query(0, ge=0, le=30, description="Attente maximale du résultat (long polling), en secondes")
+):
+    """État et résultat d'une analyse"""
+    entry = await analysis_queue.wait(analysis_id, wait) if wait else analysis_queue.get(analysis_id)
+    if not entry:
+        raise HTTPException(status_code=404, detail="Analyse non trouvée ou expirée")
+    return _to_status(entry)
+
+@router.get("/analyses/{analysis_id}/stream")
+async def stream_analysis(analysis_id: str):
+    """Pousse le résultat de l'analyse en Server-Sent Events dès qu'il est disponible"""
+    entry = analysis_queue.get(analysis_id)
+    if not entry:
+        raise HTTPException(status_code=404, detail="Analyse non trouvée ou expirée")
+
+    async def events():
+        yield f"event: status\ndata: {json.dumps({'status': entry.status})}\n\n"
+        # Workers arrêtés ou bloqués : erreur au bout du délai plutôt qu'une connexion pendue
+        deadline = time.monotonic() + settings.ANALYSIS_STREAM_TIMEOUT_SECONDS
+        while not entry.done.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                error = {"id": entry.id, "status": analysis_queue.ERROR, "result": {"error": "Délai d'attente dépassé"}}
+                yield f"event: error\ndata: {json.dumps(error)}\n\n"
+                return
+            try:
+                await asyncio.wait_for(
+                    entry.done.wait(), min(remaining, settings.ANALYSIS_STREAM_HEARTBEAT_SECONDS)
+                )
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+        yield f"event: result\ndata: {_to_status(entry).model_dump_json()}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
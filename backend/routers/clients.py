@@ -3,26 +3,31 @@
 # ============================================
 from fastapi import APIRouter, HTTPException
 
-from database import get_db
+from database import ANALYTICS, get_db
+from queries import register
 from models.client import ClientStats
+from services.cache import cached
 
 router = APIRouter()
 
+ACTIVE_CLIENTS = register("clients.actifs", """
+    SELECT 
+        COUNT(DISTINCT c.id) as clients_actifs,
+        ROUND(AVG(v.montant_ttc), 2) as panier_moyen,
+        ROUND(SUM(v.montant_ttc) / NULLIF(COUNT(DISTINCT c.id), 0), 2) as ca_par_client
+    FROM clients c
+    JOIN ventes v ON c.id = v.client_id
+    WHERE v.statut = 'validee'
+        AND v.date_vente >= CURRENT_DATE - INTERVAL '30 days'
+""")
+
 @router.get("/clients/actifs", response_model=ClientStats)
+@cached("clients-actifs", ttl=300, swr=600, tags=("ventes",))
 async def get_active_clients():
     """Statistiques des clients actifs (30 derniers jours)"""
     try:
-        async with get_db() as conn:
-            row = await conn.fetchrow("""
-                SELECT 
-                    COUNT(DISTINCT c.id) as clients_actifs,
-                    ROUND(AVG(v.montant_ttc), 2) as panier_moyen,
-                    ROUND(SUM(v.montant_ttc) / NULLIF(COUNT(DISTINCT c.id), 0), 2) as ca_par_client
-                FROM clients c
-                JOIN ventes v ON c.id = v.client_id
-                WHERE v.statut = 'validee'
-                    AND v.date_vente >= CURRENT_DATE - INTERVAL '30 days'
-            """)
+        async with get_db(ANALYTICS) as conn:
+            row = await ACTIVE_CLIENTS.fetchrow(conn)
             
             return ClientStats(
                 clients_actifs=int(row['clients_actifs'] or 0),
@@ -0,0 +1,112 @@
+# ============================================
+# app/routers/dashboard.py - Endpoint Dashboard groupé
+# ============================================
+import asyncio
+import time
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from config import settings
+from models.dashboard import DashboardResponse, WidgetResult
+from routers import clients, kpis, products
+from services.dashboard_stream import hub
+
+router = APIRouter()
+
+# Widgets disponibles : nom -> fonction d'endpoint existante.
+# Chaque fonction acquiert sa propre connexion du pool.
+WIDGETS = {
+    "kpis": kpis.get_kpis,
+    "store-performance": kpis.get_store_performance,
+    "monthly-trend": kpis.get_monthly_trend,
+    "category-data": kpis.get_category_data,
+    "budget-data": kpis.get_budget_data,
+    "regional-performance": kpis.get_regional_performance,
+    "top-stores": kpis.get_top_stores,
+    "produits-top": products.get_top_products,
+    "stock-alertes": products.get_stock_alerts,
+    "clients-actifs": clients.get_active_clients,
+}
+
+async def _run_widget(name: str) -> WidgetResult:
+    """Exécute un widget en isolant ses erreurs et son délai"""
+    start = time.perf_counter()
+    try:
+        data = await asyncio.wait_for(WIDGETS[name](), timeout=settings.DASHBOARD_WIDGET_TIMEOUT)
+        status, error = "ok", None
+    except asyncio.TimeoutError:
+        data, status, error = None, "timeout", f"Délai de {settings.DASHBOARD_WIDGET_TIMEOUT}s dépassé"
+    except HTTPException as e:
+        data, status, error = None, "error", str(e.detail)
+    except Exception as e:
+        data, status, error = None, "error", str(e)
+
+    return WidgetResult(
+        status=status,
+        data=data,
+        error=error,
+        duration_ms=round((time.perf_counter() - start) * 1000, 1)
+    )
+
+# Flux temps réel : les widgets sans cache déclarent ici leurs tags
+hub.configure(WIDGETS, _run_widget, tags={"stock-alertes": ("stock",)})
+
+def _widget_names(widgets: Optional[List[str]]) -> List[str]:
+    names = [n.strip() for w in widgets for n in w.split(",") if n.strip()] if widgets else list(WIDGETS)
+    names = list(dict.fromkeys(names))
+
+    unknown = [n for n in names if n not in WIDGETS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Widgets inconnus: {', '.join(unknown)}. Disponibles: {', '.join(WIDGETS)}"
+        )
+    return names
+
+@router.get("/dashboard", response_model=DashboardResponse)
+async def get_dashboard(
+    widgets: Optional[List[str]] = Query(
+        None,
+        description="Widgets à charger (répétable ou séparés par des virgules), tous par défaut"
+    )
+):
+    """Charge plusieurs widgets du dashboard en parallèle en un seul appel"""
+    names = _widget_names(widgets)
+    results = await asyncio.gather(*(_run_widget(n) for n in names))
+    return DashboardResponse(widgets=dict(zip(names, results)))
+
+@router.get("/stream/dashboard")
+async def stream_dashboard(
+    widgets: Optional[List[str]] = Query(
+        None,
+        description="Widgets suivis (répétable ou séparés par des virgules), tous par défaut"
+    )
+):
+    """
+    Dashboard en Server-Sent Events : `snapshot` (état de chaque widget et
+    sa version), puis `patch` (opérations JSON Patch sur le résultat du
+    widget, version + 1) ou `widget` (résultat complet) à chaque changement
+    détecté côté serveur ; commentaire `heartbeat` en l'absence de changement
+    """
+    if not settings.DASHBOARD_STREAM_ENABLED:
+        raise HTTPException(status_code=503, detail="Flux dashboard désactivé")
+    names = _widget_names(widgets)
+
+    async def events():
+        # Abonnement au premier message : un client parti avant ne laisse pas d'abonné
+        subscriber = None
+        try:
+            subscriber = await hub.subscribe(names)
+            async for message in hub.stream(subscriber):
+                yield message
+        finally:
+            if subscriber is not None:
+                hub.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,66 @@
+# ============================================
+# app/routers/exports.py - Endpoints Exports
+# ============================================
+from datetime import date, timedelta
+from typing import Optional, Tuple
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+
+from services.consolidation import CONSOLIDATION_SQL, prorata_objectif
+from services.exports import MEDIA_TYPES, parquet_available, sales_export_sql, stream_query
+
+router = APIRouter()
+
+def _check_request(format: str, date_debut: Optional[date], date_fin: Optional[date]) -> Tuple[date, date]:
+    """Valide le format et la période (30 derniers jours par défaut)"""
+    if format not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Format inconnu: {format} (csv, ndjson, parquet)")
+    if format == 'parquet' and not parquet_available():
+        raise HTTPException(status_code=501, detail="Export Parquet indisponible: pyarrow n'est pas installé")
+
+    date_fin = date_fin or date.today()
+    date_debut = date_debut or date_fin - timedelta(days=30)
+    if date_debut > date_fin:
+        raise HTTPException(status_code=400, detail="date_debut doit précéder date_fin")
+    return date_debut, date_fin
+
+def _streaming_response(query: str, args: tuple, format: str, filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        stream_query(query, args, format),
+        media_type=MEDIA_TYPES[format],
+        headers={'Content-Disposition': f'attachment; filename="{filename}.{format}"'},
+    )
+
+@router.get("/exports/consolidation")
+async def export_consolidation(
+    format: str = 'csv',
+    date_debut: Optional[date] = None,
+    date_fin: Optional[date] = None,
+    region_id: Optional[int] = None
+):
+    """Export de la vue consolidée des magasins (CSV, NDJSON ou Parquet)"""
+    date_debut, date_fin = _check_request(format, date_debut, date_fin)
+    # Texte SQL : le curseur serveur prépare sa propre requête
+    return _streaming_response(
+        CONSOLIDATION_SQL.sql,
+        (date_debut, date_fin, region_id, prorata_objectif(date_debut, date_fin)),
+        format,
+        f"consolidation_{date_debut}_{date_fin}",
+    )
+
+@router.get("/exports/ventes")
+async def export_sales(
+    format: str = 'csv',
+    date_debut: Optional[date] = None,
+    date_fin: Optional[date] = None,
+    magasin_id: Optional[int] = None
+):
+    """Export des ventes brutes, une ligne par ligne de vente (CSV, NDJSON ou Parquet)"""
+    date_debut, date_fin = _check_request(format, date_debut, date_fin)
+    return _streaming_response(
+        await sales_export_sql(),
+        (date_debut, date_fin, magasin_id),
+        format,
+        f"ventes_{date_debut}_{date_fin}",
+    )
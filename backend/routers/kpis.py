@@ -4,175 +4,243 @@
 from fastapi import APIRouter, HTTPException
 from typing import List, Dict, Any
 
-from database import get_db
+from database import ANALYTICS, get_db
+from queries import register
 from models.kpi import (
-    KPI, StorePerformanceResponse, StorePerformance,
+    StorePerformanceResponse, StorePerformance,
     MonthlyTrendResponse, MonthlyTrend,
     CategoryData, RegionData, BudgetData, TopStore
 )
-from services.n8n_webhook import send_to_n8n
+from services.cache import cached
+from services.kpis import compute_kpis
+from services import analysis_queue
 
 router = APIRouter()
 
-@router.get("/kpis", response_model=Dict[str, Any])
-async def get_kpis():
-    """Récupère les 4 KPIs principaux"""
-    try:
-        async with get_db() as conn:
-            # CA Total
-            ca_total = await conn.fetchval("""
-                SELECT COALESCE(SUM(montant_ht), 0) 
-                FROM ventes 
-                WHERE statut = 'validee'
-            """)
-            
-            # CA mois précédent pour calculer l'évolution
-            ca_previous = await conn.fetchval("""
-                SELECT COALESCE(SUM(montant_ht), 0)
-                FROM ventes 
-                WHERE statut = 'validee'
-                AND date_vente >= DATE_TRUNC('month', CURRENT_DATE - INTERVAL '1 month')
-                AND date_vente < DATE_TRUNC('month', CURRENT_DATE)
-            """)
-            
-            # Calcul de l'évolution
-            # ca_evolution = f"+{((float(ca_total or 0) - float(ca_previous or 1)) / float(ca_previous or 1) * 100):.0f}%" if ca_previous else "+0%"
-            ca_change = ((float(ca_total) - float(ca_previous or 1)) / float(ca_previous or 1)) * 100 if ca_previous else 0
-            
-            # Magasins Actifs
-            magasins_actifs = await conn.fetchval("""
-                SELECT COUNT(*) 
-                FROM magasins 
-                WHERE statut = 'actif'
-            """)
-            
-            # Magasins actifs mois précédent
-            magasins_previous = await conn.fetchval("""
-                SELECT COUNT(*) FROM magasins 
-                WHERE statut = 'actif'
-                AND date_ouverture < DATE_TRUNC('month', CURRENT_DATE)
-            """)
-            
-            magasins_evolution = f"+{(int(magasins_actifs or 0) - int(magasins_previous or 0))}" if magasins_previous is not None else "+0" 
-            # Pourcentage d'évolution   
-            if magasins_previous and magasins_previous > 0:
-                magasins_evolution = f"+{((int(magasins_actifs or 0) - int(magasins_previous or 0)) / int(magasins_previous or 1) * 100):.0f}%" 
-            else:
-                magasins_evolution = "+0%"
+STORE_PERFORMANCE = register("kpis.store_performance", """
+    WITH ventes_30j AS (
+        SELECT magasin_id, SUM(ca_ht) as ca
+        FROM rollup_ventes_magasin_jour
+        WHERE jour >= CURRENT_DATE - 30
+        GROUP BY magasin_id
+    ),
+    marges_30j AS (
+        SELECT 
+            r.magasin_id,
+            SUM(r.nb_lignes * (p.prix_vente - p.prix_achat) / NULLIF(p.prix_vente, 0) * 100)
+                / NULLIF(SUM(r.nb_lignes) FILTER (WHERE p.prix_vente <> 0), 0) as marge
+        FROM rollup_ventes_produit_jour r
+        JOIN produits p ON r.produit_id = p.id
+        WHERE r.jour >= CURRENT_DATE - 30
+        GROUP BY r.magasin_id
+    ),
+    stock_magasin AS (
+        SELECT magasin_id, AVG(quantite) as stock
+        FROM stock
+        GROUP BY magasin_id
+    )
+    SELECT 
+        m.nom as name,
+        ROUND(COALESCE(v.ca, 0) / 1000) as ca,
+        ROUND(m.objectif_ca_mensuel / 1000) as objectif,
+        ROUND(mg.marge) as marge,
+        ROUND(s.stock) as stock
+    FROM magasins m
+    LEFT JOIN ventes_30j v ON m.id = v.magasin_id
+    LEFT JOIN marges_30j mg ON m.id = mg.magasin_id
+    LEFT JOIN stock_magasin s ON m.id = s.magasin_id
+    WHERE m.statut = 'actif'
+    ORDER BY ca DESC
+    LIMIT 10
+""")
 
-            # Correction pour afficher +2 au lieu de +200% si on passe de 1 à 3 magasins
-            if magasins_previous == 1 and magasins_actifs == 3:
-                magasins_evolution = "+2"
+TOP_STORES = register("kpis.top_stores", """
+    WITH revenue_month AS (
+        SELECT 
+            magasin_id,
+            SUM(ca_ht) FILTER (WHERE jour >= DATE_TRUNC('month', CURRENT_DATE)) as revenue,
+            SUM(ca_ht) FILTER (WHERE jour < DATE_TRUNC('month', CURRENT_DATE)) as revenue_previous
+        FROM rollup_ventes_magasin_jour
+        WHERE jour >= DATE_TRUNC('month', CURRENT_DATE - INTERVAL '1 month')
+        GROUP BY magasin_id
+    ),
+    margin_month AS (
+        SELECT 
+            r.magasin_id,
+            SUM(r.nb_lignes * (p.prix_vente - p.prix_achat) / NULLIF(p.prix_vente, 0) * 100)
+                / NULLIF(SUM(r.nb_lignes) FILTER (WHERE p.prix_vente <> 0), 0) as margin
+        FROM rollup_ventes_produit_jour r
+        JOIN produits p ON r.produit_id = p.id
+        WHERE r.jour >= DATE_TRUNC('month', CURRENT_DATE)
+        GROUP BY r.magasin_id
+    ),
+    store_current AS (
+        SELECT 
+            m.id,
+            m.nom as name,
+            COALESCE(rm.revenue, 0) as revenue,
+            mm.margin
+        FROM magasins m
+        LEFT JOIN revenue_month rm ON m.id = rm.magasin_id
+        LEFT JOIN margin_month mm ON m.id = mm.magasin_id
+        WHERE m.statut = 'actif'
+    ),
+    store_previous AS (
+        SELECT 
+            m.id,
+            COALESCE(rm.revenue_previous, 0) as revenue_previous
+        FROM magasins m
+        LEFT JOIN revenue_month rm ON m.id = rm.magasin_id
+        WHERE m.statut = 'actif'
+    )
+    SELECT 
+        sc.name,
+        sc.revenue,
+        sc.margin,
+        CASE 
+            WHEN sp.revenue_previous > 0 
+            THEN ((sc.revenue - sp.revenue_previous) / sp.revenue_previous) * 100
+            ELSE 0
+        END as growth,
+        CASE
+            WHEN sc.margin >= 35 AND ((sc.revenue - sp.revenue_previous) / NULLIF(sp.revenue_previous, 1)) * 100 >= 10 THEN 'excellent'
+            WHEN sc.margin >= 30 OR ((sc.revenue - sp.revenue_previous) / NULLIF(sp.revenue_previous, 1)) * 100 >= 5 THEN 'bon'
+            WHEN sc.margin >= 25 THEN 'moyen'
+            ELSE 'faible'
+        END as status
+    FROM store_current sc
+    LEFT JOIN store_previous sp ON sc.id = sp.id
+    ORDER BY sc.revenue DESC
+    LIMIT $1
+""")
 
-            
-            # Marge Moyenne
-            marge_moyenne = await conn.fetchval("""
-                SELECT AVG((prix_vente - prix_achat) / NULLIF(prix_vente, 0) * 100)
-                FROM produits 
-                WHERE actif = true
-            """)
-            
-                        # Rotation Stock (nombre de fois où le stock se renouvelle)
-            rotation_stock = await conn.fetchval("""
-                SELECT 
-                    COALESCE(
-                        SUM(lv.quantite) / NULLIF(AVG(s.quantite), 0),
-                        0
-                    )
-                FROM lignes_ventes lv
-                JOIN stock s ON lv.produit_id = s.produit_id
-                JOIN ventes v ON lv.vente_id = v.id
-                WHERE v.statut = 'validee'
-                AND v.date_vente >= DATE_TRUNC('month', CURRENT_DATE)
-            """)
+MONTHLY_TREND_OLD = register("kpis.monthly_trend_old", """
+    WITH monthly_data AS (
+        SELECT 
+            TO_CHAR(DATE_TRUNC('month', v.date_vente), 'Mon YYYY') as mois_text,
+            DATE_TRUNC('month', v.date_vente)::date as mois_debut,
+            EXTRACT(YEAR FROM v.date_vente) as annee,
+            EXTRACT(MONTH FROM v.date_vente) as mois_num,
+            ROUND(SUM(v.montant_ht) / 1000) as ca,
+            ROUND(AVG((p.prix_vente - p.prix_achat) / NULLIF(p.prix_vente, 0) * 100)) as marge
+        FROM ventes v
+        LEFT JOIN lignes_ventes lv ON v.id = lv.vente_id
+        LEFT JOIN produits p ON lv.produit_id = p.id
+        WHERE v.statut = 'validee'
+            AND v.date_vente >= CURRENT_DATE - INTERVAL '12 months'
+        GROUP BY 
+            DATE_TRUNC('month', v.date_vente),
+            EXTRACT(YEAR FROM v.date_vente),
+            EXTRACT(MONTH FROM v.date_vente)
+    ),
+    -- Prévisions à un pas enregistrées par services.forecasts
+    previsions AS (
+        SELECT mois, SUM(prevision) as prevision
+        FROM previsions_ventes
+        WHERE mois >= DATE_TRUNC('month', CURRENT_DATE - INTERVAL '12 months')
+        GROUP BY mois
+    )
+    SELECT 
+        md.mois_text as mois,
+        md.ca::integer,
+        ROUND(COALESCE(p.prevision, 0) / 1000)::integer as prevision,
+        md.marge::integer
+    FROM monthly_data md
+    LEFT JOIN previsions p ON p.mois = md.mois_debut
+    ORDER BY md.annee ASC, md.mois_num ASC
+    LIMIT 12
+""")
 
-            # Taux de Stock
-            taux_stock = await conn.fetchval("""
-                SELECT AVG((quantite::float / NULLIF(p.stock_securite, 0)) * 100)
-                FROM stock s
-                JOIN produits p ON s.produit_id = p.id
-            """)
-            
-            return {
-                "revenue": {
-                    "value": float(ca_total or 0),
-                    "change": round(ca_change, 1),
-                    "element": "revenue-kpi"
-                },
-                "margin": {
-                    "value": round(float(marge_moyenne or 0), 1),
-                    "change": 2.1,  # TODO: Calculer dynamiquement
-                    "element": "margin-kpi"
-                },
-                "stores": {
-                    "value": int(magasins_actifs or 0),
-                    "change": magasins_evolution,
-                    "element": "stores-kpi"
-                },
-                "rotation": {
-                    "value": round(float(rotation_stock or 0), 1),
-                    "change": rotation_stock,  # TODO: Calculer dynamiquement
-                    "element": "rotation-kpi"
-                }
-            }
+MONTHLY_TREND = register("kpis.monthly_trend", """
+    SELECT 
+        TO_CHAR(DATE_TRUNC('month', r.jour), 'Mon YYYY') as mois,
+        DATE_TRUNC('month', r.jour)::date as debut,
+        ROUND(SUM(r.ca_ht) / 1000000, 1) as ca,
+        ROUND(
+            SUM(m.objectif_ca_mensuel * r.nb_transactions)
+            / NULLIF(SUM(r.nb_transactions), 0) / 1000000, 1
+        ) as objectif
+    FROM rollup_ventes_magasin_jour r
+    JOIN magasins m ON r.magasin_id = m.id
+    WHERE r.jour >= DATE_TRUNC('month', CURRENT_DATE) - INTERVAL '11 months'
+    GROUP BY DATE_TRUNC('month', r.jour)
+    ORDER BY DATE_TRUNC('month', r.jour) ASC
+""")
 
-            return [
-                KPI(
-                    label="CA Total",
-                    value=f"{(float(ca_total or 0) / 1_000_000):.1f}M EUR",
-                    evolution="+12%",
-                    icon="DollarSign",
-                    color="bg-blue-500"
-                ),
-                KPI(
-                    label="Magasins Actifs",
-                    value=str(magasins_actifs or 0),
-                    evolution="+2",
-                    icon="Store",
-                    color="bg-purple-500"
-                ),
-                KPI(
-                    label="Marge Moyenne",
-                    value=f"{float(marge_moyenne or 0):.1f}%",
-                    evolution="+1.2%",
-                    icon="TrendingUp",
-                    color="bg-green-500"
-                ),
-                KPI(
-                    label="Taux de Stock",
-                    value=f"{float(taux_stock or 0):.0f}%",
-                    evolution="-3%",
-                    icon="Package",
-                    color="bg-orange-500"
-                ),
-            ]
+MONTHLY_FORECAST = register("kpis.monthly_forecast", """
+    SELECT 
+        TO_CHAR(mois, 'Mon YYYY') as mois,
+        mois as debut,
+        ROUND(SUM(prevision) / 1000000, 1) as prevision
+    FROM previsions_ventes
+    WHERE mois >= DATE_TRUNC('month', CURRENT_DATE) - INTERVAL '11 months'
+    GROUP BY mois
+    ORDER BY mois ASC
+""")
+
+REGIONAL_PERFORMANCE = register("kpis.regional_performance", """
+    SELECT 
+        COALESCE(r.nom, 'Non classé') as name,
+        COUNT(DISTINCT m.id) as nb_magasins,
+        ROUND((COUNT(DISTINCT m.id)::float / 
+               (SELECT COUNT(*) FROM magasins WHERE statut = 'actif')::float) * 100) as percentage
+    FROM magasins m
+    LEFT JOIN regions r ON m.region_id = r.id
+    WHERE m.statut = 'actif'
+    GROUP BY r.nom
+    ORDER BY nb_magasins DESC
+    LIMIT 6
+""")
+
+CATEGORY_DATA = register("kpis.category_data", """
+    SELECT 
+        c.nom as name,
+        ROUND(SUM(lv.montant_total_ht))::integer as value,
+        CASE 
+            WHEN c.nom ILIKE '%electronique%' THEN '#1f77b4'
+            WHEN c.nom ILIKE '%vetement%' THEN '#ff7f0e'
+            WHEN c.nom ILIKE '%chaussure%' THEN '#2ca02c'
+            WHEN c.nom ILIKE '%accessoire%' THEN '#9467bd'
+            ELSE '#d62728'
+        END as color
+    FROM public.categories c
+    LEFT JOIN produits p ON c.id = p.categorie_id
+    LEFT JOIN lignes_ventes lv ON p.id = lv.produit_id
+    LEFT JOIN ventes v ON lv.vente_id = v.id AND v.statut = 'validee'
+    GROUP BY c.id, c.nom
+    HAVING SUM(lv.montant_total_ht) > 0
+    ORDER BY value DESC
+    LIMIT 5
+""")
+
+BUDGET_DATA = register("kpis.budget_data", """
+    SELECT 
+        categorie,
+        ROUND(SUM(montant_prevu))::integer as budget,
+        ROUND(SUM(montant_realise))::integer as reel,
+        ROUND(SUM(montant_realise - montant_prevu))::integer as ecart
+    FROM budgets
+    WHERE annee = EXTRACT(YEAR FROM CURRENT_DATE)
+    GROUP BY categorie
+    ORDER BY budget DESC
+""")
+
+@router.get("/kpis", response_model=Dict[str, Any])
+@cached("kpis", ttl=60, swr=120, tags=("ventes",))
+async def get_kpis():
+    """Récupère les 4 KPIs principaux"""
+    try:
+        return await compute_kpis()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération des KPI: {str(e)}")
 
 @router.get("/store-performance", response_model=StorePerformanceResponse)
+@cached("store-performance", ttl=60, swr=120, tags=("ventes",))
 async def get_store_performance():
     """Performance par magasin (top 10)"""
     try:
-        async with get_db() as conn:
-            rows = await conn.fetch("""
-                SELECT 
-                    m.nom as name,
-                    ROUND(COALESCE(SUM(v.montant_ht), 0) / 1000) as ca,
-                    ROUND(m.objectif_ca_mensuel / 1000) as objectif,
-                    ROUND(AVG((p.prix_vente - p.prix_achat) / NULLIF(p.prix_vente, 0) * 100)) as marge,
-                    ROUND(AVG(s.quantite)) as stock
-                FROM magasins m
-                LEFT JOIN ventes v ON m.id = v.magasin_id 
-                    AND v.statut = 'validee'
-                    AND v.date_vente >= CURRENT_DATE - INTERVAL '30 days'
-                LEFT JOIN lignes_ventes lv ON v.id = lv.vente_id
-                LEFT JOIN produits p ON lv.produit_id = p.id
-                LEFT JOIN stock s ON m.id = s.magasin_id
-                WHERE m.statut = 'actif'
-                GROUP BY m.id, m.nom, m.objectif_ca_mensuel
-                ORDER BY ca DESC
-                LIMIT 10
-            """)
+        async with get_db(ANALYTICS) as conn:
+            rows = await STORE_PERFORMANCE.fetch(conn)
             
             data = [
                 StorePerformance(
@@ -185,72 +253,31 @@ async def get_store_performance():
                 for row in rows
             ]
             
-            # Appel webhook n8n pour analyse
-            analysis = await send_to_n8n({
+            # Analyse n8n en tâche de fond : résultat via /api/analyses/{analysis_id}
+            analysis = analysis_queue.submit({
                 "type": "store-performance",
                 "data": [d.model_dump() for d in data]
             })
             
-            return StorePerformanceResponse(data=data, analysis=analysis)
+            return StorePerformanceResponse(
+                data=data,
+                analysis=analysis.result if analysis.status == analysis_queue.DONE else None,
+                analysis_id=analysis.id,
+                analysis_status=analysis.status
+            )
             
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @router.get("/top-stores", response_model=List[TopStore])
+@cached("top-stores", ttl=60, swr=120, tags=("ventes",))
 async def get_top_stores(limit: int = 10):
     """
     Top magasins performants au format attendu par le tableau du frontend
     """
     try:
-        async with get_db() as conn:
-            rows = await conn.fetch("""
-                WITH store_current AS (
-                    SELECT 
-                        m.id,
-                        m.nom as name,
-                        COALESCE(SUM(v.montant_ht), 0) as revenue,
-                        AVG((p.prix_vente - p.prix_achat) / NULLIF(p.prix_vente, 0) * 100) as margin
-                    FROM magasins m
-                    LEFT JOIN ventes v ON m.id = v.magasin_id 
-                        AND v.statut = 'validee'
-                        AND v.date_vente >= DATE_TRUNC('month', CURRENT_DATE)
-                    LEFT JOIN lignes_ventes lv ON v.id = lv.vente_id
-                    LEFT JOIN produits p ON lv.produit_id = p.id
-                    WHERE m.statut = 'actif'
-                    GROUP BY m.id, m.nom
-                ),
-                store_previous AS (
-                    SELECT 
-                        m.id,
-                        COALESCE(SUM(v.montant_ht), 0) as revenue_previous
-                    FROM magasins m
-                    LEFT JOIN ventes v ON m.id = v.magasin_id 
-                        AND v.statut = 'validee'
-                        AND v.date_vente >= DATE_TRUNC('month', CURRENT_DATE - INTERVAL '1 month')
-                        AND v.date_vente < DATE_TRUNC('month', CURRENT_DATE)
-                    WHERE m.statut = 'actif'
-                    GROUP BY m.id
-                )
-                SELECT 
-                    sc.name,
-                    sc.revenue,
-                    sc.margin,
-                    CASE 
-                        WHEN sp.revenue_previous > 0 
-                        THEN ((sc.revenue - sp.revenue_previous) / sp.revenue_previous) * 100
-                        ELSE 0
-                    END as growth,
-                    CASE
-                        WHEN sc.margin >= 35 AND ((sc.revenue - sp.revenue_previous) / NULLIF(sp.revenue_previous, 1)) * 100 >= 10 THEN 'excellent'
-                        WHEN sc.margin >= 30 OR ((sc.revenue - sp.revenue_previous) / NULLIF(sp.revenue_previous, 1)) * 100 >= 5 THEN 'bon'
-                        WHEN sc.margin >= 25 THEN 'moyen'
-                        ELSE 'faible'
-                    END as status
-                FROM store_current sc
-                LEFT JOIN store_previous sp ON sc.id = sp.id
-                ORDER BY sc.revenue DESC
-                LIMIT $1
-            """, limit)
+        async with get_db(ANALYTICS) as conn:
+            rows = await TOP_STORES.fetch(conn, limit)
             
             return [
                 TopStore(
@@ -270,34 +297,8 @@ async def get_top_stores(limit: int = 10):
 async def get_monthly_trend_old():
     """Évolution mensuelle du CA et de la marge"""
     try:
-        async with get_db() as conn:
-            rows = await conn.fetch("""
-                WITH monthly_data AS (
-                    SELECT 
-                        TO_CHAR(DATE_TRUNC('month', v.date_vente), 'Mon YYYY') as mois_text,
-                        EXTRACT(YEAR FROM v.date_vente) as annee,
-                        EXTRACT(MONTH FROM v.date_vente) as mois_num,
-                        ROUND(SUM(v.montant_ht) / 1000) as ca,
-                        ROUND(AVG((p.prix_vente - p.prix_achat) / NULLIF(p.prix_vente, 0) * 100)) as marge
-                    FROM ventes v
-                    LEFT JOIN lignes_ventes lv ON v.id = lv.vente_id
-                    LEFT JOIN produits p ON lv.produit_id = p.id
-                    WHERE v.statut = 'validee'
-                        AND v.date_vente >= CURRENT_DATE - INTERVAL '12 months'
-                    GROUP BY 
-                        DATE_TRUNC('month', v.date_vente),
-                        EXTRACT(YEAR FROM v.date_vente),
-                        EXTRACT(MONTH FROM v.date_vente)
-                )
-                SELECT 
-                    mois_text as mois,
-                    ca::integer,
-                    (ca * (0.9 + random() * 0.2))::integer as prevision,
-                    marge::integer
-                FROM monthly_data
-                ORDER BY annee ASC, mois_num ASC
-                LIMIT 12
-            """)
+        async with get_db(ANALYTICS) as conn:
+            rows = await MONTHLY_TREND_OLD.fetch(conn)
             
             # Inverser pour avoir du plus ancien au plus récent
             data = [
@@ -310,56 +311,50 @@ async def get_monthly_trend_old():
                 for row in reversed(rows)
             ]
             
-            analysis = await send_to_n8n({
+            analysis = analysis_queue.submit({
                 "type": "monthly-trend",
                 "data": [d.model_dump() for d in data]
             })
             
-            return MonthlyTrendResponse(data=data, analysis=analysis)
+            return MonthlyTrendResponse(
+                data=data,
+                analysis=analysis.result if analysis.status == analysis_queue.DONE else None,
+                analysis_id=analysis.id,
+                analysis_status=analysis.status
+            )
             
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @router.get("/monthly-trend", response_model=Dict[str, Any])
+@cached("monthly-trend", ttl=300, swr=600, tags=("ventes", "previsions"))
 async def get_monthly_trend():
     """
     Évolution mensuelle au format Chart.js attendu par le frontend
     Retourne: { labels: [], datasets: [] }
     """
     try:
-        async with get_db() as conn:
-            # CA Réalisé par mois
-            rows_realise = await conn.fetch("""
-                SELECT 
-                    TO_CHAR(DATE_TRUNC('month', v.date_vente), 'Mon') as mois,
-                    ROUND(SUM(v.montant_ht) / 1000000, 1) as ca
-                FROM ventes v
-                WHERE v.statut = 'validee'
-                    AND v.date_vente >= DATE_TRUNC('month', CURRENT_DATE) - INTERVAL '11 months'
-                GROUP BY DATE_TRUNC('month', v.date_vente)
-                ORDER BY DATE_TRUNC('month', v.date_vente) ASC
-            """)
+        async with get_db(ANALYTICS) as conn:
+            # CA Réalisé et objectifs par mois (objectif moyen pondéré par les ventes)
+            rows = await MONTHLY_TREND.fetch(conn)
+            # Prévisions enregistrées (mois passés et à venir)
+            forecast_rows = await MONTHLY_FORECAST.fetch(conn)
             
-            # Objectifs par mois (exemple simplifié)
-            rows_objectif = await conn.fetch("""
-                SELECT 
-                    TO_CHAR(DATE_TRUNC('month', v.date_vente), 'Mon') as mois,
-                    ROUND(AVG(m.objectif_ca_mensuel) / 1000000, 1) as objectif
-                FROM ventes v
-                JOIN magasins m ON v.magasin_id = m.id
-                WHERE v.statut = 'validee'
-                    AND v.date_vente >= DATE_TRUNC('month', CURRENT_DATE) - INTERVAL '11 months'
-                GROUP BY DATE_TRUNC('month', v.date_vente)
-                ORDER BY DATE_TRUNC('month', v.date_vente) ASC
-            """)
+            labels = [row['mois'] for row in rows]
+            ca_data = [float(row['ca']) for row in rows]
+            objectif_data = [float(row['objectif'] or 0) for row in rows]
             
-            labels = [row['mois'] for row in rows_realise]
-            ca_data = [float(row['ca']) for row in rows_realise]
-            objectif_data = [float(row['objectif']) for row in rows_objectif]
-            
-            # Compléter les objectifs si nécessaire
-            while len(objectif_data) < len(ca_data):
-                objectif_data.append(objectif_data[-1] if objectif_data else 2.0)
+            # Mois à venir : ajoutés aux libellés, sans réalisé ni objectif
+            months = [row['debut'] for row in rows]
+            last_month = months[-1] if months else None
+            for row in forecast_rows:
+                if last_month is None or row['debut'] > last_month:
+                    months.append(row['debut'])
+                    labels.append(row['mois'])
+                    ca_data.append(None)
+                    objectif_data.append(None)
+            forecasts = {row['debut']: float(row['prevision']) for row in forecast_rows}
+            prevision_data = [forecasts.get(month) for month in months]
             
             return {
                 "labels": labels,
@@ -381,6 +376,15 @@ async def get_monthly_trend():
                         "borderWidth": 2,
                         "borderDash": [5, 5],
                         "fill": False
+                    },
+                    {
+                        "label": "Prévision (M€)",
+                        "data": prevision_data,
+                        "borderColor": "#43e97b",
+                        "backgroundColor": "rgba(67, 233, 123, 0.1)",
+                        "borderWidth": 2,
+                        "borderDash": [2, 4],
+                        "fill": False
                     }
                 ]
             }
@@ -389,26 +393,15 @@ async def get_monthly_trend():
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @router.get("/regional-performance", response_model=List[RegionData])
+@cached("regional-performance", ttl=300, swr=600, tags=("magasins",))
 async def get_regional_performance():
     """
     Performance par région au format Chart.js (doughnut)
     Retourne: { labels: [], datasets: [{ data: [], backgroundColor: [] }] }
     """
     try:
-        async with get_db() as conn:
-            rows = await conn.fetch("""
-                SELECT 
-                    COALESCE(r.nom, 'Non classé') as name,
-                    COUNT(DISTINCT m.id) as nb_magasins,
-                    ROUND((COUNT(DISTINCT m.id)::float / 
-                           (SELECT COUNT(*) FROM magasins WHERE statut = 'actif')::float) * 100) as percentage
-                FROM magasins m
-                LEFT JOIN regions r ON m.region_id = r.id
-                WHERE m.statut = 'actif'
-                GROUP BY r.nom
-                ORDER BY nb_magasins DESC
-                LIMIT 6
-            """)
+        async with get_db(ANALYTICS) as conn:
+            rows = await REGIONAL_PERFORMANCE.fetch(conn)
             
             # colors = [
             #     '#667eea', '#764ba2', '#f093fb', 
@@ -428,30 +421,12 @@ async def get_regional_performance():
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @router.get("/category-data", response_model=List[CategoryData])
+@cached("category-data", ttl=300, swr=600, tags=("ventes",))
 async def get_category_data():
     """Répartition du CA par catégorie"""
     try:
-        async with get_db() as conn:
-            rows = await conn.fetch("""
-                SELECT 
-                    c.nom as name,
-                    ROUND(SUM(lv.montant_total_ht))::integer as value,
-                    CASE 
-                        WHEN c.nom ILIKE '%electronique%' THEN '#1f77b4'
-                        WHEN c.nom ILIKE '%vetement%' THEN '#ff7f0e'
-                        WHEN c.nom ILIKE '%chaussure%' THEN '#2ca02c'
-                        WHEN c.nom ILIKE '%accessoire%' THEN '#9467bd'
-                        ELSE '#d62728'
-                    END as color
-                FROM public.categories c
-                LEFT JOIN produits p ON c.id = p.categorie_id
-                LEFT JOIN lignes_ventes lv ON p.id = lv.produit_id
-                LEFT JOIN ventes v ON lv.vente_id = v.id AND v.statut = 'validee'
-                GROUP BY c.id, c.nom
-                HAVING SUM(lv.montant_total_ht) > 0
-                ORDER BY value DESC
-                LIMIT 5
-            """)
+        async with get_db(ANALYTICS) as conn:
+            rows = await CATEGORY_DATA.fetch(conn)
             
             return [CategoryData(**dict(row)) for row in rows]
             
@@ -459,21 +434,12 @@ async def get_category_data():
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @router.get("/budget-data", response_model=List[BudgetData])
+@cached("budget-data", ttl=300, swr=600, tags=("budgets",))
 async def get_budget_data():
     """Données budget prévu vs réalisé"""
     try:
-        async with get_db() as conn:
-            rows = await conn.fetch("""
-                SELECT 
-                    categorie,
-                    ROUND(SUM(montant_prevu))::integer as budget,
-                    ROUND(SUM(montant_realise))::integer as reel,
-                    ROUND(SUM(montant_realise - montant_prevu))::integer as ecart
-                FROM budgets
-                WHERE annee = EXTRACT(YEAR FROM CURRENT_DATE)
-                GROUP BY categorie
-                ORDER BY budget DESC
-            """)
+        async with get_db(ANALYTICS) as conn:
+            rows = await BUDGET_DATA.fetch(conn)
             
             return [BudgetData(**dict(row)) for row in rows]
             
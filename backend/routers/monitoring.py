@@ -0,0 +1,41 @@
+# ============================================
+# app/routers/monitoring.py - Endpoints Monitoring
+# ============================================
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import FileResponse, Response
+
+import queries
+from services import metrics, profiling, slow_queries
+
+router = APIRouter()
+
+# Exposé hors de /api, à l'emplacement attendu par Prometheus
+metrics_router = APIRouter()
+
+@router.get("/monitoring/queries", response_model=List[Dict[str, Any]])
+async def get_query_statistics():
+    """Exécutions, erreurs et temps cumulé par requête du registre"""
+    return queries.statistics()
+
+@router.get("/monitoring/slow-queries", response_model=List[Dict[str, Any]])
+async def get_slow_queries():
+    """Requêtes au-delà de SLOW_QUERY_MS, avec leur plan quand il a été échantillonné"""
+    return slow_queries.entries()
+
+@router.get("/monitoring/profiles/{profile_id}")
+async def get_profile(profile_id: str, x_profile: Optional[str] = Header(None)):
+    """Télécharge un profil enregistré (en-tête X-Profile : jeton de profilage)"""
+    if not profiling.authorized(x_profile):
+        raise HTTPException(status_code=403, detail="Jeton de profilage invalide")
+    path = profiling.profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profil non trouvé")
+    media_type = next(t for ext, t in profiling.EXTENSIONS.items() if path.name.endswith(ext))
+    return FileResponse(path, media_type=media_type, filename=path.name)
+
+@metrics_router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Métriques au format texte Prometheus"""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
@@ -0,0 +1,42 @@
+# ============================================
+# app/routers/previsions.py - Endpoints Prévisions
+# ============================================
+from fastapi import APIRouter, HTTPException
+from datetime import date
+from typing import Optional
+
+from models.forecast import BacktestReport, ForecastResponse
+from services.cache import cached
+from services.forecasts import fetch_backtest, fetch_forecast
+
+router = APIRouter()
+
+@router.get("/previsions", response_model=ForecastResponse)
+@cached("previsions", ttl=300, swr=600, tags=("previsions",))
+async def get_forecast(
+    date_debut: Optional[date] = None,
+    magasin_id: Optional[int] = None,
+    categorie_id: Optional[int] = None
+):
+    """
+    Prévisions de CA HT par mois (enregistrées par le calcul périodique)
+    À partir du mois courant par défaut ; filtre magasin et/ou catégorie
+    """
+    date_debut = date_debut or date.today().replace(day=1)
+    try:
+        return await fetch_forecast(date_debut, magasin_id, categorie_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur serveur: {str(e)}")
+
+@router.get("/previsions/backtest", response_model=BacktestReport)
+@cached("previsions-backtest", ttl=300, swr=600, tags=("previsions",))
+async def get_backtest(
+    magasin_id: Optional[int] = None,
+    categorie_id: Optional[int] = None,
+    limit: int = 50
+):
+    """MAPE par modèle et par série, séries les moins bien prévues d'abord"""
+    try:
+        return await fetch_backtest(magasin_id, categorie_id, max(1, min(limit, 1000)))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur serveur: {str(e)}")
@@ -1,33 +1,74 @@
 # ============================================
 # app/routers/products.py - Endpoints Produits
 # ============================================
+import asyncio
+import json
+
 from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
 
-from database import get_db
+from database import ANALYTICS, get_db
+from queries import register
+from config import settings
 from models.product import TopProduct, StockAlert
+from services import stock_alerts
+from services.cache import cached
 
 router = APIRouter()
 
+TOP_PRODUCTS = register("produits.top", """
+    SELECT 
+        p.nom,
+        SUM(lv.quantite) as quantite_vendue,
+        ROUND(SUM(lv.montant_total_ttc) / 1000) as ca_total,
+        ROUND((p.prix_vente - p.prix_achat) / NULLIF(p.prix_vente, 0) * 100) as marge
+    FROM produits p
+    JOIN lignes_ventes lv ON p.id = lv.produit_id
+    JOIN ventes v ON lv.vente_id = v.id
+    WHERE v.statut = 'validee'
+    GROUP BY p.id, p.nom, p.prix_vente, p.prix_achat
+    ORDER BY quantite_vendue DESC
+    LIMIT 5
+""")
+
+# Lecture directe, tant que les alertes en mémoire ne sont pas chargées
+STOCK_ALERTS = register("produits.stock_alertes", """
+    SELECT 
+        s.magasin_id,
+        s.produit_id,
+        m.nom as magasin,
+        p.nom as produit,
+        s.quantite,
+        s.quantite_reservee,
+        (s.quantite - s.quantite_reservee) as disponible,
+        p.stock_minimum,
+        CASE 
+            WHEN (s.quantite - s.quantite_reservee) <= p.stock_minimum THEN 'critique'
+            WHEN (s.quantite - s.quantite_reservee) <= p.stock_securite THEN 'attention'
+            ELSE 'normal'
+        END as niveau_alerte
+    FROM stock s
+    JOIN magasins m ON s.magasin_id = m.id
+    JOIN produits p ON s.produit_id = p.id
+    WHERE (s.quantite - s.quantite_reservee) <= p.stock_securite
+        AND ($1::int IS NULL OR s.magasin_id = $1)
+    ORDER BY 
+        CASE 
+            WHEN (s.quantite - s.quantite_reservee) <= p.stock_minimum THEN 1
+            ELSE 2
+        END,
+        (s.quantite - s.quantite_reservee) ASC
+    LIMIT $2
+""")
+
 @router.get("/produits/top", response_model=List[TopProduct])
+@cached("produits-top", ttl=300, swr=600, tags=("ventes",))
 async def get_top_products():
     """Top 5 des produits les plus vendus"""
     try:
-        async with get_db() as conn:
-            rows = await conn.fetch("""
-                SELECT 
-                    p.nom,
-                    SUM(lv.quantite) as quantite_vendue,
-                    ROUND(SUM(lv.montant_total_ttc) / 1000) as ca_total,
-                    ROUND((p.prix_vente - p.prix_achat) / NULLIF(p.prix_vente, 0) * 100) as marge
-                FROM produits p
-                JOIN lignes_ventes lv ON p.id = lv.produit_id
-                JOIN ventes v ON lv.vente_id = v.id
-                WHERE v.statut = 'validee'
-                GROUP BY p.id, p.nom, p.prix_vente, p.prix_achat
-                ORDER BY quantite_vendue DESC
-                LIMIT 5
-            """)
+        async with get_db(ANALYTICS) as conn:
+            rows = await TOP_PRODUCTS.fetch(conn)
             
             return [TopProduct(**dict(row)) for row in rows]
             
@@ -35,37 +76,50 @@ async def get_top_products():
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @router.get("/stock/alertes", response_model=List[StockAlert])
-async def get_stock_alerts():
-    """Alertes de stock bas (top 20)"""
+async def get_stock_alerts(
+    magasin_id: Optional[int] = None,
+    limit: int = 20
+):
+    """Alertes de stock bas (critiques d'abord), tous magasins ou un magasin"""
+    limit = max(1, min(limit, 1000))
+    if stock_alerts.alert_set.ready:
+        return stock_alerts.alert_set.top(magasin_id, limit)
     try:
-        async with get_db() as conn:
-            rows = await conn.fetch("""
-                SELECT 
-                    m.nom as magasin,
-                    p.nom as produit,
-                    s.quantite,
-                    s.quantite_reservee,
-                    (s.quantite - s.quantite_reservee) as disponible,
-                    p.stock_minimum,
-                    CASE 
-                        WHEN (s.quantite - s.quantite_reservee) <= p.stock_minimum THEN 'critique'
-                        WHEN (s.quantite - s.quantite_reservee) <= p.stock_securite THEN 'attention'
-                        ELSE 'normal'
-                    END as niveau_alerte
-                FROM stock s
-                JOIN magasins m ON s.magasin_id = m.id
-                JOIN produits p ON s.produit_id = p.id
-                WHERE (s.quantite - s.quantite_reservee) <= p.stock_securite
-                ORDER BY 
-                    CASE 
-                        WHEN (s.quantite - s.quantite_reservee) <= p.stock_minimum THEN 1
-                        ELSE 2
-                    END,
-                    (s.quantite - s.quantite_reservee) ASC
-                LIMIT 20
-            """)
+        async with get_db(ANALYTICS) as conn:
+            rows = await STOCK_ALERTS.fetch(conn, magasin_id, limit)
             
             return [StockAlert(**dict(row)) for row in rows]
             
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+@router.get("/stock/alertes/stream")
+async def stream_stock_alerts(magasin_id: Optional[int] = None):
+    """
+    Alertes de stock en Server-Sent Events : `snapshot` (alertes en cours),
+    puis `alerte` (nouvelle ou modifiée) et `fin` (stock revenu au-dessus du
+    seuil de sécurité). Un client trop lent est déconnecté (`overflow`).
+    """
+    if not stock_alerts.alert_set.ready:
+        raise HTTPException(status_code=503, detail="Alertes de stock non chargées")
+
+    async def events():
+        # Abonnement puis snapshot sans attente entre les deux : aucun changement perdu
+        subscriber = stock_alerts.subscribe(magasin_id)
+        try:
+            snapshot = stock_alerts.alert_set.top(magasin_id, None)
+            yield f"event: snapshot\ndata: {json.dumps(snapshot)}\n\n"
+            while not subscriber.overflow:
+                try:
+                    event, alert = await asyncio.wait_for(
+                        subscriber.queue.get(), settings.STOCK_ALERTS_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                yield f"event: {event}\ndata: {json.dumps(alert)}\n\n"
+            yield "event: overflow\ndata: {}\n\n"
+        finally:
+            stock_alerts.unsubscribe(subscriber)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
\ No newline at end of file
@@ -0,0 +1,45 @@
+# ============================================
+# app/routers/sales.py - Endpoints Ventes
+# ============================================
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request
+
+from database import get_db
+from models.sale import BulkImportResult
+from services.cache import invalidate
+from services.ingestion import import_sales, iter_lines
+
+router = APIRouter()
+
+CONTENT_TYPES = {
+    'application/x-ndjson': 'ndjson',
+    'application/ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+    'text/csv': 'csv',
+}
+
+@router.post("/ventes/bulk", response_model=BulkImportResult)
+async def bulk_import_sales(request: Request, format: Optional[str] = None):
+    """
+    Import en masse de ventes (NDJSON ou CSV, selon le Content-Type ou ?format=).
+    Les enregistrements invalides sont rejetés individuellement ; une vente
+    dont la référence existe déjà est ignorée.
+    """
+    if format is None:
+        content_type = request.headers.get('content-type', '').split(';')[0].strip().lower()
+        format = CONTENT_TYPES.get(content_type)
+    if format not in ('ndjson', 'csv'):
+        raise HTTPException(status_code=415, detail="Format attendu: NDJSON (application/x-ndjson) ou CSV (text/csv)")
+
+    try:
+        async with get_db() as conn:
+            result = await import_sales(conn, iter_lines(request.stream()), format)
+    except UnicodeDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Encodage invalide (UTF-8 attendu): {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de l'import: {str(e)}")
+
+    if result.ventes_inserees:
+        invalidate("ventes")
+    return result
@@ -8,120 +8,111 @@ from typing import Optional
 import uuid
 import json
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 
-from services.calculations import calculate_simulation_results, generate_evolution_data, generate_store_impact
+from services.calculations import MODEL_VERSION
 from database import get_db
+from queries import register
+from services.cache import cached, invalidate
+from services.monte_carlo import apply_percentile_bands, run_monte_carlo
+from services.scenarios import compute_results, default_probability, etag, list_scenarios, load_scenario, save_results, to_json
 from models.simulation import SimulationRequest
-from models.scenario import EvolutionItem, ScenarioCreate, ScenarioDetail, ScenarioParameters, ScenarioResponse, ScenarioUpdate, StoreImpact
+from models.scenario import EvolutionItem, ScenarioCreate, ScenarioDetail, ScenarioPage, ScenarioParameters, ScenarioResponse, ScenarioUpdate, StoreImpact
 
 router = APIRouter()
 
+INSERT_SQL = register("scenarios.insert", """
+    INSERT INTO scenarios (
+        id, name, description, scenario_type,
+        parameters, revenue_impact, cost_impact, margin_impact,
+        probability, status, created_by, created_at, updated_at,
+        base_period, deleted, results, evolution_data, store_impact,
+        monte_carlo, model_version, version
+    ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15,
+              $16::jsonb, $17::jsonb, $18::jsonb, $19::jsonb, $20, 1)
+""")
+
+EXISTS_SQL = register("scenarios.exists", """
+    SELECT id FROM scenarios WHERE id = $1 AND deleted = FALSE
+""")
+
+DELETE_SQL = register("scenarios.delete", """
+    UPDATE scenarios
+    SET deleted = TRUE, updated_at = $1
+    WHERE id = $2 AND deleted = FALSE
+""")
+
+# Scénario source d'une duplication et son insertion (colonnes jsonb recopiées telles quelles)
+SOURCE_SQL = register("scenarios.source", """
+    SELECT name, description, scenario_type, parameters,
+           revenue_impact, cost_impact, margin_impact,
+           probability, created_by, results, evolution_data,
+           store_impact, monte_carlo, model_version
+    FROM scenarios
+    WHERE id = $1 AND deleted = FALSE
+""")
+
+DUPLICATE_SQL = register("scenarios.duplicate", """
+    INSERT INTO scenarios (
+        id, name, description, scenario_type,
+        parameters, revenue_impact, cost_impact, margin_impact,
+        probability, status, created_by, created_at, updated_at,
+        base_period, deleted, results, evolution_data, store_impact,
+        monte_carlo, model_version, version
+    ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15,
+              $16, $17, $18, $19, $20, 1)
+""")
+
 # ============================================
 # Endpoints
 # ============================================
 
-@router.get("/scenarios", response_model=List[ScenarioResponse])
-async def get_scenarios(status: Optional[str] = None):
-    """Récupérer tous les scénarios"""
+@router.get("/scenarios", response_model=ScenarioPage)
+@cached("scenarios", ttl=30, tags=("scenarios",))
+async def get_scenarios(
+    status: Optional[str] = None,
+    scenario_type: Optional[str] = None,
+    simulation_type: Optional[str] = None,
+    created_by: Optional[str] = None,
+    search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200)
+):
+    """
+    Liste paginée des scénarios, du plus récent au plus ancien.
+    Passer `next_cursor` de la réponse dans `cursor` pour la page suivante.
+    """
     try:
-        async with get_db() as conn:
-            query = """
-                SELECT id, name, description, scenario_type, 
-                       parameters, revenue_impact, cost_impact, margin_impact,
-                       probability, status, created_at, created_by
-                FROM scenarios
-                WHERE deleted = FALSE
-            """
-            params = []
-            
-            if status:
-                query += " AND status = $1"
-                params.append(status)
-            
-            query += " ORDER BY created_at DESC"
-            
-            rows = await conn.fetch(query, *params)
-            
-            scenarios = []
-            for row in rows:
-                params_dict = {} #row['parameters']
-                scenarios.append(ScenarioResponse(
-                    id=row['id'],
-                    name=row['name'],
-                    description=row['description'],
-                    scenario_type=row['scenario_type'],
-                    simulation_type=params_dict.get('simulation_type', 'unknown'),
-                    period=params_dict.get('period', '6_months'),
-                    parameters=params_dict,
-                    revenue_impact=float(row['revenue_impact']),
-                    cost_impact=float(row['cost_impact']),
-                    margin_impact=float(row['margin_impact']),
-                    probability=float(row['probability']),
-                    status=row['status'],
-                    created_at=row['created_at'],
-                    created_by=row['created_by']
-                ))
-            
-            return scenarios
-            
+        return await list_scenarios(limit, cursor, status, scenario_type, simulation_type, created_by, search)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Curseur invalide")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération des scénarios: {str(e)}")
 
 @router.get("/scenarios/{scenario_id}", response_model=ScenarioDetail)
-async def get_scenario(scenario_id: str):
-    """Récupérer un scénario spécifique avec tous les détails"""
+async def get_scenario(scenario_id: str, request: Request, response: Response):
+    """
+    Récupérer un scénario avec ses résultats enregistrés.
+    Répond 304 si l'ETag envoyé dans If-None-Match est toujours valide.
+    """
     try:
-        async with get_db() as conn:
-            row = await conn.fetchrow("""
-                SELECT id, name, description, scenario_type, 
-                       parameters, revenue_impact, cost_impact, margin_impact,
-                       probability, status, created_at, created_by
-                FROM scenarios
-                WHERE id = $1 AND deleted = FALSE
-            """, scenario_id)
-            
-            if not row:
-                raise HTTPException(status_code=404, detail="Scénario non trouvé")
-            
-            params_dict = json.loads(row['parameters'])
-            simulation_type = params_dict.get('simulation_type', 'unknown')
-            period = params_dict.get('period', '6_months')
-            
-            # Recalculer les résultats détaillés
-            param_obj = ScenarioParameters(**{k: v for k, v in params_dict.items() 
-                                              if k not in ['simulation_type', 'period']})
-            results = calculate_simulation_results(simulation_type, param_obj, period)
-            
-            # Générer les données
-            evolution_data = generate_evolution_data(float(row['revenue_impact']), period)
-            store_impact = generate_store_impact()
-            
-            return ScenarioDetail(
-                id=row['id'],
-                name=row['name'],
-                description=row['description'],
-                scenario_type=row['scenario_type'],
-                simulation_type=simulation_type,
-                period=period,
-                parameters=params_dict,
-                revenue_impact=float(row['revenue_impact']),
-                cost_impact=float(row['cost_impact']),
-                margin_impact=float(row['margin_impact']),
-                probability=float(row['probability']),
-                status=row['status'],
-                created_at=row['created_at'],
-                created_by=row['created_by'],
-                results=results,
-                evolution_data=evolution_data,
-                store_impact=store_impact
-            )
-            
-    except HTTPException as http:
-        raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération du scénario: {str(http)}")
+        detail = await load_scenario(scenario_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération du scénario: {str(e)}")
 
+    if detail is None:
+        raise HTTPException(status_code=404, detail="Scénario non trouvé")
+
+    tag = etag(detail)
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match:
+        candidates = [t.strip().removeprefix('W/') for t in if_none_match.split(',')]
+        if tag in candidates or '*' in candidates:
+            return Response(status_code=304, headers={'ETag': tag})
+
+    response.headers['ETag'] = tag
+    return detail
+
 @router.post("/scenarios", response_model=ScenarioDetail)
 async def create_scenario(scenario: ScenarioCreate):
     """Créer et simuler un nouveau scénario"""
@@ -140,36 +131,40 @@ async def create_scenario(scenario: ScenarioCreate):
             })
             
             # Calculer les résultats de la simulation
-            results = calculate_simulation_results(
+            computed = await compute_results(
                 scenario.simulation_type,
-                scenario.parameters,
+                scenario.parameters.model_dump(exclude_none=True),
                 scenario.period
             )
+            results = computed['results']
             
             # Calculer la probabilité basée sur le type et les résultats
-            probability = 75.0
-            if results.roi > 200:
-                probability = 85.0
-            elif results.roi < 100:
-                probability = 60.0
+            probability = default_probability(results.roi)
+            
+            # Mode Monte Carlo : probabilité empirique d'un gain net positif
+            monte_carlo = None
+            if scenario.monte_carlo:
+                monte_carlo = await run_monte_carlo(
+                    scenario.simulation_type,
+                    scenario.parameters,
+                    scenario.period,
+                    scenario.monte_carlo
+                )
+                results = apply_percentile_bands(results, monte_carlo)
+                probability = round(monte_carlo.probability_positive_net_gain * 100, 1)
+            
+            # Données complémentaires, enregistrées avec le scénario
+            evolution_data = computed['evolution_data']
+            store_impact = computed['store_impact']
             
             # Insérer le scénario
-            await conn.execute("""
-                INSERT INTO scenarios (
-                    id, name, description, scenario_type, 
-                    parameters, revenue_impact, cost_impact, margin_impact,
-                    probability, status, created_by, created_at, updated_at,
-                    base_period, deleted
-                ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15)
-            """, scenario_id, scenario.name, scenario.description, scenario.scenario_type,
+            await INSERT_SQL.execute(conn, scenario_id, scenario.name, scenario.description, scenario.scenario_type,
                  parameters_json ,
                  results.revenue_impact, results.cost_impact, results.margin_impact,
                  probability, 'active', scenario.created_by, current_time, current_time,
-                 datetime.now(), False)
-            
-            # Générer les données complémentaires
-            evolution_data = generate_evolution_data(results.revenue_impact, scenario.period)
-            store_impact = generate_store_impact()
+                 datetime.now(), False, to_json(results), to_json(evolution_data),
+                 to_json(store_impact), to_json(monte_carlo), MODEL_VERSION)
+            invalidate("scenarios")
                      
             return ScenarioDetail(
                 id=scenario_id,
@@ -187,10 +182,13 @@ async def create_scenario(scenario: ScenarioCreate):
                 created_at=current_time,
                 created_by=scenario.created_by,
                 results=results,
+                monte_carlo=monte_carlo,
                 evolution_data=evolution_data,
                 store_impact=store_impact
             )
             
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         import traceback
         print("❌ ERREUR SERVEUR /scenarios:")
@@ -203,10 +201,7 @@ async def update_scenario(scenario_id: str, update: ScenarioUpdate):
     try:
         async with get_db() as conn:
             # Vérifier que le scénario existe
-            exists = await conn.fetchval(
-                "SELECT id FROM scenarios WHERE id = $1 AND deleted = FALSE",
-                scenario_id
-            )
+            exists = await EXISTS_SQL.fetchval(conn, scenario_id)
             
             if not exists:
                 raise HTTPException(status_code=404, detail="Scénario non trouvé")
@@ -233,13 +228,14 @@ async def update_scenario(scenario_id: str, update: ScenarioUpdate):
             
             if update.parameters is not None:
                 updates.append(f"parameters = parameters || ${param_count}::jsonb")
-                params.append(update.parameters.dict(exclude_none=True))
+                params.append(json.dumps(update.parameters.model_dump(exclude_none=True)))
                 param_count += 1
             
             updates.append(f"updated_at = ${param_count}")
             params.append(int(datetime.now().timestamp() * 1000))
             param_count += 1
             
+            updates.append("version = version + 1")
             params.append(scenario_id)
             
             query = f"""
@@ -251,9 +247,22 @@ async def update_scenario(scenario_id: str, update: ScenarioUpdate):
                           probability, status, created_at, created_by
             """
             
-            row = await conn.fetchrow(query, *params)
-            
-            params_dict = dict(row['parameters'])
+            async with conn.transaction():
+                row = await conn.fetchrow(query, *params)
+                params_dict = json.loads(row['parameters'])
+                
+                # Nouveaux paramètres : résultats recalculés et réenregistrés
+                if update.parameters is not None:
+                    computed = await compute_results(
+                        params_dict.get('simulation_type', 'unknown'),
+                        params_dict,
+                        params_dict.get('period', '6_months')
+                    )
+                    row = await save_results(
+                        conn, scenario_id, computed,
+                        probability=default_probability(computed['results'].roi)
+                    )
+            invalidate("scenarios")
             
             return ScenarioResponse(
                 id=row['id'],
@@ -282,14 +291,11 @@ async def delete_scenario(scenario_id: str):
     """Supprimer un scénario (soft delete)"""
     try:
         async with get_db() as conn:
-            result = await conn.execute("""
-                UPDATE scenarios
-                SET deleted = TRUE, updated_at = $1
-                WHERE id = $2 AND deleted = FALSE
-            """, int(datetime.now().timestamp() * 1000), scenario_id)
+            result = await DELETE_SQL.execute(conn, int(datetime.now().timestamp() * 1000), scenario_id)
             
             if result == "UPDATE 0":
                 raise HTTPException(status_code=404, detail="Scénario non trouvé")
+            invalidate("scenarios")
             
             return {"message": "Scénario supprimé avec succès"}
             
@@ -304,13 +310,7 @@ async def duplicate_scenario(scenario_id: str):
     try:
         async with get_db() as conn:
             # Récupérer le scénario original
-            row = await conn.fetchrow("""
-                SELECT name, description, scenario_type, parameters,
-                       revenue_impact, cost_impact, margin_impact,
-                       probability, created_by
-                FROM scenarios
-                WHERE id = $1 AND deleted = FALSE
-            """, scenario_id)
+            row = await SOURCE_SQL.fetchrow(conn, scenario_id)
             
             if not row:
                 raise HTTPException(status_code=404, detail="Scénario non trouvé")
@@ -320,19 +320,15 @@ async def duplicate_scenario(scenario_id: str):
             current_time = int(datetime.now().timestamp() * 1000)
             new_name = f"{row['name']} (Copie)"
             
-            await conn.execute("""
-                INSERT INTO scenarios (
-                    id, name, description, scenario_type, 
-                    parameters, revenue_impact, cost_impact, margin_impact,
-                    probability, status, created_by, created_at, updated_at,
-                    base_period, deleted
-                ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15)
-            """, new_id, new_name, row['description'], row['scenario_type'],
+            await DUPLICATE_SQL.execute(conn, new_id, new_name, row['description'], row['scenario_type'],
                  row['parameters'], row['revenue_impact'], row['cost_impact'], 
                  row['margin_impact'], row['probability'], 'draft', row['created_by'],
-                 current_time, current_time, datetime.now(), False)
+                 current_time, current_time, datetime.now(), False, row['results'],
+                 row['evolution_data'], row['store_impact'], row['monte_carlo'],
+                 row['model_version'])
+            invalidate("scenarios")
             
-            params_dict = dict(row['parameters'])
+            params_dict = json.loads(row['parameters'])
             
             return ScenarioResponse(
                 id=new_id,
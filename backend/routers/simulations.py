@@ -12,9 +12,14 @@ import json
 from fastapi import APIRouter, HTTPException
 
 from models import scenario
-from services.calculations import calculate_simulation_results, generate_evolution_data, generate_store_impact
-from database import get_db
-from models.simulation import SimulationRequest, SimulationResult, SimulationResponse
+from services.calculations import PERIOD_MULTIPLIERS, calculate_simulation_results, generate_evolution_data
+from database import ANALYTICS, get_db
+from config import settings
+from queries import register
+from models.simulation import BatchSimulationRequest, BatchSimulationResponse, SimulationRequest, SimulationResult, SimulationResponse
+from services.batch_calculations import PARAMETER_DEFAULTS, expand_grid, records_to_columns, run_batch
+from services.monte_carlo import apply_percentile_bands, run_monte_carlo
+from services.store_weights import compute_store_impact
 from models.scenario import EvolutionItem, ScenarioCreate, ScenarioDetail, ScenarioParameters, ScenarioResponse, ScenarioUpdate, StoreImpact
 
 router = APIRouter()
@@ -28,11 +33,28 @@ PERIOD_INTERVALS = {
     '2_years': '2 years',
 }
 
+# L'intervalle est passé en paramètre : un seul texte de requête par mesure
+CA_ACTUEL = register("simulations.ca_actuel", """
+    SELECT SUM(montant_ht) / 1000
+    FROM ventes
+    WHERE statut = 'validee'
+        AND date_vente >= DATE_TRUNC('month', CURRENT_DATE - $1::text::interval)
+""")
+
+MARGE_ACTUELLE = register("simulations.marge_actuelle", """
+    SELECT AVG((p.prix_vente - p.prix_achat) / NULLIF(p.prix_vente, 0) * 100)
+    FROM produits p
+    JOIN lignes_ventes lv ON p.id = lv.produit_id
+    JOIN ventes v ON lv.vente_id = v.id
+    WHERE v.statut = 'validee'
+        AND date_vente >= DATE_TRUNC('month', CURRENT_DATE - $1::text::interval)
+""")
+
 @router.post("/simulations", response_model=SimulationResponse)
 async def simulate_scenario(simulation: SimulationRequest):
     """Simulation what-if avec différents paramètres"""
     try:
-        async with get_db() as conn:
+        async with get_db(ANALYTICS) as conn:
         # Payload
             # created_by : "user"
             # description : ""
@@ -53,24 +75,12 @@ async def simulate_scenario(simulation: SimulationRequest):
             # Validation de sécurité
             assert period_interval in PERIOD_INTERVALS.values(), "Invalid period interval"
 
-            ca_actuel = await conn.fetchval(f"""
-                SELECT SUM(montant_ht) / 1000
-                FROM ventes
-                WHERE statut = 'validee'
-                    AND date_vente >= DATE_TRUNC('month', CURRENT_DATE - INTERVAL '{period_interval}');
-            """) or 3800
+            ca_actuel = await CA_ACTUEL.fetchval(conn, period_interval) or 3800
 
             logging.info(f"CA actuel calculé: {ca_actuel}")
             
             # Marge actuelle
-            marge_actuelle = await conn.fetchval(f"""
-                SELECT AVG((p.prix_vente - p.prix_achat) / NULLIF(p.prix_vente, 0) * 100)
-                FROM produits p
-                JOIN lignes_ventes lv ON p.id = lv.produit_id
-                JOIN ventes v ON lv.vente_id = v.id
-                WHERE v.statut = 'validee'
-                    AND date_vente >= DATE_TRUNC('month', CURRENT_DATE - INTERVAL '{period_interval}');
-            """) or 27
+            marge_actuelle = await MARGE_ACTUELLE.fetchval(conn, period_interval) or 27
             
             # Construire l'objet ScenarioParameters à partir des paramètres fournis
             param_obj = ScenarioParameters(**simulation.parameters);
@@ -82,22 +92,66 @@ async def simulate_scenario(simulation: SimulationRequest):
                 simulation.period
             )
             
-            # Calculer la probabilité basée sur le type et les résultats
-            probability = 75.0
-            if results.roi > 200:
-                probability = 85.0
-            elif results.roi < 100:
-                probability = 60.0
+            # Mode Monte Carlo : bandes P10/P50/P90 et probabilité empiriques
+            monte_carlo = None
+            if simulation.monte_carlo:
+                monte_carlo = await run_monte_carlo(
+                    simulation.simulation_type,
+                    param_obj,
+                    simulation.period,
+                    simulation.monte_carlo
+                )
+                results = apply_percentile_bands(results, monte_carlo)
 
             # Générer les données complémentaires
             evolution_data = generate_evolution_data(results.revenue_impact, simulation.period)
-            store_impact = generate_store_impact()
+            store_impact = await compute_store_impact(
+                results,
+                simulation.parameters or {},
+                PERIOD_MULTIPLIERS.get(simulation.period, 1)
+            )
 
             return SimulationResponse(
                 results=results,
+                monte_carlo=monte_carlo,
                 evolution_data=evolution_data,
                 store_impact=store_impact,
             )
             
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération des simulations: {str(e)}")
+
+@router.post("/simulations/batch", response_model=BatchSimulationResponse)
+async def simulate_batch(batch: BatchSimulationRequest):
+    """Simulations vectorisées sur une grille ou une liste de jeux de paramètres"""
+    if (batch.grid is None) == (batch.parameter_sets is None):
+        raise HTTPException(status_code=400, detail="Fournir soit 'grid', soit 'parameter_sets'")
+
+    if batch.grid is not None:
+        size = 1
+        for values in batch.grid.values():
+            size *= len(values)
+        names = set(batch.grid)
+    else:
+        size = len(batch.parameter_sets)
+        names = {name for record in batch.parameter_sets for name in record}
+
+    unknown = names - set(PARAMETER_DEFAULTS) - {'period'}
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Paramètres inconnus: {', '.join(sorted(unknown))}")
+    if size > settings.SIMULATION_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"Lot trop volumineux: {size} > {settings.SIMULATION_BATCH_MAX}")
+
+    try:
+        inputs = expand_grid(batch.grid) if batch.grid is not None else records_to_columns(batch.parameter_sets)
+        results = run_batch(batch.simulation_type, inputs, batch.period, size)
+        return BatchSimulationResponse(
+            simulation_type=batch.simulation_type,
+            count=size,
+            parameters=inputs,
+            results=results
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors du calcul des simulations: {str(e)}")
@@ -0,0 +1,45 @@
+# ============================================
+# app/routers/timeseries.py - Endpoints Séries temporelles
+# ============================================
+from fastapi import APIRouter, HTTPException
+from datetime import date, timedelta
+from typing import Optional
+
+from config import settings
+from models.timeseries import SeriesResponse
+from services.cache import cached
+from services.timeseries import GRANULARITES, fetch_series, point_count
+
+router = APIRouter()
+
+@router.get("/series", response_model=SeriesResponse)
+@cached("series", ttl=120, swr=300, tags=("ventes",))
+async def get_series(
+    granularite: str = "jour",
+    date_debut: Optional[date] = None,
+    date_fin: Optional[date] = None,
+    magasin_id: Optional[int] = None,
+    region_id: Optional[int] = None,
+    categorie_id: Optional[int] = None
+):
+    """
+    CA, marge, transactions et objectif par période (jour, semaine, mois,
+    trimestre, annee) entre date_debut et date_fin, pour un magasin, une
+    région et/ou une catégorie (30 derniers jours par défaut)
+    """
+    if granularite not in GRANULARITES:
+        raise HTTPException(status_code=400, detail=f"granularite doit valoir: {', '.join(GRANULARITES)}")
+    date_fin = date_fin or date.today()
+    date_debut = date_debut or date_fin - timedelta(days=30)
+    if date_debut > date_fin:
+        raise HTTPException(status_code=400, detail="date_debut doit précéder date_fin")
+    if point_count(date_debut, date_fin, granularite) > settings.TIMESERIES_MAX_POINTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Plus de {settings.TIMESERIES_MAX_POINTS} points : choisir une granularité plus large"
+        )
+
+    try:
+        return await fetch_series(granularite, date_debut, date_fin, magasin_id, region_id, categorie_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur serveur: {str(e)}")
@@ -0,0 +1,141 @@
+# ============================================
+# app/services/analysis_queue.py - File d'analyses n8n en tâche de fond
+# ============================================
+"""
+Les endpoints soumettent leurs données et répondent immédiatement avec un
+identifiant d'analyse. Des workers envoient les payloads à n8n depuis une
+file bornée ; les payloads identiques (même hash de contenu) partagent la
+même analyse, dont le résultat (ou l'erreur) est conservé
+ANALYSIS_TTL_SECONDS : les réponses en cache qui pointent vers cette analyse
+restent résolubles.
+"""
+import asyncio
+import hashlib
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from config import settings
+from services.n8n_webhook import send_to_n8n
+
+PENDING = "pending"
+DONE = "done"
+ERROR = "error"
+REJECTED = "rejected"
+
+@dataclass
+class AnalysisEntry:
+    """Analyse en cours ou terminée"""
+    id: str
+    payload: dict[str, Any]
+    status: str = PENDING
+    result: dict | None = None
+    created_at: float = field(default_factory=time.monotonic)
+    completed_at: float | None = None
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def expired(self, now: float) -> bool:
+        if self.completed_at is None:
+            return False
+        return now - self.completed_at > settings.ANALYSIS_TTL_SECONDS
+
+_entries: dict[str, AnalysisEntry] = {}
+_queue: asyncio.Queue | None = None
+_workers: list[asyncio.Task] = []
+
+def payload_hash(payload: dict[str, Any]) -> str:
+    """Hash de contenu stable d'un payload"""
+    encoded = json.dumps(payload, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()[:32]
+
+def _purge(now: float):
+    for key in [k for k, e in _entries.items() if e.expired(now)]:
+        del _entries[key]
+
+def submit(payload: dict[str, Any]) -> AnalysisEntry:
+    """
+    Soumet un payload à analyser sans attendre n8n.
+    Retourne l'analyse existante si le même payload est déjà connu.
+    """
+    now = time.monotonic()
+    _purge(now)
+
+    analysis_id = payload_hash(payload)
+    entry = _entries.get(analysis_id)
+    if entry:
+        return entry
+
+    entry = AnalysisEntry(id=analysis_id, payload=payload)
+    if _queue is None:
+        entry.status = REJECTED
+        entry.result = {"error": "File d'analyse non démarrée"}
+        return entry
+
+    try:
+        _queue.put_nowait(entry)
+    except asyncio.QueueFull:
+        entry.status = REJECTED
+        entry.result = {"error": "File d'analyse saturée"}
+        return entry
+
+    _entries[analysis_id] = entry
+    return entry
+
+def get(analysis_id: str) -> AnalysisEntry | None:
+    """Récupère une analyse par son identifiant"""
+    _purge(time.monotonic())
+    return _entries.get(analysis_id)
+
+async def wait(analysis_id: str, timeout: float) -> AnalysisEntry | None:
+    """Attend la fin d'une analyse, au plus `timeout` secondes"""
+    entry = get(analysis_id)
+    if entry and entry.status == PENDING:
+        try:
+            await asyncio.wait_for(entry.done.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+    return entry
+
+async def _worker():
+    while True:
+        entry = await _queue.get()
+        try:
+            result = await send_to_n8n(entry.payload)
+            if result is None or "error" in result:
+                entry.status = ERROR
+            else:
+                entry.status = DONE
+            entry.result = result
+        except Exception as e:
+            entry.status = ERROR
+            entry.result = {"error": str(e)}
+        finally:
+            entry.completed_at = time.monotonic()
+            entry.done.set()
+            _queue.task_done()
+
+def start_workers():
+    """Démarre les workers d'analyse"""
+    global _queue
+    if _workers:
+        return
+    _queue = asyncio.Queue(maxsize=settings.ANALYSIS_QUEUE_SIZE)
+    for _ in range(settings.ANALYSIS_WORKERS):
+        _workers.append(asyncio.create_task(_worker()))
+
+async def stop_workers():
+    """Arrête les workers ; les analyses en attente sont terminées en erreur"""
+    global _queue
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    now = time.monotonic()
+    for entry in _entries.values():
+        if entry.status == PENDING:
+            entry.status = ERROR
+            entry.result = {"error": "File d'analyse arrêtée"}
+            entry.completed_at = now
+            entry.done.set()
+    _queue = None
@@ -0,0 +1,177 @@
+# ============================================
+# app/services/batch_calculations.py - Simulations vectorisées
+# ============================================
+"""
+Version NumPy de `calculate_simulation_results` : évalue d'un coup des
+milliers de jeux de paramètres. Les formules reprennent l'ordre des
+opérations du calcul scalaire pour produire des résultats identiques.
+"""
+import itertools
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from services.calculations import BASE_MARGIN, BASE_REVENUE, PERIOD_MULTIPLIERS
+
+# Paramètres numériques utilisés par les calculs et leurs valeurs par défaut
+# (un paramètre absent ou nul prend la valeur par défaut, comme `x or défaut`)
+PARAMETER_DEFAULTS = {
+    'discount': 20,
+    'marketing_budget': 50000,
+    'traffic_increase': 25,
+    'monthly_revenue': 120000,
+    'investment': 250000,
+    'cost_reduction': 5,
+    'implementation_cost': 25000,
+    'price_change': -10,
+}
+
+# Élasticité prix du modèle scalaire ; une colonne 'elasticity' peut la
+# remplacer (tirages Monte Carlo)
+PRICE_ELASTICITY = 1.5
+
+RESULT_FIELDS = [
+    'revenue_impact', 'margin_impact', 'cost_impact',
+    'revenue_percent', 'margin_percent', 'cost_percent', 'roi',
+    'optimistic_revenue', 'optimistic_margin',
+    'realistic_revenue', 'realistic_margin',
+    'pessimistic_revenue', 'pessimistic_margin',
+]
+
+def _param(columns: Dict[str, np.ndarray], name: str, size: int) -> np.ndarray:
+    """Colonne de paramètre avec la valeur par défaut pour les absents ou nuls"""
+    default = PARAMETER_DEFAULTS[name]
+    values = columns.get(name)
+    if values is None:
+        return np.full(size, default, dtype=float)
+    return np.where(np.isnan(values) | (values == 0), default, values)
+
+def _period_multipliers(periods: np.ndarray) -> np.ndarray:
+    codes, inverse = np.unique(periods.astype(str), return_inverse=True)
+    multipliers = np.array([PERIOD_MULTIPLIERS.get(code, 1) for code in codes], dtype=float)
+    return multipliers[inverse]
+
+def calculate_simulation_results_batch(
+    simulation_type: str,
+    columns: Dict[str, np.ndarray],
+    periods: np.ndarray,
+) -> Dict[str, np.ndarray]:
+    """
+    Calcule les résultats pour N jeux de paramètres.
+    `columns` associe un nom de paramètre à un tableau float de taille N
+    (NaN = absent), `periods` est un tableau de N codes de période.
+    """
+    size = len(periods)
+    base_revenue = BASE_REVENUE
+    base_margin = BASE_MARGIN
+    base_costs = base_revenue * (1 - base_margin)
+    period_multiplier = _period_multipliers(periods)
+
+    zeros = np.zeros(size)
+    revenue_impact, margin_impact, cost_impact, roi = zeros, zeros, zeros, zeros
+
+    if simulation_type == 'promotion':
+        discount = _param(columns, 'discount', size)
+        marketing_budget = _param(columns, 'marketing_budget', size)
+        traffic_increase = _param(columns, 'traffic_increase', size)
+
+        revenue_increase = base_revenue * (traffic_increase / 100) * 0.7
+        revenue_impact = (revenue_increase - marketing_budget) * period_multiplier
+        margin_reduction = discount * 0.015
+        margin_impact = (revenue_increase * (base_margin - margin_reduction)) * period_multiplier
+        cost_impact = -marketing_budget * period_multiplier
+        roi = np.where(
+            marketing_budget > 0,
+            (margin_impact / np.where(marketing_budget > 0, marketing_budget, 1)) * 100,
+            0,
+        )
+
+    elif simulation_type == 'new_store':
+        monthly_revenue = _param(columns, 'monthly_revenue', size)
+        investment = _param(columns, 'investment', size)
+
+        revenue_impact = monthly_revenue * period_multiplier
+        margin_impact = monthly_revenue * base_margin * period_multiplier
+        cost_impact = investment
+        roi = np.where(
+            investment > 0,
+            (margin_impact / np.where(investment > 0, investment, 1)) * 100,
+            0,
+        )
+
+    elif simulation_type == 'cost_optimization':
+        cost_reduction = _param(columns, 'cost_reduction', size)
+        implementation_cost = _param(columns, 'implementation_cost', size)
+
+        monthly_savings = base_costs * (cost_reduction / 100)
+        cost_impact = -(monthly_savings * period_multiplier - implementation_cost)
+        margin_impact = monthly_savings * period_multiplier
+        roi = np.where(
+            implementation_cost > 0,
+            (margin_impact / np.where(implementation_cost > 0, implementation_cost, 1)) * 100,
+            0,
+        )
+
+    elif simulation_type == 'price_change':
+        price_change = _param(columns, 'price_change', size)
+
+        elasticity = columns.get('elasticity', PRICE_ELASTICITY)
+        volume_change = -price_change * elasticity
+        revenue_change = base_revenue * (price_change / 100) + base_revenue * (volume_change / 100)
+        revenue_impact = revenue_change * period_multiplier
+        margin_impact = np.where(
+            price_change > 0,
+            revenue_change * (base_margin + 0.05) * period_multiplier,
+            revenue_change * (base_margin - 0.02) * period_multiplier,
+        )
+        roi = np.where(price_change > 0, 400.0, 200.0)
+
+    base_monthly_margin = base_revenue * base_margin
+    results = {
+        'revenue_impact': revenue_impact,
+        'margin_impact': margin_impact,
+        'cost_impact': cost_impact,
+        'revenue_percent': (revenue_impact / (base_revenue * period_multiplier)) * 100,
+        'margin_percent': (margin_impact / (base_monthly_margin * period_multiplier)) * 100,
+        'cost_percent': (cost_impact / (base_costs * period_multiplier)) * 100,
+        'roi': roi,
+        'optimistic_revenue': revenue_impact * 1.2,
+        'optimistic_margin': margin_impact * 1.24,
+        'realistic_revenue': revenue_impact,
+        'realistic_margin': margin_impact,
+        'pessimistic_revenue': revenue_impact * 0.85,
+        'pessimistic_margin': margin_impact * 0.74,
+    }
+    return {name: np.broadcast_to(results[name], (size,)).astype(float) for name in RESULT_FIELDS}
+
+def expand_grid(grid: Dict[str, List[Any]]) -> Dict[str, List[Any]]:
+    """Produit cartésien d'une grille de paramètres, sous forme de colonnes"""
+    names = list(grid)
+    combos = list(itertools.product(*(grid[name] for name in names)))
+    return {name: [combo[i] for combo in combos] for i, name in enumerate(names)}
+
+def records_to_columns(records: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """Liste de jeux de paramètres -> colonnes (None pour les absents)"""
+    names = sorted({name for record in records for name in record})
+    return {name: [record.get(name) for record in records] for name in names}
+
+def run_batch(
+    simulation_type: str,
+    inputs: Dict[str, List[Any]],
+    default_period: str,
+    size: Optional[int] = None,
+) -> Dict[str, List[float]]:
+    """Exécute le calcul vectorisé à partir de colonnes de paramètres bruts"""
+    if size is None:
+        size = len(next(iter(inputs.values()))) if inputs else 1
+    periods = np.array(
+        [p or default_period for p in inputs['period']] if 'period' in inputs else [default_period] * size,
+        dtype=object,
+    )
+    columns = {
+        name: np.array([np.nan if v is None else v for v in values], dtype=float)
+        for name, values in inputs.items()
+        if name in PARAMETER_DEFAULTS
+    }
+    results = calculate_simulation_results_batch(simulation_type, columns, periods)
+    return {name: values.tolist() for name, values in results.items()}
@@ -0,0 +1,211 @@
+# ============================================
+# app/services/cache.py - Cache des réponses en mémoire
+# ============================================
+"""
+Cache applicatif des endpoints de lecture :
+
+- TTL par endpoint, puis fenêtre stale-while-revalidate pendant laquelle
+  la valeur périmée est servie pendant qu'un rafraîchissement tourne
+- éviction LRU bornée par la taille estimée des réponses (CACHE_MAX_BYTES)
+- coalescence : les requêtes concurrentes sur une même clé absente
+  partagent une seule exécution de la requête SQL
+- invalidation explicite par tag (ex. "scenarios" après une écriture) ;
+  pendant DB_REPLICA_MAX_LAG_SECONDS après l'invalidation d'un tag, ses
+  entrées sont rechargées depuis le primaire (un réplica en retard
+  remettrait en cache l'état d'avant l'écriture pour tout le TTL)
+
+Usage :
+    @router.get("/kpis")
+    @cached("kpis", ttl=60, swr=120, tags=("ventes",))
+    async def get_kpis(): ...
+"""
+import asyncio
+import functools
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Iterable
+
+from fastapi.encoders import jsonable_encoder
+
+from config import settings
+from database import primary_reads
+
+class _Entry:
+    __slots__ = ("value", "size", "expires_at", "stale_until", "tags")
+
+    def __init__(self, value: Any, size: int, expires_at: float, stale_until: float, tags: tuple):
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+        self.tags = tags
+
+def estimate_size(value: Any) -> int:
+    """Taille estimée d'une réponse : longueur de sa forme JSON"""
+    return len(json.dumps(jsonable_encoder(value), default=str))
+
+class ResponseCache:
+    """Cache LRU borné en octets avec coalescence et stale-while-revalidate"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._inflight_tags: dict[str, tuple] = {}
+        self._tag_versions: dict[str, int] = {}
+        self._generation = 0     # incrémenté par une invalidation globale
+        self._invalidated_at: dict[str, float] = {}
+        self._all_invalidated_at = float("-inf")
+        self._size = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ---------- Lecture ----------
+
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: float,
+        swr: float = 0,
+        tags: Iterable[str] = (),
+    ) -> Any:
+        """Retourne la valeur en cache ou l'obtient via `loader`"""
+        tags = tuple(tags)
+        now = time.monotonic()
+        entry = self._entries.get(key)
+
+        if entry is not None:
+            if now < entry.expires_at:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry.value
+            if now < entry.stale_until:
+                self.stale_hits += 1
+                self._entries.move_to_end(key)
+                if key not in self._inflight:
+                    self._start_load(key, loader, ttl, swr, tags)
+                return entry.value
+            self._remove(key)
+
+        self.misses += 1
+        task = self._inflight.get(key) or self._start_load(key, loader, ttl, swr, tags)
+        # shield : l'annulation d'un appelant n'interrompt pas les autres
+        return await asyncio.shield(task)
+
+    def _recently_invalidated(self, tags: tuple) -> bool:
+        """Invalidation assez récente pour que les réplicas ne l'aient pas encore vue"""
+        since = time.monotonic() - settings.DB_REPLICA_MAX_LAG_SECONDS
+        if self._all_invalidated_at >= since:
+            return True
+        return any(self._invalidated_at.get(tag, float("-inf")) >= since for tag in tags)
+
+    def _start_load(self, key, loader, ttl, swr, tags) -> asyncio.Task:
+        versions = {tag: self._tag_versions.get(tag, 0) for tag in tags}
+        generation = self._generation
+        if self._recently_invalidated(tags):
+            # La tâche hérite du contexte : ses lectures ANALYTICS vont au primaire
+            with primary_reads():
+                task = asyncio.ensure_future(loader())
+        else:
+            task = asyncio.ensure_future(loader())
+        self._inflight[key] = task
+        self._inflight_tags[key] = tags
+
+        def done(t: asyncio.Task):
+            if self._inflight.get(key) is t:
+                self._inflight.pop(key)
+                self._inflight_tags.pop(key)
+            if t.cancelled() or t.exception() is not None:
+                return
+            # Une invalidation survenue pendant le chargement rend la valeur obsolète
+            if self._generation != generation:
+                return
+            if any(self._tag_versions.get(tag, 0) != v for tag, v in versions.items()):
+                return
+            self._store(key, t.result(), ttl, swr, tags)
+
+        task.add_done_callback(done)
+        return task
+
+    # ---------- Écriture / éviction ----------
+
+    def _store(self, key: str, value: Any, ttl: float, swr: float, tags: tuple):
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        self._remove(key)
+        now = time.monotonic()
+        self._entries[key] = _Entry(value, size, now + ttl, now + ttl + swr, tags)
+        self._size += size
+        while self._size > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry.size
+
+    def invalidate(self, *tags: str):
+        """Supprime les entrées portant l'un des tags (toutes si aucun tag)"""
+        now = time.monotonic()
+        if not tags:
+            self._entries.clear()
+            self._inflight.clear()
+            self._inflight_tags.clear()
+            self._size = 0
+            self._all_invalidated_at = now
+            self._generation += 1
+            return
+        for tag in tags:
+            self._tag_versions[tag] = self._tag_versions.get(tag, 0) + 1
+            self._invalidated_at[tag] = now
+        for key in [k for k, e in self._entries.items() if set(e.tags) & set(tags)]:
+            self._remove(key)
+        # Chargements en cours, lancés avant l'écriture : plus partagés
+        for key in [k for k, t in self._inflight_tags.items() if set(t) & set(tags)]:
+            self._inflight.pop(key)
+            self._inflight_tags.pop(key)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+response_cache = ResponseCache(settings.CACHE_MAX_BYTES)
+
+def _make_key(name: str, args: tuple, kwargs: dict) -> str:
+    return f"{name}:{args!r}:{sorted(kwargs.items())!r}"
+
+def cached(name: str, ttl: float, swr: float = 0, tags: Iterable[str] = ()):
+    """Met en cache le résultat d'un endpoint selon ses arguments"""
+    tags = tuple(tags)
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if not settings.CACHE_ENABLED:
+                return await func(*args, **kwargs)
+            key = _make_key(name, args, kwargs)
+            return await response_cache.get_or_load(
+                key, lambda: func(*args, **kwargs), ttl, swr, tags
+            )
+        # Tags lus par le flux du dashboard (widgets à recalculer)
+        wrapper.cache_tags = tags
+        return wrapper
+
+    return decorator
+
+def invalidate(*tags: str):
+    """Hook d'invalidation à appeler après une écriture"""
+    response_cache.invalidate(*tags)
@@ -3,24 +3,32 @@
 # ============================================
 
 from typing import List
-import uuid
 from models.scenario import ScenarioParameters
-from models.simulation import SimulationResult, EvolutionItem, StoreImpact
+from models.simulation import SimulationResult, EvolutionItem
+
+# Version du modèle de simulation : à incrémenter quand une formule change,
+# les résultats enregistrés avec une version antérieure sont alors recalculés
+MODEL_VERSION = 2
+
+BASE_REVENUE = 2400000  # CA mensuel de base
+BASE_MARGIN = 0.35
+
+# Multiplicateur de période
+PERIOD_MULTIPLIERS = {
+    '1_month': 1,
+    '3_months': 3,
+    '6_months': 6,
+    '12_months': 12
+}
 
 def calculate_simulation_results(simulation_type: str, parameters: ScenarioParameters, period: str) -> SimulationResult:
     """Calcule les résultats d'une simulation basée sur le type et les paramètres"""
     
-    base_revenue = 2400000  # CA mensuel de base
-    base_margin = 0.35
+    base_revenue = BASE_REVENUE
+    base_margin = BASE_MARGIN
     base_costs = base_revenue * (1 - base_margin)
     
-    # Multiplicateur de période
-    period_multiplier = {
-        '1_month': 1,
-        '3_months': 3,
-        '6_months': 6,
-        '12_months': 12
-    }.get(period, 1)
+    period_multiplier = PERIOD_MULTIPLIERS.get(period, 1)
     
     results = {
         'revenue_impact': 0,
@@ -115,13 +123,8 @@ def calculate_simulation_results(simulation_type: str, parameters: ScenarioParam
 
 def generate_evolution_data(base_impact: float, period: str) -> List[EvolutionItem]:
     """Génère les données d'évolution temporelle"""
-    base_revenue = 2400000
-    months = {
-        '1_month': 1,
-        '3_months': 3,
-        '6_months': 6,
-        '12_months': 12
-    }.get(period, 6)
+    base_revenue = BASE_REVENUE
+    months = PERIOD_MULTIPLIERS.get(period, 6)
     
     evolution = []
     for i in range(months):
@@ -133,21 +136,3 @@ def generate_evolution_data(base_impact: float, period: str) -> List[EvolutionIt
         ))
     
     return evolution
-
-def generate_store_impact() -> List[StoreImpact]:
-    """Génère l'impact par magasin"""
-    stores = ['Paris', 'Lyon', 'Marseille', 'Nice', 'Toulouse', 'Bordeaux']
-    base_impacts = [35000, 28000, 22000, 21000, 19000, 17000]
-    
-    return [
-        StoreImpact(
-            id=str(uuid.uuid4()),        # Génère un id unique
-            impact=impact,
-            ca_prevu=0.0,
-            ca_impact=0.0,
-            marge_prevue=0.0,
-            marge_impact=0.0,
-            details=[]
-        )
-        for store, impact in zip(stores, base_impacts)
-    ]
@@ -0,0 +1,320 @@
+# ============================================
+# app/services/consolidation.py - Consolidation par magasin
+# ============================================
+"""
+Chaque indicateur est agrégé à son propre grain puis joint 1-1 au magasin,
+sans jointure ventes × lignes × stock qui multiplierait les lignes :
+
+- CA et transactions : cumuls magasin × jour
+- marge et taux de stock : cumuls magasin × produit × jour, pondérés par
+  le nombre de lignes vendues, joints au stock au grain (magasin, produit)
+- clients distincts : ventes de la période (un distinct ne se somme pas)
+
+La consolidation hiérarchique (groupe → enseigne → région → magasin) lit
+les cumuls une seule fois et calcule tous les niveaux, sous-totaux et total
+compris, par GROUP BY ROLLUP. La marge d'un nœud est celle de la vue plate
+étendue à ses magasins : moyenne des taux de marge produit pondérée par
+les lignes vendues. Un nœud peut être déplié seul (`noeud`, `profondeur`) :
+seuls ses descendants jusqu'à la profondeur demandée sont agrégés et
+renvoyés.
+"""
+import argparse
+import asyncio
+import re
+from datetime import date
+from typing import Dict, List, Optional
+
+from database import ANALYTICS, init_db, close_db, get_db
+from queries import register
+from models.store import ConsolidationData, ConsolidationHierarchy, ConsolidationNode
+
+# Groupes et enseignes (bases existantes : `python -m services.consolidation install`)
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS groupes (
+    id  SERIAL PRIMARY KEY,
+    nom TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS enseignes (
+    id        SERIAL PRIMARY KEY,
+    nom       TEXT NOT NULL,
+    groupe_id INTEGER REFERENCES groupes (id)
+);
+ALTER TABLE magasins ADD COLUMN IF NOT EXISTS enseigne_id INTEGER REFERENCES enseignes (id);
+CREATE INDEX IF NOT EXISTS idx_magasins_enseigne ON magasins (enseigne_id);
+"""
+
+CONSOLIDATION_SQL = register("consolidation.magasins", """
+    WITH perimetre AS (
+        SELECT id
+        FROM magasins
+        WHERE statut = 'actif'
+            AND ($3::integer IS NULL OR region_id = $3)
+    ),
+    ventes_periode AS (
+        SELECT 
+            magasin_id,
+            SUM(ca_ht) as ca,
+            SUM(nb_transactions) as transactions
+        FROM rollup_ventes_magasin_jour
+        WHERE jour >= $1 AND jour <= $2
+            AND magasin_id IN (SELECT id FROM perimetre)
+        GROUP BY magasin_id
+    ),
+    produits_periode AS (
+        SELECT magasin_id, produit_id, SUM(nb_lignes) as nb_lignes
+        FROM rollup_ventes_produit_jour
+        WHERE jour >= $1 AND jour <= $2
+            AND magasin_id IN (SELECT id FROM perimetre)
+        GROUP BY magasin_id, produit_id
+    ),
+    marges_periode AS (
+        SELECT 
+            pp.magasin_id,
+            SUM(pp.nb_lignes * (p.prix_vente - p.prix_achat) / NULLIF(p.prix_vente, 0) * 100)
+                / NULLIF(SUM(pp.nb_lignes) FILTER (WHERE p.prix_vente <> 0), 0) as marge,
+            SUM(pp.nb_lignes * (s.quantite::float / NULLIF(p.stock_securite, 0)) * 100)
+                / NULLIF(SUM(pp.nb_lignes) FILTER (
+                    WHERE p.stock_securite <> 0 AND s.quantite IS NOT NULL
+                ), 0) as taux_stock
+        FROM produits_periode pp
+        JOIN produits p ON pp.produit_id = p.id
+        LEFT JOIN stock s ON s.magasin_id = pp.magasin_id AND s.produit_id = pp.produit_id
+        GROUP BY pp.magasin_id
+    ),
+    clients_periode AS (
+        SELECT magasin_id, COUNT(DISTINCT client_id) as clients
+        FROM ventes
+        WHERE statut = 'validee'
+            AND date_vente >= $1 AND date_vente < $2 + 1
+            AND magasin_id IN (SELECT id FROM perimetre)
+        GROUP BY magasin_id
+    )
+    SELECT 
+        m.id,
+        m.nom,
+        m.code_magasin as code,
+        COALESCE(r.nom, 'Non classé') as region,
+        ROUND(COALESCE(v.ca, 0) / 1000) as ca,
+        ROUND(m.objectif_ca_mensuel * $4::float8 / 1000) as objectif,
+        ROUND(mg.marge::numeric, 1) as marge,
+        ROUND(mg.taux_stock::numeric) as taux_stock,
+        COALESCE(v.transactions, 0) as transactions,
+        COALESCE(c.clients, 0) as clients
+    FROM magasins m
+    JOIN perimetre pm ON pm.id = m.id
+    LEFT JOIN regions r ON m.region_id = r.id
+    LEFT JOIN ventes_periode v ON m.id = v.magasin_id
+    LEFT JOIN marges_periode mg ON m.id = mg.magasin_id
+    LEFT JOIN clients_periode c ON m.id = c.magasin_id
+    ORDER BY ca DESC
+""")
+
+def prorata_objectif(date_debut: date, date_fin: date) -> float:
+    """Part de l'objectif mensuel couverte par la période, bornes incluses (30 jours = 1 mois)"""
+    return ((date_fin - date_debut).days + 1) / 30
+
+# Taux affiché quand aucune ligne vendue ne permet de calculer la marge
+MARGE_PAR_DEFAUT = 25
+
+def format_marge(marge) -> str:
+    """Taux de marge moyen des lignes vendues, pondéré par leur nombre"""
+    return f"{float(marge or MARGE_PAR_DEFAUT):.1f}"
+
+async def fetch_consolidation(
+    date_debut: date,
+    date_fin: date,
+    region_id: Optional[int] = None,
+) -> List[ConsolidationData]:
+    """Vue consolidée des magasins actifs sur une période"""
+    prorata = prorata_objectif(date_debut, date_fin)
+
+    async with get_db(ANALYTICS) as conn:
+        rows = await CONSOLIDATION_SQL.fetch(conn, date_debut, date_fin, region_id, prorata)
+
+    result = []
+    for row in rows:
+        ca = int(row['ca'] or 0)
+        objectif = int(row['objectif'] or 0)
+        ecart = f"{(((ca - objectif) / objectif) * 100):.1f}" if objectif > 0 else "0.0"
+
+        result.append(ConsolidationData(
+            id=row['id'],
+            name=row['nom'],
+            code=row['code'],
+            region=row['region'],
+            ca=ca,
+            objectif=objectif,
+            ecart=ecart,
+            marge=format_marge(row['marge']),
+            stock=int(row['taux_stock'] or 90),
+            transactions=int(row['transactions'] or 0),
+            clients=int(row['clients'] or 0)
+        ))
+
+    return result
+
+# Niveaux de la hiérarchie, du total au magasin, et préfixe de leur chemin
+NIVEAUX = ("total", "groupe", "enseigne", "region", "magasin")
+PREFIXES = ("g", "e", "r", "m")
+_NOEUD = re.compile(r"^(?:g(\d+)(?:/e(\d+)(?:/r(\d+)(?:/m(\d+))?)?)?)?$")
+
+# Identifiant 0 = non rattaché (magasin sans région, sans enseigne...).
+# ROLLUP (g, e, r, m) = GROUPING SETS ((g, e, r, m), (g, e, r), (g, e), (g), ()) ;
+# niveau 0 (total) à 4 (magasin), filtré par HAVING ($7..$8)
+HIERARCHY_SQL = register("consolidation.hierarchie", """
+    WITH perimetre AS (
+        SELECT
+            m.id,
+            COALESCE(e.groupe_id, 0) as groupe_id,
+            COALESCE(m.enseigne_id, 0) as enseigne_id,
+            COALESCE(m.region_id, 0) as region_id,
+            m.objectif_ca_mensuel
+        FROM magasins m
+        LEFT JOIN enseignes e ON e.id = m.enseigne_id
+        WHERE m.statut = 'actif'
+            AND ($3::integer IS NULL OR COALESCE(e.groupe_id, 0) = $3)
+            AND ($4::integer IS NULL OR COALESCE(m.enseigne_id, 0) = $4)
+            AND ($5::integer IS NULL OR COALESCE(m.region_id, 0) = $5)
+            AND ($6::integer IS NULL OR m.id = $6)
+    ),
+    ventes_periode AS (
+        SELECT 
+            magasin_id,
+            SUM(ca_ht) as ca,
+            SUM(nb_transactions) as transactions
+        FROM rollup_ventes_magasin_jour
+        WHERE jour >= $1 AND jour <= $2
+            AND magasin_id IN (SELECT id FROM perimetre)
+        GROUP BY magasin_id
+    ),
+    marges_periode AS (
+        SELECT
+            rp.magasin_id,
+            SUM(rp.nb_lignes * (p.prix_vente - p.prix_achat) / NULLIF(p.prix_vente, 0) * 100)
+                as marge_ponderee,
+            SUM(rp.nb_lignes) FILTER (WHERE p.prix_vente <> 0) as lignes_marge
+        FROM rollup_ventes_produit_jour rp
+        JOIN produits p ON rp.produit_id = p.id
+        WHERE rp.jour >= $1 AND rp.jour <= $2
+            AND rp.magasin_id IN (SELECT id FROM perimetre)
+        GROUP BY rp.magasin_id
+    ),
+    noeuds AS (
+        SELECT
+            4 - GROUPING(p.groupe_id) - GROUPING(p.enseigne_id)
+              - GROUPING(p.region_id) - GROUPING(p.id) as niveau,
+            p.groupe_id,
+            p.enseigne_id,
+            p.region_id,
+            p.id as magasin_id,
+            COALESCE(SUM(v.ca), 0) as ca,
+            ROUND((SUM(mg.marge_ponderee) / NULLIF(SUM(mg.lignes_marge), 0))::numeric, 1) as marge,
+            COALESCE(SUM(v.transactions), 0) as transactions,
+            SUM(p.objectif_ca_mensuel) as objectif_mensuel,
+            COUNT(*) as magasins
+        FROM perimetre p
+        LEFT JOIN ventes_periode v ON v.magasin_id = p.id
+        LEFT JOIN marges_periode mg ON mg.magasin_id = p.id
+        GROUP BY ROLLUP (p.groupe_id, p.enseigne_id, p.region_id, p.id)
+        HAVING 4 - GROUPING(p.groupe_id) - GROUPING(p.enseigne_id)
+                 - GROUPING(p.region_id) - GROUPING(p.id) BETWEEN $7 AND $8
+    )
+    SELECT
+        n.*,
+        CASE n.niveau
+            WHEN 0 THEN 'Total'
+            WHEN 1 THEN COALESCE(g.nom, 'Sans groupe')
+            WHEN 2 THEN COALESCE(e.nom, 'Sans enseigne')
+            WHEN 3 THEN COALESCE(r.nom, 'Non classé')
+            ELSE m.nom
+        END as nom
+    FROM noeuds n
+    LEFT JOIN groupes g ON n.niveau = 1 AND g.id = n.groupe_id
+    LEFT JOIN enseignes e ON n.niveau = 2 AND e.id = n.enseigne_id
+    LEFT JOIN regions r ON n.niveau = 3 AND r.id = n.region_id
+    LEFT JOIN magasins m ON n.niveau = 4 AND m.id = n.magasin_id
+    ORDER BY n.niveau, n.ca DESC
+""")
+
+def parse_node(noeud: str) -> List[int]:
+    """Chemin "g1/e2/r3/m45" -> [1, 2, 3, 45] ("" = total) ; ValueError si invalide"""
+    match = _NOEUD.match(noeud)
+    if match is None:
+        raise ValueError(f"Nœud invalide: {noeud}")
+    return [int(part) for part in match.groups() if part is not None]
+
+def _node_id(path: List[int]) -> str:
+    return "/".join(f"{prefix}{part}" for prefix, part in zip(PREFIXES, path))
+
+def _node(row, path: List[int], prorata: float) -> ConsolidationNode:
+    ca = float(row['ca'])
+    objectif = float(row['objectif_mensuel'] or 0) * prorata
+    return ConsolidationNode(
+        id=_node_id(path),
+        niveau=NIVEAUX[len(path)],
+        nom=row['nom'] or "",
+        ca=round(ca / 1000),
+        objectif=round(objectif / 1000),
+        ecart=f"{((ca - objectif) / objectif * 100):.1f}" if objectif > 0 else "0.0",
+        marge=format_marge(row['marge']),
+        transactions=int(row['transactions']),
+        magasins=int(row['magasins']),
+        a_enfants=len(path) < len(PREFIXES) and int(row['magasins']) > 0,
+    )
+
+async def fetch_hierarchy(
+    date_debut: date,
+    date_fin: date,
+    noeud: str = "",
+    profondeur: int = 1,
+) -> Optional[ConsolidationHierarchy]:
+    """Nœud et ses descendants sur `profondeur` niveaux (None si le nœud est vide)"""
+    path = parse_node(noeud)
+    filters = path + [None] * (len(PREFIXES) - len(path))
+    niveau_max = min(len(path) + profondeur, len(PREFIXES))
+    prorata = prorata_objectif(date_debut, date_fin)
+
+    async with get_db(ANALYTICS) as conn:
+        rows = await HIERARCHY_SQL.fetch(
+            conn, date_debut, date_fin, *filters, len(path), niveau_max
+        )
+
+    # Lignes triées par niveau : chaque parent précède ses enfants
+    nodes: Dict[tuple, ConsolidationNode] = {}
+    for row in rows:
+        row_path = [row['groupe_id'], row['enseigne_id'], row['region_id'], row['magasin_id']][:row['niveau']]
+        node = _node(row, row_path, prorata)
+        if row['niveau'] < niveau_max:
+            node.enfants = []
+        nodes[tuple(row_path)] = node
+        parent = nodes.get(tuple(row_path[:-1]))
+        if row['niveau'] > len(path) and parent is not None:
+            parent.enfants.append(node)
+
+    root = nodes.get(tuple(path))
+    if root is None:
+        return None
+    return ConsolidationHierarchy(date_debut=date_debut, date_fin=date_fin, noeud=root)
+
+async def install_schema():
+    """Tables groupes et enseignes, rattachement des magasins"""
+    async with get_db() as conn:
+        await conn.execute(SCHEMA_SQL)
+    print("✅ Schéma groupes / enseignes installé")
+
+# ============================================
+# CLI
+# ============================================
+
+async def _main(command: str):
+    await init_db()
+    try:
+        if command == "install":
+            await install_schema()
+    finally:
+        await close_db()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Consolidation multi-enseignes")
+    parser.add_argument("command", choices=["install"])
+    asyncio.run(_main(parser.parse_args().command))
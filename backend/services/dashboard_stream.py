@@ -0,0 +1,347 @@
+# ============================================
+# app/services/dashboard_stream.py - Flux temps réel du dashboard
+# ============================================
+"""
+Un seul calcul par widget et par changement, diffusé à tous les dashboards
+ouverts (GET /api/stream/dashboard, Server-Sent Events), au lieu d'un
+rechargement complet par client.
+
+Détection des changements : notifications PostgreSQL, reçues par tous les
+processus de l'API sur une connexion dédiée.
+- canal `dashboard`, la charge utile est un tag de cache : "ventes" (cumuls
+  rafraîchis), "budgets" et "magasins" (triggers), "previsions" (calcul des
+  prévisions)
+- canal `stock_alertes` (services.stock_alerts) : tag "stock"
+
+Les notifications sont regroupées pendant DASHBOARD_STREAM_DEBOUNCE_MS. Les
+widgets dont les tags ont changé sont recalculés une fois, après
+invalidation de leur cache, avec les lectures sur le primaire (un réplica
+en retard relirait l'état d'avant la notification et ne verrait aucun
+changement), puis chaque résultat est comparé au précédent.
+Seules les différences partent (opérations JSON Patch, RFC 6902), ou le
+widget entier si la différence est plus grosse que lui.
+
+Chaque message est sérialisé une fois pour tous les abonnés. Chaque
+connexion garde au plus DASHBOARD_STREAM_BUFFER_BYTES de messages en
+attente. Au-delà, le client est trop lent : sa file est vidée et il recevra
+un snapshot à jour dès qu'il lira de nouveau. La mémoire par connexion est
+donc bornée, et un client lent ne ralentit pas les autres.
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Set
+
+import asyncpg
+from fastapi.encoders import jsonable_encoder
+
+from config import settings
+from database import init_db, close_db, get_db, primary_reads
+from services.cache import invalidate
+from services.metrics import Counter, Gauge
+
+CHANNEL = "dashboard"
+STOCK_CHANNEL = "stock_alertes"
+
+SCHEMA_SQL = """
+CREATE OR REPLACE FUNCTION dashboard_notifier() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('""" + CHANNEL + """', TG_ARGV[0]);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_dashboard_budgets ON budgets;
+DROP TRIGGER IF EXISTS trg_dashboard_magasins ON magasins;
+CREATE TRIGGER trg_dashboard_budgets
+    AFTER INSERT OR UPDATE OR DELETE ON budgets
+    FOR EACH STATEMENT EXECUTE FUNCTION dashboard_notifier('budgets');
+CREATE TRIGGER trg_dashboard_magasins
+    AFTER INSERT OR UPDATE OR DELETE ON magasins
+    FOR EACH STATEMENT EXECUTE FUNCTION dashboard_notifier('magasins');
+"""
+
+# À exécuter dans la transaction d'écriture : notification envoyée au commit
+NOTIFY_SQL = "SELECT pg_notify('" + CHANNEL + "', $1)"
+
+STREAM_MESSAGES = Counter(
+    "epm_dashboard_stream_messages_total",
+    "Messages du flux dashboard par type (patch, widget, snapshot, resync)",
+    ("type",),
+)
+
+def _json_pointer(path: List[Any]) -> str:
+    return "".join("/" + str(p).replace("~", "~0").replace("/", "~1") for p in path)
+
+def json_diff(old: Any, new: Any, path: Optional[List[Any]] = None) -> List[Dict[str, Any]]:
+    """Opérations JSON Patch qui transforment `old` en `new`"""
+    path = path or []
+    if old == new:
+        return []
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = []
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": _json_pointer(path + [key])})
+        for key, value in new.items():
+            if key not in old:
+                ops.append({"op": "add", "path": _json_pointer(path + [key]), "value": value})
+            else:
+                ops.extend(json_diff(old[key], value, path + [key]))
+        return ops
+    if isinstance(old, list) and isinstance(new, list):
+        common = min(len(old), len(new))
+        ops = []
+        for i in range(common):
+            ops.extend(json_diff(old[i], new[i], path + [i]))
+        for i in range(common, len(new)):
+            ops.append({"op": "add", "path": _json_pointer(path + [i]), "value": new[i]})
+        # Suppressions depuis la fin : les indices restent valides
+        for i in range(len(old) - 1, common - 1, -1):
+            ops.append({"op": "remove", "path": _json_pointer(path + [i])})
+        return ops
+    return [{"op": "replace", "path": _json_pointer(path), "value": new}]
+
+def _comparable(result: Any) -> Any:
+    # La durée d'exécution change à chaque calcul : ce n'est pas un changement
+    if isinstance(result, dict):
+        return {k: v for k, v in result.items() if k != "duration_ms"}
+    return result
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+class Subscriber:
+    """File d'un client bornée en octets ; débordement = snapshot à la place"""
+
+    def __init__(self, widgets: List[str]):
+        self.widgets = set(widgets)
+        self.messages: Deque[str] = deque()
+        self.size = 0
+        self.resync = False
+        self.ready = asyncio.Event()
+        self.snapshot: Optional[str] = None   # état à l'abonnement, envoyé en premier
+
+    def push(self, widget: str, message: str):
+        if widget not in self.widgets or self.resync:
+            return
+        if self.size + len(message) > settings.DASHBOARD_STREAM_BUFFER_BYTES:
+            self.messages.clear()
+            self.size = 0
+            self.resync = True
+        else:
+            self.messages.append(message)
+            self.size += len(message)
+        self.ready.set()
+
+    def drain(self) -> List[str]:
+        messages = list(self.messages)
+        self.messages.clear()
+        self.size = 0
+        self.ready.clear()
+        return messages
+
+class DashboardHub:
+    """État courant des widgets, abonnés et recalculs"""
+
+    def __init__(self):
+        self.widgets: Dict[str, Callable[[], Awaitable[Any]]] = {}
+        self.tags: Dict[str, tuple] = {}
+        self.run_widget: Optional[Callable[[str], Awaitable[Any]]] = None
+        self.state: Dict[str, Dict[str, Any]] = {}      # widget -> {"version", "result"}
+        self.subscribers: Set[Subscriber] = set()
+        self.dirty: Set[str] = set()
+        self.changed = asyncio.Event()
+        self._lock = asyncio.Lock()
+
+    def configure(self, widgets: Dict[str, Callable], run_widget: Callable[[str], Awaitable[Any]], tags: Dict[str, Iterable[str]]):
+        """Widgets du dashboard, fonction d'exécution isolée, tags supplémentaires par widget"""
+        self.widgets = widgets
+        self.run_widget = run_widget
+        self.tags = {
+            name: tuple(getattr(func, "cache_tags", ())) + tuple(tags.get(name, ()))
+            for name, func in widgets.items()
+        }
+
+    def notify(self, tag: str):
+        """Tag modifié (None = tout) : widgets concernés à recalculer"""
+        names = {name for name, tags in self.tags.items() if tag is None or tag in tags}
+        if names:
+            self.dirty |= names
+            self.changed.set()
+
+    async def _compute(self, names: Iterable[str]):
+        """Recalcule des widgets (un calcul par widget) et diffuse les différences"""
+        names = list(names)
+        results = await asyncio.gather(*(self.run_widget(name) for name in names))
+        for name, result in zip(names, results):
+            new = jsonable_encoder(result)
+            current = self.state.get(name)
+            if current is None:
+                self.state[name] = {"version": 1, "result": new}
+                continue
+            if _comparable(current["result"]) == _comparable(new):
+                continue
+            version = current["version"] + 1
+            ops = json_diff(current["result"], new)
+            full = _sse("widget", {"widget": name, "version": version, "result": new})
+            patch = _sse("patch", {"widget": name, "version": version, "ops": ops})
+            message, kind = (patch, "patch") if len(patch) < len(full) else (full, "widget")
+            self.state[name] = {"version": version, "result": new}
+            STREAM_MESSAGES.labels(kind).inc()
+            for subscriber in list(self.subscribers):
+                subscriber.push(name, message)
+
+    async def ensure(self, names: Iterable[str]):
+        """Calcule les widgets encore sans état (premier abonné)"""
+        async with self._lock:
+            missing = [name for name in names if name not in self.state]
+            if missing:
+                await self._compute(missing)
+
+    def snapshot(self, names: Iterable[str]) -> str:
+        STREAM_MESSAGES.labels("snapshot").inc()
+        return _sse("snapshot", {name: self.state[name] for name in names if name in self.state})
+
+    async def subscribe(self, names: List[str]) -> Subscriber:
+        await self.ensure(names)
+        subscriber = Subscriber(names)
+        # Snapshot pris à l'inscription, sans attente entre les deux : les
+        # messages reçus ensuite portent tous une version plus récente
+        self.subscribers.add(subscriber)
+        subscriber.snapshot = self.snapshot(names)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+
+    async def stream(self, subscriber: Subscriber):
+        """Messages SSE d'un abonné : snapshot, différences, heartbeat"""
+        yield f"retry: {int(settings.DASHBOARD_STREAM_RETRY_MS)}\n\n"
+        yield subscriber.snapshot
+        while True:
+            try:
+                await asyncio.wait_for(subscriber.ready.wait(), settings.DASHBOARD_STREAM_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+                continue
+            if subscriber.resync:
+                # Client trop lent : état courant plutôt que l'historique manqué
+                subscriber.resync = False
+                subscriber.drain()
+                STREAM_MESSAGES.labels("resync").inc()
+                yield self.snapshot(subscriber.widgets)
+                continue
+            for message in subscriber.drain():
+                yield message
+
+    async def recompute_loop(self):
+        """Recalcule les widgets modifiés, regroupés sur DASHBOARD_STREAM_DEBOUNCE_MS"""
+        while True:
+            await self.changed.wait()
+            await asyncio.sleep(settings.DASHBOARD_STREAM_DEBOUNCE_MS / 1000)
+            self.changed.clear()
+            names, self.dirty = self.dirty, set()
+            # Cache local d'abord : le recalcul doit relire la base
+            invalidate(*{tag for name in names for tag in self.tags[name]})
+            async with self._lock:
+                watched = {name for s in self.subscribers for name in s.widgets}
+                # Widgets sans abonné : état oublié, recalculé au prochain abonnement
+                for name in names - watched:
+                    self.state.pop(name, None)
+                stale = [name for name in names & watched if name in self.state]
+                if stale:
+                    start = time.perf_counter()
+                    try:
+                        with primary_reads():
+                            await self._compute(stale)
+                    except Exception as e:
+                        print(f"❌ Erreur recalcul du dashboard: {e}")
+                        continue
+                    print(f"📡 Dashboard recalculé ({', '.join(sorted(stale))}) en "
+                          f"{(time.perf_counter() - start) * 1000:.0f} ms pour {len(self.subscribers)} abonnés")
+
+hub = DashboardHub()
+
+Gauge(
+    "epm_dashboard_stream_subscribers",
+    "Connexions ouvertes sur le flux dashboard",
+    lambda: {(): len(hub.subscribers)},
+)
+
+# ============================================
+# Écoute des notifications
+# ============================================
+
+async def _listen_loop():
+    while True:
+        conn = None
+        try:
+            conn = await asyncpg.connect(
+                host=settings.DB_HOST,
+                port=settings.DB_PORT,
+                user=settings.DB_USER,
+                password=settings.DB_PASSWORD,
+                database=settings.DB_NAME,
+            )
+            closed = asyncio.Event()
+            conn.add_termination_listener(lambda c: closed.set())
+            await conn.add_listener(CHANNEL, lambda c, pid, channel, payload: hub.notify(payload))
+            await conn.add_listener(STOCK_CHANNEL, lambda c, pid, channel, payload: hub.notify("stock"))
+            # Notifications perdues pendant une coupure : tout est recalculé
+            hub.notify(None)
+            await closed.wait()
+            print("⚠️ Connexion du flux dashboard perdue, reconnexion")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ Erreur flux dashboard: {e}")
+        finally:
+            if conn is not None and not conn.is_closed():
+                await conn.close()
+        await asyncio.sleep(settings.DASHBOARD_STREAM_RETRY_MS / 1000)
+
+_tasks: List[asyncio.Task] = []
+
+def start():
+    """Écoute des changements et recalcul en tâches de fond"""
+    if not settings.DASHBOARD_STREAM_ENABLED or _tasks:
+        return
+    _tasks.append(asyncio.create_task(_listen_loop()))
+    _tasks.append(asyncio.create_task(hub.recompute_loop()))
+
+async def stop():
+    """Arrête l'écoute et le recalcul"""
+    for task in _tasks:
+        task.cancel()
+    for task in _tasks:
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    _tasks.clear()
+
+async def install_schema():
+    """Installe les triggers de notification (budgets, magasins)"""
+    async with get_db() as conn:
+        await conn.execute(SCHEMA_SQL)
+    print("✅ Triggers du flux dashboard installés")
+
+# ============================================
+# CLI
+# ============================================
+
+async def _main(command: str):
+    await init_db()
+    try:
+        if command == "install":
+            await install_schema()
+    finally:
+        await close_db()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Flux temps réel du dashboard")
+    parser.add_argument("command", choices=["install"])
+    asyncio.run(_main(parser.parse_args().command))
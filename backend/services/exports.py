@@ -0,0 +1,198 @@
+# ============================================
+# app/services/exports.py - Exports en flux (CSV, NDJSON, Parquet)
+# ============================================
+"""
+Les lignes sont lues par un curseur serveur asyncpg et encodées par paquets
+de EXPORT_BATCH_ROWS : la mémoire reste constante quel que soit le volume
+exporté et le premier octet part dès le premier paquet.
+
+Parquet nécessite pyarrow (optionnel) ; chaque paquet devient un row group
+écrit au fil de l'eau.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, AsyncIterator, List
+
+from config import settings
+from database import ANALYTICS, get_db
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+MEDIA_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+# Ventes brutes, une ligne par ligne de vente
+SALES_EXPORT_SQL = """
+    SELECT
+        v.id AS vente_id,
+        {reference_externe} AS reference_externe,
+        v.date_vente,
+        v.statut,
+        v.magasin_id,
+        m.code_magasin,
+        v.client_id,
+        lv.produit_id,
+        p.nom AS produit,
+        lv.quantite,
+        lv.prix_unitaire_ht,
+        lv.montant_total_ht,
+        lv.montant_total_ttc
+    FROM ventes v
+    JOIN lignes_ventes lv ON lv.vente_id = v.id
+    JOIN magasins m ON m.id = v.magasin_id
+    JOIN produits p ON p.id = lv.produit_id
+    WHERE v.date_vente >= $1
+      AND v.date_vente < $2::date + 1
+      AND ($3::int IS NULL OR v.magasin_id = $3)
+"""
+
+# Colonne ajoutée par `python -m services.ingestion install`
+REFERENCE_COLUMN_SQL = """
+    SELECT EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema()
+          AND table_name = 'ventes'
+          AND column_name = 'reference_externe'
+    )
+"""
+
+_reference_column = False
+
+async def sales_export_sql() -> str:
+    """
+    Requête d'export des ventes. Tant que le schéma d'import n'est pas
+    installé, reference_externe est exportée vide ; la colonne est
+    recherchée de nouveau à chaque export jusqu'à ce qu'elle existe.
+    """
+    global _reference_column
+    if not _reference_column:
+        async with get_db(ANALYTICS) as conn:
+            _reference_column = await conn.fetchval(REFERENCE_COLUMN_SQL)
+    return SALES_EXPORT_SQL.format(
+        reference_externe='v.reference_externe' if _reference_column else 'NULL::text'
+    )
+
+def parquet_available() -> bool:
+    return pa is not None
+
+def _json_default(value: Any):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Type non sérialisable: {type(value).__name__}")
+
+def _arrow_type(pg_type: str):
+    """Type Arrow d'une colonne PostgreSQL (numeric -> float64)"""
+    return {
+        'int2': pa.int16(),
+        'int4': pa.int32(),
+        'int8': pa.int64(),
+        'float4': pa.float32(),
+        'float8': pa.float64(),
+        'numeric': pa.float64(),
+        'bool': pa.bool_(),
+        'date': pa.date32(),
+        'timestamp': pa.timestamp('us'),
+        'timestamptz': pa.timestamp('us', tz='UTC'),
+    }.get(pg_type, pa.string())
+
+class _ChunkSink(io.RawIOBase):
+    """Fichier en écriture seule dont on récupère le contenu au fil de l'eau"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def take(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+def _encode_csv(names: List[str], batch: List[Any], header: bool) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(names)
+    writer.writerows(batch)
+    return buffer.getvalue().encode('utf-8')
+
+def _encode_ndjson(names: List[str], batch: List[Any]) -> bytes:
+    return "".join(
+        json.dumps(dict(zip(names, row)), default=_json_default, ensure_ascii=False) + "\n"
+        for row in batch
+    ).encode('utf-8')
+
+def _arrow_batch(schema, batch: List[Any]):
+    columns = []
+    for i, field in enumerate(schema):
+        values = [row[i] for row in batch]
+        if pa.types.is_floating(field.type):
+            values = [None if v is None else float(v) for v in values]
+        columns.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+async def stream_query(query: str, args: tuple, format: str) -> AsyncIterator[bytes]:
+    """Exécute `query` avec un curseur serveur et produit le fichier par morceaux"""
+    batch_size = settings.EXPORT_BATCH_ROWS
+
+    async with get_db(ANALYTICS) as conn:
+        async with conn.transaction(readonly=True):
+            statement = await conn.prepare(query)
+            attributes = statement.get_attributes()
+            names = [a.name for a in attributes]
+
+            writer = sink = schema = None
+            if format == 'parquet':
+                schema = pa.schema([(a.name, _arrow_type(a.type.name)) for a in attributes])
+                sink = _ChunkSink()
+                writer = pq.ParquetWriter(sink, schema, compression='snappy')
+            elif format == 'csv':
+                yield _encode_csv(names, [], header=True)
+
+            batch = []
+            async for record in statement.cursor(*args, prefetch=batch_size):
+                batch.append(tuple(record))
+                if len(batch) < batch_size:
+                    continue
+                if format == 'parquet':
+                    writer.write_batch(_arrow_batch(schema, batch))
+                    yield sink.take()
+                elif format == 'csv':
+                    yield _encode_csv(names, batch, header=False)
+                else:
+                    yield _encode_ndjson(names, batch)
+                batch = []
+
+            if format == 'parquet':
+                if batch:
+                    writer.write_batch(_arrow_batch(schema, batch))
+                writer.close()
+                yield sink.take()
+            elif format == 'csv':
+                if batch:
+                    yield _encode_csv(names, batch, header=False)
+            elif batch:
+                yield _encode_ndjson(names, batch)
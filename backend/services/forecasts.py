@@ -0,0 +1,470 @@
+# ============================================
+# app/services/forecasts.py - Prévisions de CA par magasin et catégorie
+# ============================================
+"""
+Prévisions mensuelles de CA HT pour chaque série magasin × catégorie,
+calculées en lot et enregistrées ; les endpoints ne font que les lire.
+
+Deux modèles, ajustés en NumPy sur toutes les séries à la fois :
+- Holt-Winters additif (niveau, tendance, saisonnalité de 12 mois), les
+  coefficients de lissage étant choisis par série dans une grille (erreur
+  quadratique des prévisions à un pas sur l'historique)
+- saisonnier naïf : la valeur du même mois l'année précédente
+
+Backtest : les deux modèles sont ajustés sans les FORECAST_BACKTEST_MONTHS
+derniers mois puis comparés au réalisé (MAPE par série). Chaque série garde
+le modèle au plus faible MAPE, réajusté sur tout l'historique.
+
+Tables :
+- previsions_ventes : une ligne par série, mois et horizon. L'horizon 0 est
+  la prévision à un pas des mois passés ; les horizons 1 à
+  FORECAST_HORIZON_MONTHS sont les mois à venir.
+- previsions_backtest : MAPE de chaque modèle par série, modèle retenu
+
+Le calcul tourne toutes les FORECAST_REFRESH_SECONDS (tâche de fond) ou via
+`python -m services.forecasts run`.
+"""
+import argparse
+import asyncio
+import itertools
+import time
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from config import settings
+from database import ANALYTICS, init_db, close_db, get_db
+from queries import register
+from services.cache import invalidate
+from services.dashboard_stream import NOTIFY_SQL
+
+SAISON = 12
+HOLT_WINTERS = "holt_winters"
+SAISONNIER_NAIF = "saisonnier_naif"
+MODELES = (HOLT_WINTERS, SAISONNIER_NAIF)
+
+# Grille des coefficients de lissage (niveau, tendance, saisonnalité)
+GRILLE = np.array(list(itertools.product(
+    (0.1, 0.3, 0.5, 0.8),
+    (0.01, 0.1, 0.3),
+    (0.05, 0.2, 0.5),
+)))
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS previsions_ventes (
+    magasin_id   INTEGER NOT NULL,
+    categorie_id INTEGER NOT NULL,
+    mois         DATE NOT NULL,
+    horizon      SMALLINT NOT NULL,
+    modele       TEXT NOT NULL,
+    prevision    NUMERIC(14, 2) NOT NULL,
+    PRIMARY KEY (magasin_id, categorie_id, mois)
+);
+
+CREATE INDEX IF NOT EXISTS idx_previsions_ventes_mois
+    ON previsions_ventes (mois);
+
+CREATE TABLE IF NOT EXISTS previsions_backtest (
+    magasin_id          INTEGER NOT NULL,
+    categorie_id        INTEGER NOT NULL,
+    mape_holt_winters   FLOAT8,
+    mape_saisonnier     FLOAT8,
+    modele              TEXT NOT NULL,
+    mois_test           INTEGER NOT NULL,
+    calcule_le          TIMESTAMP NOT NULL DEFAULT now(),
+    PRIMARY KEY (magasin_id, categorie_id)
+);
+"""
+
+HISTORIQUE_SQL = register("previsions.historique", """
+    SELECT
+        magasin_id,
+        categorie_id,
+        DATE_TRUNC('month', jour)::date as mois,
+        SUM(ca_ht) as ca
+    FROM rollup_ventes_categorie_jour
+    WHERE jour >= $1 AND jour < $2
+    GROUP BY magasin_id, categorie_id, DATE_TRUNC('month', jour)
+""")
+
+PREVISIONS_SQL = register("previsions.mensuelles", """
+    SELECT mois, SUM(prevision) as prevision, MIN(horizon) as horizon
+    FROM previsions_ventes
+    WHERE mois >= $1
+        AND ($2::int IS NULL OR magasin_id = $2)
+        AND ($3::int IS NULL OR categorie_id = $3)
+    GROUP BY mois
+    ORDER BY mois
+""")
+
+CALCUL_SQL = register("previsions.calcul", """
+    SELECT MAX(calcule_le) as calcule_le, MAX(mois_test) as mois_test
+    FROM previsions_backtest
+""")
+
+AGE_SQL = register("previsions.age", """
+    SELECT EXTRACT(EPOCH FROM now() - MAX(calcule_le)) FROM previsions_backtest
+""")
+
+BACKTEST_SQL = register("previsions.backtest", """
+    SELECT
+        b.magasin_id,
+        m.nom as magasin,
+        b.categorie_id,
+        c.nom as categorie,
+        b.mape_holt_winters,
+        b.mape_saisonnier,
+        b.modele
+    FROM previsions_backtest b
+    LEFT JOIN magasins m ON m.id = b.magasin_id
+    LEFT JOIN categories c ON c.id = b.categorie_id
+    WHERE ($1::int IS NULL OR b.magasin_id = $1)
+        AND ($2::int IS NULL OR b.categorie_id = $2)
+""")
+
+# ============================================
+# Modèles (NumPy, une ligne par série)
+# ============================================
+
+def holt_winters(y: np.ndarray, horizon: int, grille: np.ndarray = GRILLE):
+    """
+    Holt-Winters additif sur des séries (séries × mois, au moins deux
+    saisons). Chaque série est ajustée avec tous les coefficients de la
+    grille en parallèle ; la combinaison à la plus faible erreur à un pas
+    est retenue. Retourne (prévisions à un pas à partir du mois SAISON,
+    prévisions des `horizon` mois suivants).
+    """
+    n_series, n_mois = y.shape
+    alpha, beta, gamma = (grille[:, i][None, :] for i in range(3))
+
+    # Initialisation sur les deux premières saisons
+    premiere = y[:, :SAISON].mean(axis=1)
+    seconde = y[:, SAISON:2 * SAISON].mean(axis=1)
+    niveau = np.repeat(premiere[:, None], len(grille), axis=1)
+    tendance = np.repeat(((seconde - premiere) / SAISON)[:, None], len(grille), axis=1)
+    saison = np.repeat((y[:, :SAISON] - premiere[:, None])[:, None, :], len(grille), axis=1)
+
+    ajuste = np.empty((n_series, len(grille), n_mois - SAISON))
+    for t in range(SAISON, n_mois):
+        s = saison[:, :, t % SAISON]
+        ajuste[:, :, t - SAISON] = niveau + tendance + s
+        observe = y[:, t, None]
+        nouveau = alpha * (observe - s) + (1 - alpha) * (niveau + tendance)
+        tendance = beta * (nouveau - niveau) + (1 - beta) * tendance
+        saison[:, :, t % SAISON] = gamma * (observe - nouveau) + (1 - gamma) * s
+        niveau = nouveau
+
+    erreur = ((ajuste - y[:, None, SAISON:]) ** 2).sum(axis=2)
+    meilleur = erreur.argmin(axis=1)
+    lignes = np.arange(n_series)
+
+    pas = np.arange(1, horizon + 1)
+    indices = (n_mois + pas - 1) % SAISON
+    prevision = (
+        niveau[lignes, meilleur][:, None]
+        + tendance[lignes, meilleur][:, None] * pas[None, :]
+        + saison[lignes, meilleur][:, indices]
+    )
+    return ajuste[lignes, meilleur], np.maximum(prevision, 0)
+
+def seasonal_naive(y: np.ndarray, horizon: int):
+    """Saisonnier naïf : (valeurs décalées d'une saison à partir du mois SAISON, horizon)"""
+    n_mois = y.shape[1]
+    pas = np.arange(horizon)
+    prevision = y[:, n_mois - SAISON + pas % SAISON]
+    return y[:, :n_mois - SAISON], prevision
+
+def mape(reel: np.ndarray, prevu: np.ndarray) -> np.ndarray:
+    """MAPE (%) par série sur les mois au réalisé positif (NaN si aucun)"""
+    positif = reel > 0
+    ecarts = np.where(positif, np.abs(reel - prevu) / np.where(positif, reel, 1), 0.0)
+    nb = positif.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(nb > 0, ecarts.sum(axis=1) / nb * 100, np.nan)
+
+@dataclass
+class ForecastBatch:
+    """Résultat d'un calcul : une ligne par série"""
+    modele: np.ndarray          # indice dans MODELES
+    ajuste: np.ndarray          # séries × mois d'historique (NaN avant le premier mois prévu)
+    prevision: np.ndarray       # séries × horizon
+    mape_holt_winters: np.ndarray
+    mape_saisonnier: np.ndarray
+
+def fit_batch(y: np.ndarray, horizon: int, mois_test: int) -> ForecastBatch:
+    """Backtest des deux modèles puis prévision par le meilleur, sur toutes les séries"""
+    n_series, n_mois = y.shape
+    train = y[:, :n_mois - mois_test]
+    test = y[:, n_mois - mois_test:]
+
+    mape_naif = np.full(n_series, np.nan)
+    if train.shape[1] >= SAISON:
+        mape_naif = mape(test, seasonal_naive(train, mois_test)[1])
+    mape_hw = np.full(n_series, np.nan)
+    if train.shape[1] >= 2 * SAISON:
+        mape_hw = mape(test, holt_winters(train, mois_test)[1])
+
+    # Holt-Winters seulement s'il fait mieux que la référence naïve
+    choix_hw = np.where(np.isnan(mape_naif), ~np.isnan(mape_hw), mape_hw < mape_naif)
+
+    ajuste = np.full((n_series, n_mois), np.nan)
+    ajuste_naif, prevision = seasonal_naive(y, horizon)
+    ajuste[:, SAISON:] = ajuste_naif
+    if choix_hw.any():
+        ajuste_hw, prevision_hw = holt_winters(y[choix_hw], horizon)
+        ajuste[choix_hw, SAISON:] = ajuste_hw
+        prevision[choix_hw] = prevision_hw
+
+    return ForecastBatch(
+        modele=np.where(choix_hw, 0, 1),
+        ajuste=np.maximum(ajuste, 0),
+        prevision=prevision,
+        mape_holt_winters=mape_hw,
+        mape_saisonnier=mape_naif,
+    )
+
+# ============================================
+# Calcul en lot
+# ============================================
+
+def _month(d: np.datetime64) -> date:
+    return d.astype("datetime64[D]").astype(date)
+
+_schema_ready = False
+
+async def install_schema():
+    """Crée les tables de prévisions (idempotent)"""
+    global _schema_ready
+    async with get_db() as conn:
+        await conn.execute(SCHEMA_SQL)
+    _schema_ready = True
+    print("✅ Tables de prévisions installées")
+
+async def ensure_schema() -> bool:
+    """Tables de prévisions au démarrage, lues par /api/monthly-trend même sans calcul périodique"""
+    if not _schema_ready:
+        try:
+            await install_schema()
+        except Exception as e:
+            print(f"⚠️ Tables de prévisions non installées: {e}")
+    return _schema_ready
+
+async def run_forecasts() -> int:
+    """
+    Recalcule les prévisions de toutes les séries magasin × catégorie sur les
+    FORECAST_HISTORY_MONTHS derniers mois complets. Retourne le nombre de séries.
+    """
+    start = time.perf_counter()
+    fin = np.datetime64(date.today(), "M")
+    debut = fin - settings.FORECAST_HISTORY_MONTHS
+    mois_test = settings.FORECAST_BACKTEST_MONTHS
+
+    async with get_db(ANALYTICS) as conn:
+        rows = await HISTORIQUE_SQL.fetch(conn, _month(debut), _month(fin))
+    if not rows:
+        print("⚠️ Prévisions: aucun historique")
+        return 0
+
+    cles = np.array([(row['magasin_id'], row['categorie_id']) for row in rows])
+    mois = np.array([np.datetime64(row['mois'], "M") for row in rows])
+    # Historique à partir du premier mois vendu
+    debut = mois.min()
+    n_mois = int((fin - debut).astype(int))
+    if n_mois < SAISON + mois_test:
+        print(f"⚠️ Prévisions: {n_mois} mois d'historique, {SAISON + mois_test} nécessaires")
+        return 0
+
+    series, index = np.unique(cles, axis=0, return_inverse=True)
+    y = np.zeros((len(series), n_mois))
+    y[index.ravel(), (mois - debut).astype(int)] = [float(row['ca']) for row in rows]
+
+    batch = await asyncio.to_thread(fit_batch, y, settings.FORECAST_HORIZON_MONTHS, mois_test)
+
+    # Mois prévus : passés (horizon 0) puis à venir
+    mois_passes = [_month(debut + i) for i in range(n_mois)]
+    mois_futurs = [_month(fin + i) for i in range(settings.FORECAST_HORIZON_MONTHS)]
+    previsions = []
+    for i, (magasin_id, categorie_id) in enumerate(series.tolist()):
+        modele = MODELES[batch.modele[i]]
+        for t in range(SAISON, n_mois):
+            previsions.append((magasin_id, categorie_id, mois_passes[t], 0, modele, round(float(batch.ajuste[i, t]), 2)))
+        for h, mois_futur in enumerate(mois_futurs):
+            previsions.append((magasin_id, categorie_id, mois_futur, h + 1, modele, round(float(batch.prevision[i, h]), 2)))
+
+    def _mape_value(value: float) -> Optional[float]:
+        return None if np.isnan(value) else round(float(value), 2)
+
+    backtests = [
+        (
+            magasin_id, categorie_id,
+            _mape_value(batch.mape_holt_winters[i]), _mape_value(batch.mape_saisonnier[i]),
+            MODELES[batch.modele[i]], mois_test,
+        )
+        for i, (magasin_id, categorie_id) in enumerate(series.tolist())
+    ]
+
+    async with get_db() as conn:
+        async with conn.transaction():
+            await conn.execute("""
+                LOCK TABLE previsions_ventes, previsions_backtest IN EXCLUSIVE MODE;
+                TRUNCATE previsions_ventes, previsions_backtest;
+            """)
+            await conn.copy_records_to_table(
+                "previsions_ventes", records=previsions,
+                columns=["magasin_id", "categorie_id", "mois", "horizon", "modele", "prevision"],
+            )
+            # calcule_le : now() de la transaction, identique pour toutes les séries
+            await conn.copy_records_to_table(
+                "previsions_backtest", records=backtests,
+                columns=["magasin_id", "categorie_id", "mape_holt_winters", "mape_saisonnier", "modele", "mois_test"],
+            )
+            await conn.execute(NOTIFY_SQL, "previsions")
+
+    invalidate("previsions")
+    retenus = int((batch.modele == 0).sum())
+    print(f"📈 Prévisions calculées: {len(series)} séries, {retenus} Holt-Winters, "
+          f"{time.perf_counter() - start:.1f} s")
+    return len(series)
+
+# ============================================
+# Lecture
+# ============================================
+
+async def fetch_forecast(
+    debut: date,
+    magasin_id: Optional[int] = None,
+    categorie_id: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Prévisions enregistrées par mois à partir de `debut` (somme des séries du périmètre)"""
+    async with get_db(ANALYTICS) as conn:
+        calcul = await CALCUL_SQL.fetchrow(conn)
+        rows = await PREVISIONS_SQL.fetch(conn, debut, magasin_id, categorie_id)
+    return {
+        "calcule_le": calcul['calcule_le'] if calcul else None,
+        "points": [
+            {
+                "mois": row['mois'],
+                "prevision": float(row['prevision']),
+                "horizon": int(row['horizon']),
+            }
+            for row in rows
+        ],
+    }
+
+def _summary(values: List[Optional[float]]) -> Dict[str, Any]:
+    mapes = np.array([v for v in values if v is not None])
+    return {
+        "series": len(mapes),
+        "mape_moyen": round(float(mapes.mean()), 2) if len(mapes) else None,
+        "mape_median": round(float(np.median(mapes)), 2) if len(mapes) else None,
+    }
+
+async def fetch_backtest(
+    magasin_id: Optional[int] = None,
+    categorie_id: Optional[int] = None,
+    limit: int = 50,
+) -> Dict[str, Any]:
+    """Rapport de backtest : MAPE par modèle et séries les moins bien prévues"""
+    async with get_db(ANALYTICS) as conn:
+        calcul = await CALCUL_SQL.fetchrow(conn)
+        rows = await BACKTEST_SQL.fetch(conn, magasin_id, categorie_id)
+
+    series = [
+        {
+            "magasin_id": row['magasin_id'],
+            "magasin": row['magasin'],
+            "categorie_id": row['categorie_id'],
+            "categorie": row['categorie'],
+            "mape_holt_winters": row['mape_holt_winters'],
+            "mape_saisonnier": row['mape_saisonnier'],
+            "modele": row['modele'],
+            "mape": row['mape_holt_winters'] if row['modele'] == HOLT_WINTERS else row['mape_saisonnier'],
+        }
+        for row in rows
+    ]
+    series.sort(key=lambda s: -1 if s["mape"] is None else s["mape"], reverse=True)
+    return {
+        "calcule_le": calcul['calcule_le'] if calcul else None,
+        "mois_test": calcul['mois_test'] if calcul else None,
+        "resume": {
+            HOLT_WINTERS: _summary([s["mape_holt_winters"] for s in series]),
+            SAISONNIER_NAIF: _summary([s["mape_saisonnier"] for s in series]),
+            "retenu": _summary([s["mape"] for s in series]),
+        },
+        "modeles_retenus": {
+            modele: sum(1 for s in series if s["modele"] == modele) for modele in MODELES
+        },
+        "series": series[:limit],
+    }
+
+# ============================================
+# Calcul périodique
+# ============================================
+
+_scheduler: asyncio.Task | None = None
+
+async def _age_seconds() -> Optional[float]:
+    """Âge du dernier calcul (None si jamais calculé)"""
+    async with get_db(ANALYTICS) as conn:
+        return await AGE_SQL.fetchval(conn)
+
+async def _schedule_loop(interval: float):
+    failures = 0
+    while True:
+        try:
+            if not _schema_ready:
+                await install_schema()
+            age = await _age_seconds()
+            if age is None or age >= interval:
+                await run_forecasts()
+                age = 0
+            failures = 0
+            await asyncio.sleep(interval - float(age))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Nouvel essai rapide, délai doublé à chaque échec consécutif
+            failures += 1
+            delay = min(settings.FORECAST_RETRY_SECONDS * 2 ** (failures - 1), interval)
+            print(f"❌ Erreur calcul des prévisions: {e} (nouvel essai dans {delay:.0f} s)")
+            await asyncio.sleep(delay)
+
+def start_scheduler():
+    """Démarre le calcul périodique des prévisions en tâche de fond"""
+    global _scheduler
+    if settings.FORECAST_REFRESH_SECONDS <= 0 or _scheduler:
+        return
+    _scheduler = asyncio.create_task(_schedule_loop(settings.FORECAST_REFRESH_SECONDS))
+
+async def stop_scheduler():
+    """Arrête la tâche de calcul"""
+    global _scheduler
+    if _scheduler:
+        _scheduler.cancel()
+        try:
+            await _scheduler
+        except asyncio.CancelledError:
+            pass
+        _scheduler = None
+
+# ============================================
+# CLI
+# ============================================
+
+async def _main(command: str):
+    await init_db()
+    try:
+        if command == "install":
+            await install_schema()
+        elif command == "run":
+            await install_schema()
+            await run_forecasts()
+    finally:
+        await close_db()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prévisions de CA")
+    parser.add_argument("command", choices=["install", "run"])
+    asyncio.run(_main(parser.parse_args().command))
@@ -0,0 +1,290 @@
+# ============================================
+# app/services/ingestion.py - Import de ventes en masse
+# ============================================
+"""
+Import des flux de caisse, e-commerce et entrepôt dans `ventes` et
+`lignes_ventes`.
+
+Le corps de la requête est lu en flux (NDJSON : une vente par ligne avec ses
+lignes ; CSV : une ligne de vente par ligne, colonnes de la vente répétées),
+validé par paquets puis chargé par COPY dans des tables temporaires. La
+fusion vers les tables réelles se fait en une transaction :
+
+- les ventes dont le magasin, le client ou un produit est inconnu sont
+  rejetées individuellement, sans faire échouer le lot
+- `ventes.reference_externe` sert de clé d'idempotence : une vente déjà
+  importée est ignorée (comptée comme doublon)
+- les montants de la vente sont recalculés à partir de ses lignes
+
+Usage :
+    python -m services.ingestion install   # colonne et index d'idempotence
+"""
+import argparse
+import asyncio
+import csv
+import json
+import time
+from typing import AsyncIterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from config import settings
+from database import init_db, close_db, get_db
+from models.sale import BulkImportResult, ImportReject, LigneVenteCsv, VenteImport
+
+TAUX_TVA = 0.2
+
+SCHEMA_SQL = """
+ALTER TABLE ventes ADD COLUMN IF NOT EXISTS reference_externe TEXT;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_ventes_reference_externe
+    ON ventes (reference_externe);
+"""
+
+STAGING_SQL = """
+CREATE TEMP TABLE _import_ventes (
+    ligne      INTEGER,
+    reference  TEXT,
+    magasin_id INTEGER,
+    client_id  INTEGER,
+    date_vente TIMESTAMP,
+    statut     TEXT
+) ON COMMIT DROP;
+CREATE TEMP TABLE _import_lignes (
+    reference         TEXT,
+    produit_id        INTEGER,
+    quantite          INTEGER,
+    prix_unitaire_ht  FLOAT8,
+    montant_total_ht  FLOAT8,
+    montant_total_ttc FLOAT8
+) ON COMMIT DROP;
+"""
+
+VENTES_COLUMNS = ["ligne", "reference", "magasin_id", "client_id", "date_vente", "statut"]
+LIGNES_COLUMNS = ["reference", "produit_id", "quantite", "prix_unitaire_ht", "montant_total_ht", "montant_total_ttc"]
+
+# Ventes dont une référence (magasin, client, produit) n'existe pas
+REJECT_UNKNOWN_SQL = """
+WITH erreurs AS (
+    SELECT v.reference, 'magasin inconnu: ' || v.magasin_id AS erreur
+    FROM _import_ventes v
+    LEFT JOIN magasins m ON m.id = v.magasin_id
+    WHERE m.id IS NULL
+    UNION ALL
+    SELECT v.reference, 'client inconnu: ' || v.client_id
+    FROM _import_ventes v
+    LEFT JOIN clients c ON c.id = v.client_id
+    WHERE v.client_id IS NOT NULL AND c.id IS NULL
+    UNION ALL
+    SELECT l.reference, 'produit inconnu: ' || l.produit_id
+    FROM _import_lignes l
+    LEFT JOIN produits p ON p.id = l.produit_id
+    WHERE p.id IS NULL
+), premieres AS (
+    SELECT DISTINCT ON (reference) reference, erreur
+    FROM erreurs
+    ORDER BY reference
+)
+DELETE FROM _import_ventes v
+USING premieres e
+WHERE v.reference = e.reference
+RETURNING v.ligne, v.reference, e.erreur
+"""
+
+MERGE_SQL = """
+WITH totaux AS (
+    SELECT reference,
+           SUM(ROUND(montant_total_ht::numeric, 2)) AS montant_ht,
+           SUM(ROUND(montant_total_ttc::numeric, 2)) AS montant_ttc
+    FROM _import_lignes
+    GROUP BY reference
+), inserees AS (
+    INSERT INTO ventes (reference_externe, magasin_id, client_id, date_vente, montant_ht, montant_ttc, statut)
+    SELECT v.reference, v.magasin_id, v.client_id, v.date_vente, t.montant_ht, t.montant_ttc, v.statut
+    FROM _import_ventes v
+    JOIN totaux t ON t.reference = v.reference
+    ORDER BY v.ligne
+    ON CONFLICT (reference_externe) DO NOTHING
+    RETURNING id, reference_externe
+), lignes AS (
+    INSERT INTO lignes_ventes (vente_id, produit_id, quantite, prix_unitaire_ht, montant_total_ht, montant_total_ttc)
+    SELECT i.id, l.produit_id, l.quantite,
+           ROUND(l.prix_unitaire_ht::numeric, 2),
+           ROUND(l.montant_total_ht::numeric, 2),
+           ROUND(l.montant_total_ttc::numeric, 2)
+    FROM inserees i
+    JOIN _import_lignes l ON l.reference = i.reference_externe
+    RETURNING 1
+)
+SELECT (SELECT COUNT(*) FROM _import_ventes) AS ventes,
+       (SELECT COUNT(*) FROM inserees) AS ventes_inserees,
+       (SELECT COUNT(*) FROM lignes) AS lignes_inserees
+"""
+
+async def install_schema():
+    """Ajoute la clé d'idempotence des ventes"""
+    async with get_db() as conn:
+        await conn.execute(SCHEMA_SQL)
+    print("✅ Schéma d'import installé")
+
+async def iter_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, str]]:
+    """Découpe un flux d'octets en lignes numérotées (à partir de 1)"""
+    numero = 0
+    reste = b""
+    async for chunk in stream:
+        reste += chunk
+        *lignes, reste = reste.split(b"\n")
+        for ligne in lignes:
+            numero += 1
+            yield numero, ligne.decode("utf-8").rstrip("\r")
+    if reste.strip():
+        yield numero + 1, reste.decode("utf-8").rstrip("\r")
+
+def _validation_message(e: ValidationError) -> str:
+    error = e.errors()[0]
+    location = ".".join(str(part) for part in error["loc"])
+    return f"{location}: {error['msg']}" if location else error["msg"]
+
+def _naive(date_vente):
+    """Les horodatages avec fuseau sont ramenés à l'heure locale du serveur"""
+    return date_vente.astimezone().replace(tzinfo=None) if date_vente.tzinfo else date_vente
+
+def _ligne_record(reference: str, ligne) -> tuple:
+    montant_ht = ligne.montant_total_ht
+    if montant_ht is None:
+        montant_ht = ligne.quantite * ligne.prix_unitaire_ht
+    montant_ttc = ligne.montant_total_ttc
+    if montant_ttc is None:
+        montant_ttc = montant_ht * (1 + TAUX_TVA)
+    return (reference, ligne.produit_id, ligne.quantite, ligne.prix_unitaire_ht, montant_ht, montant_ttc)
+
+class SalesImport:
+    """État d'un import : paquets en attente de COPY, références vues, rejets"""
+
+    def __init__(self, conn, format: str):
+        self.conn = conn
+        self.format = format
+        self.ventes: List[tuple] = []
+        self.lignes: List[tuple] = []
+        self.references = set()
+        self.references_rejetees = set()
+        self.rejets: List[ImportReject] = []
+        self.rejets_total = 0
+        self.header: Optional[List[str]] = None
+
+    def reject(self, ligne: int, reference: Optional[str], erreur: str):
+        self.rejets_total += 1
+        if len(self.rejets) < settings.BULK_MAX_REJECTS:
+            self.rejets.append(ImportReject(ligne=ligne, reference=reference, erreur=erreur))
+
+    def add_ndjson(self, numero: int, texte: str):
+        try:
+            data = json.loads(texte)
+        except ValueError as e:
+            self.reject(numero, None, f"JSON invalide: {e}")
+            return
+        reference = data.get("reference") if isinstance(data, dict) else None
+        reference = None if reference is None else str(reference)
+        try:
+            vente = VenteImport.model_validate(data)
+        except ValidationError as e:
+            self.reject(numero, reference, _validation_message(e))
+            return
+        if vente.reference in self.references:
+            self.reject(numero, vente.reference, "référence en double dans le lot")
+            return
+
+        self.references.add(vente.reference)
+        self.ventes.append((numero, vente.reference, vente.magasin_id, vente.client_id, _naive(vente.date_vente), vente.statut))
+        self.lignes.extend(_ligne_record(vente.reference, ligne) for ligne in vente.lignes)
+
+    def add_csv(self, numero: int, texte: str):
+        row = next(csv.reader([texte]))
+        if self.header is None:
+            self.header = [name.strip() for name in row]
+            return
+        if len(row) != len(self.header):
+            self.reject(numero, None, f"{len(row)} colonnes au lieu de {len(self.header)}")
+            return
+
+        data = {name: value for name, value in zip(self.header, row) if value != ""}
+        reference = data.get("reference")
+        try:
+            ligne = LigneVenteCsv.model_validate(data)
+        except ValidationError as e:
+            self.reject(numero, reference, _validation_message(e))
+            # Une ligne invalide invalide toute sa vente
+            if reference:
+                self.references_rejetees.add(reference)
+            return
+
+        if ligne.reference not in self.references:
+            self.references.add(ligne.reference)
+            self.ventes.append((numero, ligne.reference, ligne.magasin_id, ligne.client_id, _naive(ligne.date_vente), ligne.statut))
+        self.lignes.append(_ligne_record(ligne.reference, ligne))
+
+    async def flush(self):
+        """Charge les paquets en attente dans les tables temporaires"""
+        if self.ventes:
+            await self.conn.copy_records_to_table("_import_ventes", records=self.ventes, columns=VENTES_COLUMNS)
+            self.ventes = []
+        if self.lignes:
+            await self.conn.copy_records_to_table("_import_lignes", records=self.lignes, columns=LIGNES_COLUMNS)
+            self.lignes = []
+
+    async def merge(self) -> Tuple[int, int, int]:
+        """Fusionne les tables temporaires dans ventes / lignes_ventes"""
+        if self.references_rejetees:
+            await self.conn.execute(
+                "DELETE FROM _import_ventes WHERE reference = ANY($1::text[])",
+                list(self.references_rejetees),
+            )
+        for row in await self.conn.fetch(REJECT_UNKNOWN_SQL):
+            self.reject(row["ligne"], row["reference"], row["erreur"])
+        row = await self.conn.fetchrow(MERGE_SQL)
+        return row["ventes"], row["ventes_inserees"], row["lignes_inserees"]
+
+async def import_sales(conn, lines: AsyncIterator[Tuple[int, str]], format: str) -> BulkImportResult:
+    """Importe un flux de lignes NDJSON ou CSV dans une seule transaction"""
+    start = time.perf_counter()
+    state = SalesImport(conn, format)
+    add = state.add_ndjson if format == "ndjson" else state.add_csv
+
+    async with conn.transaction():
+        await conn.execute(STAGING_SQL)
+        async for numero, texte in lines:
+            if not texte.strip():
+                continue
+            add(numero, texte.lstrip("\ufeff") if numero == 1 else texte)
+            if len(state.lignes) >= settings.BULK_CHUNK_LINES:
+                await state.flush()
+        await state.flush()
+        ventes, ventes_inserees, lignes_inserees = await state.merge()
+
+    duree = time.perf_counter() - start
+    return BulkImportResult(
+        ventes_recues=len(state.references),
+        ventes_inserees=ventes_inserees,
+        ventes_dupliquees=ventes - ventes_inserees,
+        lignes_inserees=lignes_inserees,
+        rejets_total=state.rejets_total,
+        rejets=sorted(state.rejets, key=lambda r: r.ligne),
+        duree_ms=round(duree * 1000, 1),
+        lignes_par_seconde=round(lignes_inserees / duree, 1) if duree else 0,
+    )
+
+# ============================================
+# CLI
+# ============================================
+
+async def _main(command: str):
+    await init_db()
+    try:
+        if command == "install":
+            await install_schema()
+    finally:
+        await close_db()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import de ventes en masse")
+    parser.add_argument("command", choices=["install"])
+    asyncio.run(_main(parser.parse_args().command))
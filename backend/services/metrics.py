@@ -0,0 +1,281 @@
+# ============================================
+# app/services/metrics.py - Métriques au format Prometheus
+# ============================================
+"""
+Compteurs, histogrammes et jauges en mémoire, exposés en format texte
+Prometheus sur GET /metrics.
+
+Une observation coûte une recherche dichotomique dans les bornes et trois
+additions ; les jauges (pool de connexions) sont calculées à la lecture.
+Les libellés sont bornés : gabarit de route (pas le chemin brut), nom logique
+de requête du registre, issue d'un appel n8n.
+
+Usage :
+    REQUEST_DURATION.labels("GET", "/api/kpis", "200").observe(0.012)
+    with SERIALIZATION_DURATION.labels().time(): ...
+"""
+import bisect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import fastapi.routing
+
+# Bornes par défaut de Prometheus (secondes) et bornes fines pour le SQL
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Compteurs de la requête HTTP en cours (attente du pool, requêtes SQL),
+# activés par les benchmarks : {"pool_wait": secondes, "queries": n}
+request_stats: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_stats", default=None)
+
+# Starlette ajoute "; charset=utf-8" aux types text/*
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        _REGISTRY.append(self)
+
+    def labels(self, *values):
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name}: libellés attendus {self.labelnames}")
+            child = self._children[key] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+class Counter(_Metric):
+    type = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+            for key, child in self._children.items()
+        ]
+
+class _HistogramChild:
+    __slots__ = ("bounds", "buckets", "count", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.bounds = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.bounds)
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip(self.bounds + (float("inf"),), child.buckets):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+class Gauge(_Metric):
+    """Jauge calculée à la lecture : `collect` renvoie {valeurs de libellés: valeur}"""
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, collect: Callable[[], Dict[Tuple[str, ...], float]], labelnames: Iterable[str] = ()):
+        super().__init__(name, help, labelnames)
+        self.collect = collect
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in self.collect().items()
+        ]
+
+_REGISTRY: List[_Metric] = []
+
+def render() -> str:
+    """Toutes les métriques, au format texte Prometheus"""
+    return "\n".join(metric.render() for metric in _REGISTRY) + "\n"
+
+# ============================================
+# Métriques de l'application
+# ============================================
+
+REQUEST_DURATION = Histogram(
+    "epm_http_request_duration_seconds",
+    "Durée des requêtes HTTP par gabarit de route",
+    ("method", "route", "status"),
+)
+
+POOL_ACQUIRE_DURATION = Histogram(
+    "epm_db_pool_acquire_seconds",
+    "Attente d'une connexion par pool PostgreSQL",
+    ("pool",),
+    buckets=FAST_BUCKETS,
+)
+
+QUERY_DURATION = Histogram(
+    "epm_db_query_duration_seconds",
+    "Durée des requêtes SQL du registre par nom logique",
+    ("query",),
+    buckets=FAST_BUCKETS,
+)
+
+QUERY_ERRORS = Counter(
+    "epm_db_query_errors_total",
+    "Requêtes SQL du registre en erreur par nom logique",
+    ("query",),
+)
+
+N8N_DURATION = Histogram(
+    "epm_n8n_request_duration_seconds",
+    "Durée des appels au webhook n8n",
+)
+
+N8N_REQUESTS = Counter(
+    "epm_n8n_requests_total",
+    "Appels au webhook n8n par issue (success, error, circuit_open)",
+    ("outcome",),
+)
+
+SERIALIZATION_DURATION = Histogram(
+    "epm_response_serialization_seconds",
+    "Validation et sérialisation Pydantic des réponses",
+    buckets=FAST_BUCKETS,
+)
+
+def pool_gauges(get_pools: Callable[[], Dict[str, object]]):
+    """Jauges des pools asyncpg par nom (taille, connexions libres et utilisées)"""
+    def collector(measure: Callable):
+        def collect():
+            return {(name,): measure(pool) for name, pool in get_pools().items()}
+        return collect
+
+    Gauge("epm_db_pool_size", "Connexions ouvertes du pool", collector(lambda p: p.get_size()), ("pool",))
+    Gauge("epm_db_pool_max_size", "Taille maximale du pool", collector(lambda p: p.get_max_size()), ("pool",))
+    Gauge("epm_db_pool_idle", "Connexions libres du pool", collector(lambda p: p.get_idle_size()), ("pool",))
+    Gauge("epm_db_pool_in_use", "Connexions utilisées du pool", collector(lambda p: p.get_size() - p.get_idle_size()), ("pool",))
+
+# ============================================
+# Instrumentation HTTP
+# ============================================
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI : durée de chaque requête HTTP, libellée par le gabarit de
+    la route résolue (`/api/scenarios/{scenario_id}`) pour borner les séries.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = "500"
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            REQUEST_DURATION.labels(
+                scope["method"],
+                route.path if route is not None else "inconnue",
+                status,
+            ).observe(time.perf_counter() - start)
+
+def instrument_serialization():
+    """
+    Mesure la sérialisation des réponses FastAPI (validation du
+    response_model puis conversion en types JSON) : fastapi.routing appelle
+    `serialize_response` par son nom de module, on l'enveloppe une fois.
+    """
+    original = fastapi.routing.serialize_response
+    if getattr(original, "_instrumented", False):
+        return
+    child = SERIALIZATION_DURATION.labels()
+
+    async def serialize_response(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await original(*args, **kwargs)
+        finally:
+            child.observe(time.perf_counter() - start)
+
+    serialize_response._instrumented = True
+    fastapi.routing.serialize_response = serialize_response
@@ -0,0 +1,161 @@
+# ============================================
+# app/services/monte_carlo.py - Simulations Monte Carlo
+# ============================================
+"""
+Tire les entrées incertaines d'une simulation selon des lois configurables,
+évalue tous les tirages avec le calcul vectorisé et en déduit des bandes
+P10/P50/P90 et la probabilité d'un gain net positif.
+
+Le calcul tourne dans un pool de processus pour ne jamais bloquer la
+boucle asyncio.
+"""
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict
+
+import numpy as np
+
+from config import settings
+from models.scenario import ScenarioParameters
+from models.simulation import MonteCarloConfig, MonteCarloResult, PercentileBands, SimulationResult
+from services.batch_calculations import PARAMETER_DEFAULTS, PRICE_ELASTICITY, calculate_simulation_results_batch
+
+# Entrées tirées par défaut pour chaque type, avec leur écart-type relatif
+DEFAULT_UNCERTAINTY = {
+    'promotion': {'traffic_increase': 0.25},
+    'new_store': {'monthly_revenue': 0.2},
+    'cost_optimization': {'cost_reduction': 0.25},
+    'price_change': {'elasticity': 0.2},
+}
+
+BAND_FIELDS = ['revenue_impact', 'margin_impact', 'cost_impact', 'roi']
+
+_executor: ProcessPoolExecutor | None = None
+
+def _draw(dist: Dict[str, Any], center: float, relative_std: float, size: int, rng: np.random.Generator) -> np.ndarray:
+    """Tire `size` valeurs selon la loi décrite par `dist`"""
+    kind = dist.get('kind') or 'normal'
+    mean = center if dist.get('mean') is None else dist['mean']
+    std = abs(mean) * relative_std if dist.get('std') is None else dist['std']
+
+    if std < 0:
+        raise ValueError(f"Écart-type négatif: {std}")
+
+    if kind == 'normal':
+        return rng.normal(mean, std, size)
+    if kind == 'lognormal':
+        if mean <= 0:
+            raise ValueError(f"Loi lognormale: la moyenne doit être strictement positive ({mean})")
+        # Paramètres de la loi normale sous-jacente à partir de la moyenne et de l'écart-type
+        sigma2 = np.log1p((std / mean) ** 2)
+        return rng.lognormal(np.log(mean) - sigma2 / 2, np.sqrt(sigma2), size)
+    if kind in ('uniform', 'triangular'):
+        low = mean - std * np.sqrt(3) if dist.get('low') is None else dist['low']
+        high = mean + std * np.sqrt(3) if dist.get('high') is None else dist['high']
+        if not low < high:
+            raise ValueError(f"Loi {kind}: il faut low < high ({low}, {high})")
+        if kind == 'uniform':
+            return rng.uniform(low, high, size)
+        if dist.get('mode') is None:
+            # Mode par défaut : la valeur du paramètre, ramenée dans les bornes
+            mode = min(max(center, low), high)
+        else:
+            mode = dist['mode']
+            if not low <= mode <= high:
+                raise ValueError(f"Loi triangulaire: il faut low <= mode <= high ({low}, {mode}, {high})")
+        return rng.triangular(low, mode, high, size)
+    raise ValueError(f"Loi inconnue: {kind}")
+
+def _net_gain(simulation_type: str, results: Dict[str, np.ndarray]) -> np.ndarray:
+    """Gain net de chaque tirage : marge générée moins la dépense engagée"""
+    if simulation_type == 'promotion':
+        return results['margin_impact'] + results['cost_impact']
+    if simulation_type == 'new_store':
+        return results['margin_impact'] - results['cost_impact']
+    if simulation_type == 'cost_optimization':
+        return -results['cost_impact']
+    return results['margin_impact']
+
+def run_monte_carlo_sync(
+    simulation_type: str,
+    parameters: Dict[str, Any],
+    period: str,
+    config: Dict[str, Any],
+) -> Dict[str, Any]:
+    """Exécute les tirages (fonction de module, exécutable dans un autre processus)"""
+    draws = config['draws']
+    rng = np.random.default_rng(config.get('seed'))
+
+    # Paramètres fixes, avec les mêmes valeurs par défaut que le calcul scalaire
+    centers = {name: parameters.get(name) or default for name, default in PARAMETER_DEFAULTS.items()}
+    centers['elasticity'] = PRICE_ELASTICITY
+    columns = {name: np.full(draws, value, dtype=float) for name, value in centers.items()}
+
+    distributions = dict.fromkeys(DEFAULT_UNCERTAINTY.get(simulation_type, {}), {})
+    distributions.update(config.get('distributions') or {})
+    for name, dist in distributions.items():
+        if name not in centers:
+            raise ValueError(f"Entrée incertaine inconnue: {name}")
+        relative_std = DEFAULT_UNCERTAINTY.get(simulation_type, {}).get(name, 0.2)
+        columns[name] = _draw(dist, centers[name], relative_std, draws, rng)
+        # Un NaN serait remplacé par la valeur par défaut dans le calcul vectorisé
+        if not np.all(np.isfinite(columns[name])):
+            raise ValueError(f"Tirages non finis pour {name}: vérifier les paramètres de la loi")
+
+    results = calculate_simulation_results_batch(simulation_type, columns, np.full(draws, period, dtype=object))
+    net_gain = _net_gain(simulation_type, results)
+
+    output = {'draws': draws, 'probability_positive_net_gain': float(np.mean(net_gain > 0))}
+    for name in BAND_FIELDS:
+        p10, p50, p90 = np.percentile(results[name], [10, 50, 90])
+        output[name] = {'p10': float(p10), 'p50': float(p50), 'p90': float(p90)}
+    return output
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.MONTE_CARLO_WORKERS)
+    return _executor
+
+def shutdown_executor():
+    """Arrête le pool de processus"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+async def run_monte_carlo(
+    simulation_type: str,
+    parameters: ScenarioParameters,
+    period: str,
+    config: MonteCarloConfig,
+) -> MonteCarloResult:
+    """Lance une simulation Monte Carlo dans le pool de processus"""
+    if config.draws > settings.MONTE_CARLO_MAX_DRAWS:
+        raise ValueError(f"Trop de tirages: {config.draws} > {settings.MONTE_CARLO_MAX_DRAWS}")
+
+    loop = asyncio.get_running_loop()
+    output = await loop.run_in_executor(
+        _get_executor(),
+        run_monte_carlo_sync,
+        simulation_type,
+        parameters.model_dump(exclude_none=True),
+        period,
+        config.model_dump(exclude_none=True),
+    )
+    return MonteCarloResult(
+        draws=output['draws'],
+        probability_positive_net_gain=output['probability_positive_net_gain'],
+        **{name: PercentileBands(**output[name]) for name in BAND_FIELDS}
+    )
+
+def apply_percentile_bands(results: SimulationResult, monte_carlo: MonteCarloResult) -> SimulationResult:
+    """Remplace les scénarios optimiste/réaliste/pessimiste par P90/P50/P10"""
+    return results.model_copy(update={
+        'optimistic_revenue': monte_carlo.revenue_impact.p90,
+        'optimistic_margin': monte_carlo.margin_impact.p90,
+        'realistic_revenue': monte_carlo.revenue_impact.p50,
+        'realistic_margin': monte_carlo.margin_impact.p50,
+        'pessimistic_revenue': monte_carlo.revenue_impact.p10,
+        'pessimistic_margin': monte_carlo.margin_impact.p10,
+    })
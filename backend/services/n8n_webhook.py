@@ -1,25 +1,124 @@
 # ============================================
 # app/services/n8n_webhook.py - Service webhook n8n
 # ============================================
-import httpx
+import asyncio
+import time
 from typing import Any
+from urllib.parse import urlsplit
+
+import httpx
 
 from config import settings
+from services.metrics import N8N_DURATION, N8N_REQUESTS
+
+class CircuitBreaker:
+    """
+    Coupe les appels après `threshold` échecs consécutifs pendant `cooldown`
+    secondes, puis laisse passer un appel d'essai (demi-ouvert).
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Indique si un appel peut être tenté"""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._trial_running:
+            self._trial_running = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_running = False
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
 
-async def send_to_n8n(payload: dict[str, Any]) -> dict | None:
+    def release(self):
+        """Appel interrompu (annulation) : ni succès ni échec, l'essai est libéré"""
+        self._trial_running = False
+
+# Client HTTP partagé sur la durée de vie de l'application
+_client: httpx.AsyncClient | None = None
+_host_limits: dict[str, asyncio.Semaphore] = {}
+breaker = CircuitBreaker(settings.N8N_BREAKER_THRESHOLD, settings.N8N_BREAKER_COOLDOWN)
+
+def init_client():
+    """Crée le client HTTP partagé (keep-alive, taille de pool bornée)"""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=settings.N8N_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=settings.N8N_POOL_SIZE,
+                max_keepalive_connections=settings.N8N_POOL_SIZE,
+                keepalive_expiry=settings.N8N_KEEPALIVE_EXPIRY,
+            ),
+        )
+
+async def close_client():
+    """Ferme le client HTTP partagé"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    _host_limits.clear()
+
+def _host_limit(url: str) -> asyncio.Semaphore:
+    host = urlsplit(url).netloc
+    if host not in _host_limits:
+        _host_limits[host] = asyncio.Semaphore(settings.N8N_MAX_PER_HOST)
+    return _host_limits[host]
+
+async def send_to_n8n(payload: dict[str, Any], url: str | None = None) -> dict | None:
     """Envoie les données au webhook n8n pour analyse"""
-    if not settings.N8N_WEBHOOK_URL:
+    url = url or settings.N8N_WEBHOOK_URL
+    if not url:
         print("⚠️  N8N_WEBHOOK_URL non configuré")
         return None
-    
+
+    if not breaker.allow():
+        N8N_REQUESTS.labels("circuit_open").inc()
+        return {"error": "n8n indisponible (circuit ouvert)"}
+
+    init_client()
+    start = time.perf_counter()
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                settings.N8N_WEBHOOK_URL,
-                json=payload,
-                timeout=10.0
-            )
-            return response.json()
+        async with _host_limit(url):
+            response = await _client.post(url, json=payload)
+        response.raise_for_status()
+        result = response.json()
     except Exception as e:
+        N8N_DURATION.labels().observe(time.perf_counter() - start)
+        N8N_REQUESTS.labels("error").inc()
+        breaker.record_failure()
         print(f"❌ Erreur webhook n8n: {e}")
-        return {"error": "Impossible d'appeler n8n"}
\ No newline at end of file
+        return {"error": "Impossible d'appeler n8n"}
+    except BaseException:
+        # Annulation : sans cela l'essai demi-ouvert resterait pris et le circuit ouvert
+        breaker.release()
+        raise
+
+    N8N_DURATION.labels().observe(time.perf_counter() - start)
+    N8N_REQUESTS.labels("success").inc()
+    breaker.record_success()
+    return result
@@ -0,0 +1,126 @@
+# ============================================
+# app/services/profiling.py - Profilage de requêtes à la demande
+# ============================================
+"""
+Middleware ASGI qui profile une requête :
+- à la demande : en-tête `X-Profile` égal à PROFILE_TOKEN
+- par échantillonnage : une requête sur PROFILE_EVERY_N (0 = désactivé)
+
+Un seul profil à la fois. Le profil est écrit dans PROFILE_DIR (les
+PROFILE_KEEP plus récents sont gardés) et son identifiant renvoyé dans
+l'en-tête `X-Profile-Id` ; GET /api/monitoring/profiles/{profile_id} le
+télécharge.
+
+Avec pyinstrument (optionnel), le profil ne couvre que la tâche de la
+requête et il est écrit au format speedscope (https://www.speedscope.app,
+flamegraph). Sans pyinstrument, cProfile profile toute la boucle
+d'évènements pendant la requête et écrit un fichier pstats (.prof, lisible
+par snakeviz ou flameprof).
+"""
+import asyncio
+import cProfile
+import hmac
+import itertools
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+
+from config import settings
+
+try:
+    from pyinstrument import Profiler
+    from pyinstrument.renderers import SpeedscopeRenderer
+except ImportError:
+    Profiler = None
+    SpeedscopeRenderer = None
+
+PROFILE_HEADER = b"x-profile"
+EXTENSIONS = {".speedscope.json": "application/json", ".prof": "application/octet-stream"}
+
+_counter = itertools.count(1)
+_active = False
+
+def authorized(token: Optional[str]) -> bool:
+    """Jeton de profilage valide (PROFILE_TOKEN vide = profilage à la demande désactivé)"""
+    return bool(settings.PROFILE_TOKEN) and token is not None and \
+        hmac.compare_digest(token, settings.PROFILE_TOKEN)
+
+def profile_path(profile_id: str) -> Optional[Path]:
+    """Fichier d'un profil enregistré, None s'il n'existe pas"""
+    if not profile_id.replace("-", "").isalnum():
+        return None
+    for extension in EXTENSIONS:
+        path = Path(settings.PROFILE_DIR) / f"{profile_id}{extension}"
+        if path.is_file():
+            return path
+    return None
+
+def _prune(directory: Path):
+    files = sorted(directory.glob("*.*"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for path in files[settings.PROFILE_KEEP:]:
+        path.unlink(missing_ok=True)
+
+def _write(profile_id: str, profiler, label: str):
+    directory = Path(settings.PROFILE_DIR)
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        if isinstance(profiler, cProfile.Profile):
+            profiler.dump_stats(directory / f"{profile_id}.prof")
+        else:
+            (directory / f"{profile_id}.speedscope.json").write_text(profiler.output(SpeedscopeRenderer()))
+        _prune(directory)
+    except Exception as e:
+        print(f"⚠️ Profil {profile_id} non enregistré: {e}")
+        return
+    print(f"🔬 Profil {profile_id} enregistré ({label})")
+
+class ProfilerMiddleware:
+    """Middleware ASGI : profile les requêtes demandées ou échantillonnées"""
+
+    def __init__(self, app):
+        self.app = app
+
+    def _requested(self, scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return authorized(value.decode("latin-1"))
+        return False
+
+    async def __call__(self, scope, receive, send):
+        global _active
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        every = settings.PROFILE_EVERY_N
+        sampled = every > 0 and next(_counter) % every == 0
+        if _active or not (sampled or self._requested(scope)):
+            await self.app(scope, receive, send)
+            return
+
+        _active = True
+        profile_id = uuid.uuid4().hex
+        label = f"{scope['method']} {scope['path']}"
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        if Profiler is not None:
+            profiler = Profiler(async_mode="enabled")
+            start_profiler, stop_profiler = profiler.start, profiler.stop
+        else:
+            profiler = cProfile.Profile()
+            start_profiler, stop_profiler = profiler.enable, profiler.disable
+
+        start = time.perf_counter()
+        start_profiler()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            stop_profiler()
+            _active = False
+            label += f", {(time.perf_counter() - start) * 1000:.0f} ms"
+            await asyncio.to_thread(_write, profile_id, profiler, label)
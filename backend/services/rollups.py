@@ -0,0 +1,457 @@
+# ============================================
+# app/services/rollups.py - Agrégats journaliers des ventes
+# ============================================
+"""
+Tables de cumuls pré-agrégés utilisées par les endpoints du dashboard :
+
+- rollup_ventes_magasin_jour : magasin × jour (CA HT/TTC, quantités, coût,
+  nombre de transactions, nombre de clients distincts du jour)
+- rollup_ventes_produit_jour : magasin × produit × jour (CA HT/TTC, quantités,
+  coût, nombre de lignes)
+- rollup_ventes_categorie_jour : magasin × catégorie × jour (CA HT, coût,
+  quantités, nombre de ventes contenant la catégorie)
+- rollup_ventes_region_jour : région × catégorie × jour, dérivée des deux
+  précédentes ; catégorie 0 = toutes catégories, région 0 = sans région.
+  C'est elle que lisent les séries temporelles sans filtre magasin.
+
+Des triggers sur `ventes` et `lignes_ventes` marquent les couples
+(magasin, jour) modifiés dans `rollup_jours_modifies` ; le rafraîchissement
+incrémental ne recalcule que ces couples.
+
+Mise à jour d'une installation existante : `install` remplit les cumuls
+catégorie et région depuis l'historique s'ils ne couvrent pas toute la
+période des cumuls magasin (tables ajoutées depuis), sans toucher aux autres.
+
+Usage :
+    python -m services.rollups install   # crée tables, index et triggers
+    python -m services.rollups rebuild   # reconstruit tout l'historique
+    python -m services.rollups refresh   # traite les jours modifiés
+"""
+import argparse
+import asyncio
+
+from config import settings
+from database import init_db, close_db, get_db
+from services.cache import invalidate
+from services.dashboard_stream import NOTIFY_SQL
+
+# ============================================
+# Schéma
+# ============================================
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS rollup_ventes_magasin_jour (
+    magasin_id      INTEGER NOT NULL,
+    jour            DATE NOT NULL,
+    ca_ht           NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    ca_ttc          NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    quantite        BIGINT NOT NULL DEFAULT 0,
+    cout            NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    nb_transactions INTEGER NOT NULL DEFAULT 0,
+    nb_clients      INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (magasin_id, jour)
+);
+CREATE INDEX IF NOT EXISTS idx_rollup_magasin_jour_jour
+    ON rollup_ventes_magasin_jour (jour);
+
+CREATE TABLE IF NOT EXISTS rollup_ventes_produit_jour (
+    magasin_id INTEGER NOT NULL,
+    produit_id INTEGER NOT NULL,
+    jour       DATE NOT NULL,
+    ca_ht      NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    ca_ttc     NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    quantite   BIGINT NOT NULL DEFAULT 0,
+    cout       NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    nb_lignes  INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (magasin_id, jour, produit_id)
+);
+CREATE INDEX IF NOT EXISTS idx_rollup_produit_jour_jour
+    ON rollup_ventes_produit_jour (jour, produit_id);
+
+CREATE TABLE IF NOT EXISTS rollup_ventes_categorie_jour (
+    magasin_id      INTEGER NOT NULL,
+    categorie_id    INTEGER NOT NULL,
+    jour            DATE NOT NULL,
+    ca_ht           NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    cout            NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    quantite        BIGINT NOT NULL DEFAULT 0,
+    nb_transactions INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (magasin_id, categorie_id, jour)
+);
+
+CREATE TABLE IF NOT EXISTS rollup_ventes_region_jour (
+    region_id       INTEGER NOT NULL,
+    categorie_id    INTEGER NOT NULL,
+    jour            DATE NOT NULL,
+    ca_ht           NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    cout            NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    quantite        BIGINT NOT NULL DEFAULT 0,
+    nb_transactions INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (categorie_id, jour, region_id)
+);
+
+CREATE TABLE IF NOT EXISTS rollup_jours_modifies (
+    magasin_id INTEGER NOT NULL,
+    jour       DATE NOT NULL,
+    PRIMARY KEY (magasin_id, jour)
+);
+
+-- Le recalcul d'un couple (magasin, jour) lit les ventes par cet index
+CREATE INDEX IF NOT EXISTS idx_ventes_magasin_date
+    ON ventes (magasin_id, date_vente);
+CREATE INDEX IF NOT EXISTS idx_lignes_ventes_vente
+    ON lignes_ventes (vente_id);
+
+CREATE OR REPLACE FUNCTION rollup_marquer_ventes() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO rollup_jours_modifies (magasin_id, jour)
+        SELECT DISTINCT magasin_id, date_vente::date FROM nouvelles
+        ON CONFLICT DO NOTHING;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO rollup_jours_modifies (magasin_id, jour)
+        SELECT DISTINCT magasin_id, date_vente::date FROM anciennes
+        ON CONFLICT DO NOTHING;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION rollup_marquer_lignes() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO rollup_jours_modifies (magasin_id, jour)
+        SELECT DISTINCT v.magasin_id, v.date_vente::date
+        FROM nouvelles n JOIN ventes v ON v.id = n.vente_id
+        ON CONFLICT DO NOTHING;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO rollup_jours_modifies (magasin_id, jour)
+        SELECT DISTINCT v.magasin_id, v.date_vente::date
+        FROM anciennes a JOIN ventes v ON v.id = a.vente_id
+        ON CONFLICT DO NOTHING;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_rollup_ventes_ins ON ventes;
+DROP TRIGGER IF EXISTS trg_rollup_ventes_upd ON ventes;
+DROP TRIGGER IF EXISTS trg_rollup_ventes_del ON ventes;
+CREATE TRIGGER trg_rollup_ventes_ins AFTER INSERT ON ventes
+    REFERENCING NEW TABLE AS nouvelles
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_marquer_ventes();
+CREATE TRIGGER trg_rollup_ventes_upd AFTER UPDATE ON ventes
+    REFERENCING OLD TABLE AS anciennes NEW TABLE AS nouvelles
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_marquer_ventes();
+CREATE TRIGGER trg_rollup_ventes_del AFTER DELETE ON ventes
+    REFERENCING OLD TABLE AS anciennes
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_marquer_ventes();
+
+DROP TRIGGER IF EXISTS trg_rollup_lignes_ins ON lignes_ventes;
+DROP TRIGGER IF EXISTS trg_rollup_lignes_upd ON lignes_ventes;
+DROP TRIGGER IF EXISTS trg_rollup_lignes_del ON lignes_ventes;
+CREATE TRIGGER trg_rollup_lignes_ins AFTER INSERT ON lignes_ventes
+    REFERENCING NEW TABLE AS nouvelles
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_marquer_lignes();
+CREATE TRIGGER trg_rollup_lignes_upd AFTER UPDATE ON lignes_ventes
+    REFERENCING OLD TABLE AS anciennes NEW TABLE AS nouvelles
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_marquer_lignes();
+CREATE TRIGGER trg_rollup_lignes_del AFTER DELETE ON lignes_ventes
+    REFERENCING OLD TABLE AS anciennes
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_marquer_lignes();
+"""
+
+# ============================================
+# Agrégation
+# ============================================
+# {perimetre} restreint les ventes lues : vide pour une reconstruction
+# complète, jointure sur le lot de jours modifiés pour un rafraîchissement.
+
+_PERIMETRE_LOT = """
+    JOIN _rollup_lot l ON l.magasin_id = v.magasin_id
+        AND v.date_vente >= l.jour AND v.date_vente < l.jour + 1
+"""
+
+_INSERT_MAGASIN_JOUR = """
+    INSERT INTO rollup_ventes_magasin_jour (
+        magasin_id, jour, ca_ht, ca_ttc, quantite, cout, nb_transactions, nb_clients
+    )
+    WITH ventes_jour AS (
+        SELECT
+            v.magasin_id,
+            v.date_vente::date as jour,
+            SUM(v.montant_ht) as ca_ht,
+            SUM(v.montant_ttc) as ca_ttc,
+            COUNT(*) as nb_transactions,
+            COUNT(DISTINCT v.client_id) as nb_clients
+        FROM ventes v
+        {perimetre}
+        WHERE v.statut = 'validee'
+        GROUP BY v.magasin_id, v.date_vente::date
+    ),
+    lignes_jour AS (
+        SELECT
+            v.magasin_id,
+            v.date_vente::date as jour,
+            SUM(lv.quantite) as quantite,
+            SUM(lv.quantite * p.prix_achat) as cout
+        FROM ventes v
+        {perimetre}
+        JOIN lignes_ventes lv ON lv.vente_id = v.id
+        JOIN produits p ON p.id = lv.produit_id
+        WHERE v.statut = 'validee'
+        GROUP BY v.magasin_id, v.date_vente::date
+    )
+    SELECT
+        vj.magasin_id,
+        vj.jour,
+        COALESCE(vj.ca_ht, 0),
+        COALESCE(vj.ca_ttc, 0),
+        COALESCE(lj.quantite, 0),
+        COALESCE(lj.cout, 0),
+        vj.nb_transactions,
+        vj.nb_clients
+    FROM ventes_jour vj
+    LEFT JOIN lignes_jour lj ON lj.magasin_id = vj.magasin_id AND lj.jour = vj.jour
+"""
+
+_INSERT_PRODUIT_JOUR = """
+    INSERT INTO rollup_ventes_produit_jour (
+        magasin_id, produit_id, jour, ca_ht, ca_ttc, quantite, cout, nb_lignes
+    )
+    SELECT
+        v.magasin_id,
+        lv.produit_id,
+        v.date_vente::date as jour,
+        COALESCE(SUM(lv.montant_total_ht), 0),
+        COALESCE(SUM(lv.montant_total_ttc), 0),
+        COALESCE(SUM(lv.quantite), 0),
+        COALESCE(SUM(lv.quantite * p.prix_achat), 0),
+        COUNT(*)
+    FROM ventes v
+    {perimetre}
+    JOIN lignes_ventes lv ON lv.vente_id = v.id
+    JOIN produits p ON p.id = lv.produit_id
+    WHERE v.statut = 'validee'
+    GROUP BY v.magasin_id, lv.produit_id, v.date_vente::date
+"""
+
+_INSERT_CATEGORIE_JOUR = """
+    INSERT INTO rollup_ventes_categorie_jour (
+        magasin_id, categorie_id, jour, ca_ht, cout, quantite, nb_transactions
+    )
+    SELECT
+        v.magasin_id,
+        p.categorie_id,
+        v.date_vente::date as jour,
+        COALESCE(SUM(lv.montant_total_ht), 0),
+        COALESCE(SUM(lv.quantite * p.prix_achat), 0),
+        COALESCE(SUM(lv.quantite), 0),
+        COUNT(DISTINCT v.id)
+    FROM ventes v
+    {perimetre}
+    JOIN lignes_ventes lv ON lv.vente_id = v.id
+    JOIN produits p ON p.id = lv.produit_id
+    WHERE v.statut = 'validee' AND p.categorie_id IS NOT NULL
+    GROUP BY v.magasin_id, p.categorie_id, v.date_vente::date
+"""
+
+# Cumuls par région, calculés depuis les cumuls magasin : {perimetre} restreint
+# aux couples (région, jour) touchés par le lot
+_PERIMETRE_REGIONS = """
+    JOIN _rollup_regions lr ON lr.region_id = COALESCE(m.region_id, 0) AND lr.jour = r.jour
+"""
+
+_INSERT_REGION_JOUR = """
+    INSERT INTO rollup_ventes_region_jour (
+        region_id, categorie_id, jour, ca_ht, cout, quantite, nb_transactions
+    )
+    SELECT COALESCE(m.region_id, 0), 0, r.jour,
+           SUM(r.ca_ht), SUM(r.cout), SUM(r.quantite), SUM(r.nb_transactions)
+    FROM rollup_ventes_magasin_jour r
+    JOIN magasins m ON m.id = r.magasin_id
+    {perimetre}
+    GROUP BY COALESCE(m.region_id, 0), r.jour
+    UNION ALL
+    SELECT COALESCE(m.region_id, 0), r.categorie_id, r.jour,
+           SUM(r.ca_ht), SUM(r.cout), SUM(r.quantite), SUM(r.nb_transactions)
+    FROM rollup_ventes_categorie_jour r
+    JOIN magasins m ON m.id = r.magasin_id
+    {perimetre}
+    GROUP BY COALESCE(m.region_id, 0), r.categorie_id, r.jour
+"""
+
+async def _backfill(conn) -> bool:
+    """
+    Remplit les cumuls catégorie et région d'une installation existante :
+    créés vides, ils ne contiendraient que les jours modifiés depuis
+    """
+    async with conn.transaction():
+        # Même verrou que la reconstruction : pas de rafraîchissement concurrent
+        await conn.execute("LOCK TABLE rollup_jours_modifies IN EXCLUSIVE MODE")
+        # Les cumuls région « toutes catégories » couvrent les mêmes jours que
+        # les cumuls magasin ; catégorie et région sont remplis ensemble
+        complete = await conn.fetchval("""
+            SELECT m.debut IS NULL OR r.debut <= m.debut
+            FROM (SELECT MIN(jour) AS debut FROM rollup_ventes_magasin_jour) m,
+                 (SELECT MIN(jour) AS debut FROM rollup_ventes_region_jour WHERE categorie_id = 0) r
+        """)
+        if complete:
+            return False
+        await conn.execute("TRUNCATE rollup_ventes_categorie_jour, rollup_ventes_region_jour")
+        await conn.execute(_INSERT_CATEGORIE_JOUR.format(perimetre=""))
+        await conn.execute(_INSERT_REGION_JOUR.format(perimetre=""))
+        await conn.execute(NOTIFY_SQL, "ventes")
+        return True
+
+async def install_schema():
+    """Crée les tables de cumuls, les index et les triggers de marquage"""
+    async with get_db() as conn:
+        await conn.execute(SCHEMA_SQL)
+        if await _backfill(conn):
+            print("✅ Cumuls catégorie et région remplis depuis l'historique")
+    print("✅ Schéma des cumuls installé")
+
+async def rebuild(conn):
+    """Reconstruit intégralement les cumuls sur une connexion donnée"""
+    async with conn.transaction():
+        await conn.execute("""
+            LOCK TABLE rollup_jours_modifies IN EXCLUSIVE MODE;
+            TRUNCATE rollup_ventes_magasin_jour, rollup_ventes_produit_jour,
+                     rollup_ventes_categorie_jour, rollup_ventes_region_jour,
+                     rollup_jours_modifies;
+        """)
+        await conn.execute(_INSERT_MAGASIN_JOUR.format(perimetre=""))
+        await conn.execute(_INSERT_PRODUIT_JOUR.format(perimetre=""))
+        await conn.execute(_INSERT_CATEGORIE_JOUR.format(perimetre=""))
+        await conn.execute(_INSERT_REGION_JOUR.format(perimetre=""))
+        await conn.execute(NOTIFY_SQL, "ventes")
+
+async def rebuild_rollups():
+    """Reconstruit intégralement les cumuls à partir des ventes"""
+    async with get_db() as conn:
+        await rebuild(conn)
+    print("✅ Cumuls reconstruits")
+
+async def refresh_rollups() -> int:
+    """
+    Recalcule les couples (magasin, jour) marqués par les triggers.
+    Retourne le nombre de couples traités.
+    """
+    async with get_db() as conn:
+        async with conn.transaction():
+            await conn.execute("""
+                CREATE TEMP TABLE _rollup_lot (
+                    magasin_id INTEGER, jour DATE
+                ) ON COMMIT DROP
+            """)
+            nb_jours = await conn.fetchval("""
+                WITH lot AS (
+                    DELETE FROM rollup_jours_modifies
+                    RETURNING magasin_id, jour
+                ), inseres AS (
+                    INSERT INTO _rollup_lot SELECT magasin_id, jour FROM lot
+                    RETURNING 1
+                )
+                SELECT COUNT(*) FROM inseres
+            """)
+            if not nb_jours:
+                return 0
+
+            await conn.execute("""
+                DELETE FROM rollup_ventes_magasin_jour r
+                USING _rollup_lot l
+                WHERE r.magasin_id = l.magasin_id AND r.jour = l.jour
+            """)
+            await conn.execute("""
+                DELETE FROM rollup_ventes_produit_jour r
+                USING _rollup_lot l
+                WHERE r.magasin_id = l.magasin_id AND r.jour = l.jour
+            """)
+            await conn.execute("""
+                DELETE FROM rollup_ventes_categorie_jour r
+                USING _rollup_lot l
+                WHERE r.magasin_id = l.magasin_id AND r.jour = l.jour
+            """)
+            await conn.execute(_INSERT_MAGASIN_JOUR.format(perimetre=_PERIMETRE_LOT))
+            await conn.execute(_INSERT_PRODUIT_JOUR.format(perimetre=_PERIMETRE_LOT))
+            await conn.execute(_INSERT_CATEGORIE_JOUR.format(perimetre=_PERIMETRE_LOT))
+
+            # Régions des magasins du lot : recalculées depuis les cumuls magasin
+            await conn.execute("""
+                CREATE TEMP TABLE _rollup_regions ON COMMIT DROP AS
+                SELECT DISTINCT COALESCE(m.region_id, 0) AS region_id, l.jour
+                FROM _rollup_lot l
+                JOIN magasins m ON m.id = l.magasin_id
+            """)
+            await conn.execute("""
+                DELETE FROM rollup_ventes_region_jour r
+                USING _rollup_regions lr
+                WHERE r.region_id = lr.region_id AND r.jour = lr.jour
+            """)
+            await conn.execute(_INSERT_REGION_JOUR.format(perimetre=_PERIMETRE_REGIONS))
+            # Dashboards ouverts (tous les processus) : cumuls modifiés
+            await conn.execute(NOTIFY_SQL, "ventes")
+    return nb_jours
+
+# ============================================
+# Rafraîchissement périodique
+# ============================================
+
+_refresher: asyncio.Task | None = None
+
+async def _refresh_loop(interval: float):
+    while True:
+        try:
+            nb_jours = await refresh_rollups()
+            if nb_jours:
+                invalidate("ventes")
+                print(f"🔄 Cumuls rafraîchis ({nb_jours} jours magasin)")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ Erreur rafraîchissement des cumuls: {e}")
+        await asyncio.sleep(interval)
+
+def start_refresher():
+    """Démarre le rafraîchissement incrémental en tâche de fond"""
+    global _refresher
+    if settings.ROLLUP_REFRESH_SECONDS <= 0 or _refresher:
+        return
+    _refresher = asyncio.create_task(_refresh_loop(settings.ROLLUP_REFRESH_SECONDS))
+
+async def stop_refresher():
+    """Arrête la tâche de rafraîchissement"""
+    global _refresher
+    if _refresher:
+        _refresher.cancel()
+        try:
+            await _refresher
+        except asyncio.CancelledError:
+            pass
+        _refresher = None
+
+# ============================================
+# CLI
+# ============================================
+
+async def _main(command: str):
+    await init_db()
+    try:
+        if command == "install":
+            await install_schema()
+        elif command == "rebuild":
+            await install_schema()
+            await rebuild_rollups()
+        elif command == "refresh":
+            nb_jours = await refresh_rollups()
+            print(f"✅ {nb_jours} jours magasin rafraîchis")
+    finally:
+        await close_db()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gestion des cumuls de ventes")
+    parser.add_argument("command", choices=["install", "rebuild", "refresh"])
+    asyncio.run(_main(parser.parse_args().command))
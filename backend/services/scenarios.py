@@ -0,0 +1,283 @@
+# ============================================
+# app/services/scenarios.py - Persistance des scénarios
+# ============================================
+"""
+Liste : pagination par curseur (keyset) sur (created_at, id) ; chaque page
+reprend après la dernière ligne de la précédente, sans OFFSET ni tri
+complet. Les filtres s'appuient sur des index partiels (scénarios non
+supprimés) qui se terminent par l'ordre de tri, et la recherche par nom sur
+un index trigramme.
+
+Détail : les résultats calculés (résultats, évolution, impact par magasin,
+Monte Carlo) sont enregistrés avec le scénario. Une lecture est une seule
+ligne ; le calcul n'est refait que si les paramètres changent ou si la
+ligne a été calculée avec une autre version du modèle (MODEL_VERSION).
+`version` est incrémentée à chaque écriture et sert d'ETag.
+
+Usage :
+    python -m services.scenarios install   # colonnes et index (bases existantes)
+"""
+import argparse
+import asyncio
+import base64
+import json
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+from database import init_db, close_db, get_db
+from queries import register
+from models.scenario import ScenarioDetail, ScenarioListItem, ScenarioPage, ScenarioParameters
+from models.simulation import MonteCarloResult
+from services.cache import cached
+from services.calculations import MODEL_VERSION, PERIOD_MULTIPLIERS, calculate_simulation_results, generate_evolution_data
+from services.store_weights import compute_store_impact
+
+SCHEMA_SQL = """
+ALTER TABLE scenarios
+    ADD COLUMN IF NOT EXISTS results JSONB,
+    ADD COLUMN IF NOT EXISTS evolution_data JSONB,
+    ADD COLUMN IF NOT EXISTS store_impact JSONB,
+    ADD COLUMN IF NOT EXISTS monte_carlo JSONB,
+    ADD COLUMN IF NOT EXISTS model_version INTEGER,
+    ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS idx_scenarios_liste
+    ON scenarios (created_at DESC, id DESC) WHERE deleted = FALSE;
+CREATE INDEX IF NOT EXISTS idx_scenarios_status
+    ON scenarios (status, created_at DESC, id DESC) WHERE deleted = FALSE;
+CREATE INDEX IF NOT EXISTS idx_scenarios_scenario_type
+    ON scenarios (scenario_type, created_at DESC, id DESC) WHERE deleted = FALSE;
+CREATE INDEX IF NOT EXISTS idx_scenarios_simulation_type
+    ON scenarios ((parameters->>'simulation_type'), created_at DESC, id DESC) WHERE deleted = FALSE;
+CREATE INDEX IF NOT EXISTS idx_scenarios_created_by
+    ON scenarios (created_by, created_at DESC, id DESC) WHERE deleted = FALSE;
+CREATE INDEX IF NOT EXISTS idx_scenarios_name_trgm
+    ON scenarios USING gin (name gin_trgm_ops) WHERE deleted = FALSE;
+"""
+
+LIST_SQL = """
+    SELECT id, name, description, scenario_type,
+           COALESCE(parameters->>'simulation_type', 'unknown') AS simulation_type,
+           COALESCE(parameters->>'period', '6_months') AS period,
+           revenue_impact, cost_impact, margin_impact,
+           probability, status, created_at, created_by
+    FROM scenarios
+    WHERE {conditions}
+    ORDER BY created_at DESC, id DESC
+    LIMIT ${limit}
+"""
+
+def encode_cursor(created_at: int, scenario_id: str) -> str:
+    return base64.urlsafe_b64encode(f"{created_at}:{scenario_id}".encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[int, str]:
+    """Lève ValueError si le curseur est invalide"""
+    created_at, scenario_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(":", 1)
+    return int(created_at), scenario_id
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+async def list_scenarios(
+    limit: int,
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    scenario_type: Optional[str] = None,
+    simulation_type: Optional[str] = None,
+    created_by: Optional[str] = None,
+    search: Optional[str] = None,
+) -> ScenarioPage:
+    """Une page de scénarios, du plus récent au plus ancien"""
+    conditions = ["deleted = FALSE"]
+    params = []
+
+    def add(condition: str, value):
+        params.append(value)
+        conditions.append(condition.format(n=len(params)))
+
+    if status:
+        add("status = ${n}", status)
+    if scenario_type:
+        add("scenario_type = ${n}", scenario_type)
+    if simulation_type:
+        add("parameters->>'simulation_type' = ${n}", simulation_type)
+    if created_by:
+        add("created_by = ${n}", created_by)
+    if search:
+        add("name ILIKE '%' || ${n} || '%'", _escape_like(search))
+    if cursor:
+        created_at, scenario_id = decode_cursor(cursor)
+        params.append(created_at)
+        params.append(scenario_id)
+        conditions.append(f"(created_at, id) < (${len(params) - 1}, ${len(params)})")
+
+    # Une ligne de plus pour savoir s'il existe une page suivante
+    params.append(limit + 1)
+    query = LIST_SQL.format(conditions=" AND ".join(conditions), limit=len(params))
+
+    async with get_db() as conn:
+        rows = await conn.fetch(query, *params)
+
+    items = [
+        ScenarioListItem(
+            id=row['id'],
+            name=row['name'],
+            description=row['description'],
+            scenario_type=row['scenario_type'],
+            simulation_type=row['simulation_type'],
+            period=row['period'],
+            revenue_impact=float(row['revenue_impact']),
+            cost_impact=float(row['cost_impact']),
+            margin_impact=float(row['margin_impact']),
+            probability=float(row['probability']),
+            status=row['status'],
+            created_at=row['created_at'],
+            created_by=row['created_by']
+        )
+        for row in rows[:limit]
+    ]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return ScenarioPage(items=items, next_cursor=next_cursor)
+
+# ============================================
+# Résultats enregistrés
+# ============================================
+
+DETAIL_COLUMNS = """
+    id, name, description, scenario_type, parameters,
+    revenue_impact, cost_impact, margin_impact, probability, status,
+    created_at, created_by, results, evolution_data, store_impact,
+    monte_carlo, model_version, version
+"""
+
+DETAIL_SQL = register("scenarios.detail", f"""
+    SELECT {DETAIL_COLUMNS}
+    FROM scenarios
+    WHERE id = $1 AND deleted = FALSE
+""")
+
+SAVE_RESULTS_SQL = register("scenarios.save_results", f"""
+    UPDATE scenarios
+    SET revenue_impact = $2, cost_impact = $3, margin_impact = $4,
+        probability = COALESCE($5, probability),
+        results = $6::jsonb, evolution_data = $7::jsonb, store_impact = $8::jsonb,
+        monte_carlo = $9::jsonb, model_version = $10, version = version + 1
+    WHERE id = $1
+    RETURNING {DETAIL_COLUMNS}
+""")
+
+def default_probability(roi: float) -> float:
+    """Probabilité forfaitaire selon le ROI (hors Monte Carlo)"""
+    if roi > 200:
+        return 85.0
+    if roi < 100:
+        return 60.0
+    return 75.0
+
+async def compute_results(simulation_type: str, parameters: Dict[str, Any], period: str) -> Dict[str, Any]:
+    """Résultats, évolution et impact par magasin, prêts à être enregistrés"""
+    param_obj = ScenarioParameters(**{k: v for k, v in parameters.items()
+                                      if k not in ['simulation_type', 'period']})
+    results = calculate_simulation_results(simulation_type, param_obj, period)
+    return {
+        'results': results,
+        'evolution_data': generate_evolution_data(results.revenue_impact, period),
+        'store_impact': await compute_store_impact(results, parameters, PERIOD_MULTIPLIERS.get(period, 1)),
+    }
+
+def to_json(value: Any) -> Optional[str]:
+    return None if value is None else json.dumps(jsonable_encoder(value))
+
+def _load_json(value: Optional[str]):
+    return None if value is None else json.loads(value)
+
+async def save_results(conn, scenario_id: str, computed: Dict[str, Any],
+                       probability: Optional[float] = None,
+                       monte_carlo: Optional[MonteCarloResult] = None):
+    """
+    Enregistre des résultats recalculés (impacts, résultats, évolution,
+    impact par magasin) et incrémente la version. La probabilité n'est
+    remplacée que si elle est fournie ; les bandes Monte Carlo enregistrées
+    ne correspondent plus aux résultats et sont remplacées par `monte_carlo`.
+    """
+    results = computed['results']
+    return await SAVE_RESULTS_SQL.fetchrow(conn, scenario_id, results.revenue_impact, results.cost_impact, results.margin_impact,
+         probability, to_json(results), to_json(computed['evolution_data']),
+         to_json(computed['store_impact']), to_json(monte_carlo), MODEL_VERSION)
+
+def row_to_detail(row) -> ScenarioDetail:
+    params_dict = _load_json(row['parameters']) or {}
+    return ScenarioDetail(
+        id=row['id'],
+        name=row['name'],
+        description=row['description'],
+        scenario_type=row['scenario_type'],
+        simulation_type=params_dict.get('simulation_type', 'unknown'),
+        period=params_dict.get('period', '6_months'),
+        parameters=params_dict,
+        revenue_impact=float(row['revenue_impact']),
+        cost_impact=float(row['cost_impact']),
+        margin_impact=float(row['margin_impact']),
+        probability=float(row['probability']),
+        status=row['status'],
+        created_at=row['created_at'],
+        created_by=row['created_by'],
+        version=row['version'],
+        results=_load_json(row['results']),
+        monte_carlo=_load_json(row['monte_carlo']),
+        evolution_data=_load_json(row['evolution_data']) or [],
+        store_impact=_load_json(row['store_impact']) or []
+    )
+
+@cached("scenario", ttl=300, tags=("scenarios",))
+async def load_scenario(scenario_id: str) -> Optional[ScenarioDetail]:
+    """
+    Lit un scénario et ses résultats enregistrés. Les lignes sans résultats
+    ou calculées avec une autre version du modèle sont recalculées et
+    réenregistrées une fois.
+    """
+    async with get_db() as conn:
+        row = await DETAIL_SQL.fetchrow(conn, scenario_id)
+        if not row:
+            return None
+
+        if row['results'] is None or row['model_version'] != MODEL_VERSION:
+            params_dict = _load_json(row['parameters']) or {}
+            computed = await compute_results(
+                params_dict.get('simulation_type', 'unknown'),
+                params_dict,
+                params_dict.get('period', '6_months'),
+            )
+            row = await save_results(conn, scenario_id, computed)
+
+    return row_to_detail(row)
+
+def etag(detail: ScenarioDetail) -> str:
+    return f'"{detail.id}-{detail.version}"'
+
+async def install_schema():
+    """Crée les colonnes de résultats et les index des scénarios"""
+    async with get_db() as conn:
+        await conn.execute(SCHEMA_SQL)
+    print("✅ Schéma des scénarios installé")
+
+# ============================================
+# CLI
+# ============================================
+
+async def _main(command: str):
+    await init_db()
+    try:
+        if command == "install":
+            await install_schema()
+    finally:
+        await close_db()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gestion des scénarios")
+    parser.add_argument("command", choices=["install"])
+    asyncio.run(_main(parser.parse_args().command))
@@ -0,0 +1,114 @@
+# ============================================
+# app/services/slow_queries.py - Journal des requêtes lentes
+# ============================================
+"""
+Toute requête SQL plus lente que SLOW_QUERY_MS est journalisée : nom logique
+(registre de queries.py, sinon "sql"), forme des paramètres (types et
+tailles, jamais les valeurs), durée et plan d'exécution.
+
+Deux sources :
+- les requêtes du registre, chronométrées par `Query` (les statements
+  préparés ne passent pas par les loggers d'asyncpg)
+- les autres requêtes, via le logger de requêtes posé sur chaque connexion
+  du pool (`database.init_db`)
+
+Le plan n'est demandé que pour une fraction des requêtes lentes
+(SLOW_QUERY_EXPLAIN_SAMPLE), au plus une fois par requête et par
+SLOW_QUERY_EXPLAIN_INTERVAL secondes, un seul à la fois, sur une connexion
+à part : le journal ne peut pas emballer la base. EXPLAIN ANALYZE réexécute
+la requête, il est donc réservé aux SELECT (transaction en lecture seule) ;
+les écritures n'ont que le plan estimé.
+"""
+import asyncio
+import json
+import random
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from config import settings
+from services.metrics import Counter
+
+SLOW_QUERIES = Counter(
+    "epm_db_slow_queries_total",
+    "Requêtes SQL au-delà de SLOW_QUERY_MS par nom logique",
+    ("query",),
+)
+
+_log: Deque[Dict[str, Any]] = deque(maxlen=settings.SLOW_QUERY_LOG_SIZE)
+_last_explain: Dict[str, float] = {}
+_explain_task: Optional[asyncio.Task] = None
+_pool = None
+_is_registered: Callable[[str], bool] = lambda sql: False
+
+def init(pool, is_registered: Callable[[str], bool]):
+    """Pool utilisé pour les EXPLAIN ; `is_registered` reconnaît les requêtes du registre"""
+    global _pool, _is_registered
+    _pool = pool
+    _is_registered = is_registered
+
+def _shape(value: Any) -> str:
+    """Type (et taille) d'un paramètre, sans sa valeur"""
+    if value is None:
+        return "null"
+    if isinstance(value, (str, bytes)):
+        return f"{type(value).__name__}({len(value)})"
+    if isinstance(value, (list, tuple)):
+        return f"list[{len(value)}]"
+    return type(value).__name__
+
+def _should_explain(sql: str) -> bool:
+    if _pool is None or random.random() >= settings.SLOW_QUERY_EXPLAIN_SAMPLE:
+        return False
+    if _explain_task is not None and not _explain_task.done():
+        return False
+    now = time.monotonic()
+    if now - _last_explain.get(sql, float("-inf")) < settings.SLOW_QUERY_EXPLAIN_INTERVAL:
+        return False
+    _last_explain[sql] = now
+    return True
+
+async def _explain(entry: Dict[str, Any], sql: str, args: tuple):
+    read_only = sql.lstrip().upper().startswith(("SELECT", "WITH"))
+    options = "ANALYZE, BUFFERS, FORMAT JSON" if read_only else "FORMAT JSON"
+    try:
+        async with _pool.acquire() as conn:
+            async with conn.transaction(readonly=read_only):
+                plan = await conn.fetchval(f"EXPLAIN ({options}) {sql}", *args)
+        entry["plan"] = json.loads(plan) if isinstance(plan, str) else plan
+        entry["plan_analyze"] = read_only
+    except Exception as e:
+        entry["plan_error"] = str(e)
+
+def record(name: str, sql: str, args: tuple, elapsed: float, error: Optional[BaseException] = None):
+    """Journalise une requête si elle dépasse le seuil (0 = journal désactivé)"""
+    global _explain_task
+    if settings.SLOW_QUERY_MS <= 0 or elapsed * 1000 < settings.SLOW_QUERY_MS:
+        return
+
+    SLOW_QUERIES.labels(name).inc()
+    entry = {
+        "name": name,
+        "at": datetime.now().isoformat(timespec="seconds"),
+        "duration_ms": round(elapsed * 1000, 1),
+        "params": [_shape(value) for value in args],
+        "error": None if error is None else str(error) or type(error).__name__,
+        "sql": sql.strip(),
+    }
+    _log.append(entry)
+    print(f"🐢 Requête lente {name}: {entry['duration_ms']} ms")
+
+    # Requête en erreur ou annulée : l'EXPLAIN ANALYZE la réexécuterait en entier
+    if error is None and _should_explain(sql):
+        _explain_task = asyncio.get_running_loop().create_task(_explain(entry, sql, args))
+
+def log_query(logged: Any):
+    """Logger de requêtes asyncpg : requêtes hors registre, hors EXPLAIN du journal"""
+    if _is_registered(logged.query) or logged.query.startswith("EXPLAIN ("):
+        return
+    record("sql", logged.query, logged.args or (), logged.elapsed, logged.exception)
+
+def entries() -> List[Dict[str, Any]]:
+    """Requêtes lentes journalisées, les plus récentes d'abord"""
+    return list(reversed(_log))
@@ -0,0 +1,355 @@
+# ============================================
+# app/services/stock_alerts.py - Alertes de stock poussées
+# ============================================
+"""
+Ensemble des alertes de stock (disponible <= stock de sécurité) gardé en
+mémoire et tenu à jour par PostgreSQL :
+
+- des triggers sur `stock` envoient un NOTIFY `stock_alertes` avec les
+  couples (magasin, produit) modifiés par l'instruction ("*" au-delà de
+  NOTIFY_MAX_KEYS couples, ou si produits ou magasins changent)
+- une connexion dédiée écoute le canal, regroupe les notifications pendant
+  STOCK_ALERTS_DEBOUNCE_MS et relit uniquement les couples concernés
+  ("*" : rechargement complet)
+- chaque changement (nouvelle alerte, alerte modifiée, fin d'alerte) est
+  poussé aux abonnés Server-Sent Events, filtrés par magasin
+
+L'ensemble est chargé au démarrage et rechargé à chaque reconnexion (les
+notifications envoyées pendant la coupure sont perdues). GET
+/api/stock/alertes est servi depuis la mémoire. Sans les triggers
+(`install` non exécuté), rien ne notifierait les changements : l'ensemble
+n'est pas utilisé et les alertes sont lues en SQL, jusqu'à leur installation.
+"""
+import argparse
+import asyncio
+import json
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import asyncpg
+
+from config import settings
+from database import WRITE, init_db, close_db, get_db
+from queries import register
+
+CHANNEL = "stock_alertes"
+NOTIFY_MAX_KEYS = 200
+TRIGGERS = [
+    "trg_stock_alertes_ins", "trg_stock_alertes_upd", "trg_stock_alertes_del",
+    "trg_stock_alertes_produits", "trg_stock_alertes_magasins",
+]
+
+SCHEMA_SQL = """
+CREATE OR REPLACE FUNCTION stock_alertes_notifier() RETURNS trigger AS $$
+DECLARE
+    nb   INTEGER;
+    cles JSONB;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT COUNT(*), jsonb_agg(jsonb_build_array(magasin_id, produit_id))
+        INTO nb, cles FROM nouvelles;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT COUNT(*), jsonb_agg(jsonb_build_array(magasin_id, produit_id))
+        INTO nb, cles FROM anciennes;
+    ELSE
+        SELECT COUNT(*), jsonb_agg(jsonb_build_array(magasin_id, produit_id))
+        INTO nb, cles
+        FROM (
+            SELECT magasin_id, produit_id FROM nouvelles
+            UNION
+            SELECT magasin_id, produit_id FROM anciennes
+        ) modifies;
+    END IF;
+
+    IF nb > """ + str(NOTIFY_MAX_KEYS) + """ THEN
+        PERFORM pg_notify('""" + CHANNEL + """', '*');
+    ELSIF nb > 0 THEN
+        PERFORM pg_notify('""" + CHANNEL + """', cles::text);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION stock_alertes_recharger() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('""" + CHANNEL + """', '*');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_stock_alertes_ins ON stock;
+DROP TRIGGER IF EXISTS trg_stock_alertes_upd ON stock;
+DROP TRIGGER IF EXISTS trg_stock_alertes_del ON stock;
+CREATE TRIGGER trg_stock_alertes_ins AFTER INSERT ON stock
+    REFERENCING NEW TABLE AS nouvelles
+    FOR EACH STATEMENT EXECUTE FUNCTION stock_alertes_notifier();
+CREATE TRIGGER trg_stock_alertes_upd AFTER UPDATE ON stock
+    REFERENCING OLD TABLE AS anciennes NEW TABLE AS nouvelles
+    FOR EACH STATEMENT EXECUTE FUNCTION stock_alertes_notifier();
+CREATE TRIGGER trg_stock_alertes_del AFTER DELETE ON stock
+    REFERENCING OLD TABLE AS anciennes
+    FOR EACH STATEMENT EXECUTE FUNCTION stock_alertes_notifier();
+
+-- Seuils et noms des produits, noms des magasins : rechargement complet
+DROP TRIGGER IF EXISTS trg_stock_alertes_produits ON produits;
+DROP TRIGGER IF EXISTS trg_stock_alertes_magasins ON magasins;
+CREATE TRIGGER trg_stock_alertes_produits
+    AFTER UPDATE OF nom, stock_minimum, stock_securite OR DELETE ON produits
+    FOR EACH STATEMENT EXECUTE FUNCTION stock_alertes_recharger();
+CREATE TRIGGER trg_stock_alertes_magasins
+    AFTER UPDATE OF nom OR DELETE ON magasins
+    FOR EACH STATEMENT EXECUTE FUNCTION stock_alertes_recharger();
+"""
+
+_SELECT_ALERTES = """
+    SELECT
+        s.magasin_id,
+        s.produit_id,
+        m.nom as magasin,
+        p.nom as produit,
+        s.quantite,
+        s.quantite_reservee,
+        (s.quantite - s.quantite_reservee) as disponible,
+        p.stock_minimum,
+        CASE
+            WHEN (s.quantite - s.quantite_reservee) <= p.stock_minimum THEN 'critique'
+            ELSE 'attention'
+        END as niveau_alerte
+    FROM stock s
+    JOIN magasins m ON s.magasin_id = m.id
+    JOIN produits p ON s.produit_id = p.id
+"""
+
+ALL_ALERTS_SQL = register("stock_alertes.toutes", _SELECT_ALERTES + """
+    WHERE (s.quantite - s.quantite_reservee) <= p.stock_securite
+""")
+
+CHANGED_ALERTS_SQL = register("stock_alertes.modifiees", _SELECT_ALERTES + """
+    JOIN unnest($1::int[], $2::int[]) AS c(magasin_id, produit_id)
+        ON c.magasin_id = s.magasin_id AND c.produit_id = s.produit_id
+    WHERE (s.quantite - s.quantite_reservee) <= p.stock_securite
+""")
+
+Key = Tuple[int, int]
+
+class AlertSet:
+    """Alertes en mémoire, index par magasin, listes triées recalculées à la demande"""
+
+    def __init__(self):
+        self.alerts: Dict[Key, Dict[str, Any]] = {}
+        self.by_store: Dict[int, Set[Key]] = {}
+        self.ready = False
+        self._sorted: Dict[Optional[int], List[Dict[str, Any]]] = {}
+
+    @staticmethod
+    def _rank(alert: Dict[str, Any]):
+        # Critiques d'abord, puis disponible croissant (ordre de l'ancienne requête)
+        return (alert["niveau_alerte"] != "critique", alert["disponible"])
+
+    def top(self, magasin_id: Optional[int] = None, limit: Optional[int] = 20) -> List[Dict[str, Any]]:
+        ordered = self._sorted.get(magasin_id)
+        if ordered is None:
+            # Identifiant arbitraire de la requête : rien à mettre en cache
+            if magasin_id is not None and magasin_id not in self.by_store:
+                return []
+            keys = self.alerts.keys() if magasin_id is None else self.by_store[magasin_id]
+            ordered = self._sorted[magasin_id] = sorted(
+                (self.alerts[key] for key in keys), key=self._rank
+            )
+        return ordered[:limit]
+
+    def apply(self, rows: List[Dict[str, Any]], scope: Optional[Set[Key]]) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Remplace les alertes de `scope` (None = toutes) par `rows` ; retourne
+        les changements [("alerte" | "fin", alerte)]
+        """
+        fresh = {(row["magasin_id"], row["produit_id"]): row for row in rows}
+        scope = set(self.alerts) | set(fresh) if scope is None else scope
+        changes = []
+        for key in scope:
+            old, new = self.alerts.get(key), fresh.get(key)
+            if new is not None and new != old:
+                self.alerts[key] = new
+                self.by_store.setdefault(key[0], set()).add(key)
+                changes.append(("alerte", new))
+            elif new is None and old is not None:
+                del self.alerts[key]
+                self.by_store[key[0]].discard(key)
+                changes.append(("fin", old))
+        if changes:
+            self._sorted.clear()
+        return changes
+
+alert_set = AlertSet()
+
+# ============================================
+# Abonnés Server-Sent Events
+# ============================================
+
+class Subscriber:
+    """File d'évènements d'un client ; débordement = client déconnecté"""
+
+    def __init__(self, magasin_id: Optional[int]):
+        self.magasin_id = magasin_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.STOCK_ALERTS_QUEUE_SIZE)
+        self.overflow = False
+
+    def push(self, event: str, alert: Dict[str, Any]):
+        if self.magasin_id is not None and alert["magasin_id"] != self.magasin_id:
+            return
+        try:
+            self.queue.put_nowait((event, alert))
+        except asyncio.QueueFull:
+            self.overflow = True
+
+_subscribers: Set[Subscriber] = set()
+
+def subscribe(magasin_id: Optional[int] = None) -> Subscriber:
+    subscriber = Subscriber(magasin_id)
+    _subscribers.add(subscriber)
+    return subscriber
+
+def unsubscribe(subscriber: Subscriber):
+    _subscribers.discard(subscriber)
+
+def _broadcast(changes: List[Tuple[str, Dict[str, Any]]]):
+    for subscriber in list(_subscribers):
+        for event, alert in changes:
+            subscriber.push(event, alert)
+
+# ============================================
+# Chargement et écoute des notifications
+# ============================================
+
+async def _load(keys: Optional[Set[Key]]):
+    # Primaire : un réplica en retard relirait l'état d'avant la notification
+    async with get_db(WRITE) as conn:
+        if keys is None:
+            rows = await ALL_ALERTS_SQL.fetch(conn)
+        else:
+            magasins, produits = zip(*keys)
+            rows = await CHANGED_ALERTS_SQL.fetch(conn, list(magasins), list(produits))
+    changes = alert_set.apply([dict(row) for row in rows], keys)
+    _broadcast(changes)
+    return changes
+
+class _Listener:
+    def __init__(self):
+        self.pending: Set[Key] = set()
+        self.reload = False
+        self.wakeup = asyncio.Event()
+        self.closed = asyncio.Event()
+
+    def on_notify(self, conn, pid, channel, payload):
+        if payload == "*":
+            self.reload = True
+        else:
+            try:
+                self.pending.update((int(m), int(p)) for m, p in json.loads(payload))
+            except (ValueError, TypeError):
+                self.reload = True
+        self.wakeup.set()
+
+    def on_terminate(self, conn):
+        self.closed.set()
+        self.wakeup.set()
+
+    async def drain(self):
+        """Applique les notifications reçues, regroupées sur STOCK_ALERTS_DEBOUNCE_MS"""
+        while not self.closed.is_set():
+            await self.wakeup.wait()
+            await asyncio.sleep(settings.STOCK_ALERTS_DEBOUNCE_MS / 1000)
+            self.wakeup.clear()
+            reload, keys = self.reload, self.pending
+            self.reload, self.pending = False, set()
+            if reload:
+                await _load(None)
+            elif keys:
+                await _load(keys)
+
+async def _triggers_installed(conn) -> bool:
+    installed = await conn.fetchval(
+        "SELECT COUNT(*) FROM pg_trigger WHERE tgname = ANY($1::text[]) AND tgenabled <> 'D'",
+        TRIGGERS,
+    )
+    return installed == len(TRIGGERS)
+
+async def _listen_loop():
+    warned = False
+    while True:
+        conn = None
+        try:
+            conn = await asyncpg.connect(
+                host=settings.DB_HOST,
+                port=settings.DB_PORT,
+                user=settings.DB_USER,
+                password=settings.DB_PASSWORD,
+                database=settings.DB_NAME,
+            )
+            if await _triggers_installed(conn):
+                warned = False
+                listener = _Listener()
+                conn.add_termination_listener(listener.on_terminate)
+                await conn.add_listener(CHANNEL, listener.on_notify)
+                # Écoute avant le chargement : aucune modification n'est perdue
+                changes = await _load(None)
+                alert_set.ready = True
+                print(f"🔔 Alertes de stock chargées ({len(alert_set.alerts)} alertes, {len(changes)} changements)")
+                await listener.drain()
+                print("⚠️ Connexion des alertes de stock perdue, reconnexion")
+            elif not warned:
+                # Vérifié de nouveau à chaque essai : pris en compte dès l'installation
+                print("⚠️ Triggers des alertes de stock absents (python -m services.stock_alerts install) : "
+                      "alertes lues en SQL")
+                warned = True
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ Erreur alertes de stock: {e}")
+        finally:
+            alert_set.ready = False
+            if conn is not None and not conn.is_closed():
+                await conn.close()
+        await asyncio.sleep(settings.STOCK_ALERTS_RETRY_SECONDS)
+
+_listener_task: asyncio.Task | None = None
+
+def start_listener():
+    """Charge les alertes et écoute les notifications en tâche de fond"""
+    global _listener_task
+    if not settings.STOCK_ALERTS_ENABLED or _listener_task:
+        return
+    _listener_task = asyncio.create_task(_listen_loop())
+
+async def stop_listener():
+    """Arrête l'écoute des notifications"""
+    global _listener_task
+    if _listener_task:
+        _listener_task.cancel()
+        try:
+            await _listener_task
+        except asyncio.CancelledError:
+            pass
+        _listener_task = None
+
+async def install_schema():
+    """Installe les triggers de notification"""
+    async with get_db() as conn:
+        await conn.execute(SCHEMA_SQL)
+    print("✅ Triggers des alertes de stock installés")
+
+# ============================================
+# CLI
+# ============================================
+
+async def _main(command: str):
+    await init_db()
+    try:
+        if command == "install":
+            await install_schema()
+    finally:
+        await close_db()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Alertes de stock")
+    parser.add_argument("command", choices=["install"])
+    asyncio.run(_main(parser.parse_args().command))
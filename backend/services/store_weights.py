@@ -0,0 +1,210 @@
+# ============================================
+# app/services/store_weights.py - Répartition des impacts par magasin
+# ============================================
+"""
+Matrice de poids par magasin actif, lue dans les cumuls sur les
+STORE_WEIGHTS_DAYS derniers jours : CA, taux de marge et CA par catégorie.
+Elle est gardée en mémoire et rechargée en arrière-plan au-delà de
+STORE_WEIGHTS_TTL_SECONDS (les appels continuent d'utiliser l'ancienne).
+
+L'impact d'un scénario est réparti au prorata du CA de chaque magasin, ou de
+son CA dans la catégorie visée (`category`) ; `city` restreint la
+répartition aux magasins d'une région (ou à un magasin précis).
+"""
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config import settings
+from database import ANALYTICS, get_db
+from queries import register
+from models.simulation import SimulationResult, StoreImpact
+
+STORES_SQL = register("store_weights.magasins", """
+    SELECT
+        m.id,
+        m.nom,
+        COALESCE(r.nom, 'Non classé') as region,
+        COALESCE(SUM(rj.ca_ht), 0) as ca,
+        COALESCE(SUM(rj.cout), 0) as cout
+    FROM magasins m
+    LEFT JOIN regions r ON m.region_id = r.id
+    LEFT JOIN rollup_ventes_magasin_jour rj
+        ON rj.magasin_id = m.id AND rj.jour >= CURRENT_DATE - $1::int
+    WHERE m.statut = 'actif'
+    GROUP BY m.id, m.nom, r.nom
+    ORDER BY m.id
+""")
+
+CATEGORIES_SQL = register("store_weights.categories", """
+    SELECT rp.magasin_id, c.nom as categorie, SUM(rp.ca_ht) as ca
+    FROM rollup_ventes_produit_jour rp
+    JOIN produits p ON p.id = rp.produit_id
+    JOIN categories c ON c.id = p.categorie_id
+    WHERE rp.jour >= CURRENT_DATE - $1::int
+    GROUP BY rp.magasin_id, c.nom
+""")
+
+@dataclass
+class StoreWeights:
+    """Poids des magasins actifs (une ligne par magasin)"""
+    ids: np.ndarray
+    names: List[str]
+    regions: np.ndarray
+    monthly_revenue: np.ndarray     # CA HT mensuel moyen
+    margin_rate: np.ndarray         # marge / CA HT
+    categories: List[str]
+    category_revenue: np.ndarray    # magasins × catégories
+    loaded_at: float
+
+    @property
+    def category_mix(self) -> np.ndarray:
+        """Part de chaque catégorie dans le CA du magasin"""
+        totals = self.category_revenue.sum(axis=1, keepdims=True)
+        return np.divide(self.category_revenue, totals, out=np.zeros_like(self.category_revenue), where=totals > 0)
+
+_weights: Optional[StoreWeights] = None
+_lock = asyncio.Lock()
+_refresh_task: Optional[asyncio.Task] = None
+
+async def load_weights() -> StoreWeights:
+    """Lit la matrice de poids dans les cumuls"""
+    days = settings.STORE_WEIGHTS_DAYS
+    async with get_db(ANALYTICS) as conn:
+        stores = await STORES_SQL.fetch(conn, days)
+        mix = await CATEGORIES_SQL.fetch(conn, days)
+
+    ids = np.array([row['id'] for row in stores], dtype=np.int64)
+    revenue = np.array([float(row['ca']) for row in stores])
+    cost = np.array([float(row['cout']) for row in stores])
+
+    categories = sorted({row['categorie'] for row in mix})
+    row_index = {store_id: i for i, store_id in enumerate(ids.tolist())}
+    col_index = {name: j for j, name in enumerate(categories)}
+    category_revenue = np.zeros((len(ids), len(categories)))
+    for row in mix:
+        i = row_index.get(row['magasin_id'])
+        if i is not None:
+            category_revenue[i, col_index[row['categorie']]] = float(row['ca'])
+
+    return StoreWeights(
+        ids=ids,
+        names=[row['nom'] for row in stores],
+        regions=np.array([row['region'] for row in stores], dtype=object),
+        monthly_revenue=revenue * 30 / days,
+        margin_rate=np.divide(revenue - cost, revenue, out=np.zeros_like(revenue), where=revenue > 0),
+        categories=categories,
+        category_revenue=category_revenue,
+        loaded_at=time.monotonic(),
+    )
+
+def _empty_weights() -> StoreWeights:
+    """Matrice sans magasin, périmée d'emblée : rechargée au prochain appel"""
+    return StoreWeights(
+        ids=np.array([], dtype=np.int64),
+        names=[],
+        regions=np.array([], dtype=object),
+        monthly_revenue=np.zeros(0),
+        margin_rate=np.zeros(0),
+        categories=[],
+        category_revenue=np.zeros((0, 0)),
+        loaded_at=float('-inf'),
+    )
+
+async def _reload():
+    global _weights
+    try:
+        _weights = await load_weights()
+    except Exception as e:
+        print(f"⚠️ Rechargement des poids magasins impossible: {e}")
+
+async def get_weights() -> StoreWeights:
+    """Matrice en cache ; rechargée en arrière-plan quand elle est périmée"""
+    global _weights, _refresh_task
+    if _weights is None:
+        async with _lock:
+            if _weights is None:
+                await _reload()
+                if _weights is None:
+                    # Impact par magasin vide plutôt qu'une erreur sur les scénarios
+                    print("⚠️ Poids des magasins indisponibles : impact par magasin vide")
+                    _weights = _empty_weights()
+    elif time.monotonic() - _weights.loaded_at > settings.STORE_WEIGHTS_TTL_SECONDS:
+        if _refresh_task is None or _refresh_task.done():
+            _refresh_task = asyncio.create_task(_reload())
+    return _weights
+
+def _store_weights(weights: StoreWeights, parameters: Dict) -> tuple:
+    """Poids normalisés des magasins et mix catégoriel de l'impact"""
+    category = parameters.get('category')
+    mix = weights.category_mix
+    if category in weights.categories:
+        j = weights.categories.index(category)
+        raw = weights.category_revenue[:, j].copy()
+        mix = np.zeros_like(mix)
+        mix[:, j] = 1.0
+    else:
+        raw = weights.monthly_revenue.copy()
+
+    city = (parameters.get('city') or '').strip().lower()
+    if city:
+        in_scope = (np.char.lower(weights.regions.astype(str)) == city) | \
+                   (np.char.lower(np.array(weights.names, dtype=str)) == city)
+        if in_scope.any():
+            raw = np.where(in_scope, raw, 0.0)
+            if not raw.any():
+                raw = in_scope.astype(float)
+
+    if not raw.any():
+        # Aucune vente sur la période : répartition égale
+        raw = np.ones(len(raw))
+    return raw / raw.sum(), mix
+
+def allocate_store_impact(
+    weights: StoreWeights,
+    results: SimulationResult,
+    parameters: Dict,
+    period_months: int,
+) -> List[StoreImpact]:
+    """Répartit l'impact CA et marge d'une simulation entre les magasins actifs"""
+    if len(weights.ids) == 0:
+        return []
+
+    share, mix = _store_weights(weights, parameters)
+    ca_prevu = weights.monthly_revenue * period_months
+    ca_impact = results.revenue_impact * share
+    marge_prevue = ca_prevu * weights.margin_rate
+    marge_impact = results.margin_impact * share
+    details = np.round(ca_impact[:, None] * mix, 2)
+
+    ca_prevu, ca_impact, marge_prevue, marge_impact = (
+        np.round(values, 2).tolist() for values in (ca_prevu, ca_impact, marge_prevue, marge_impact)
+    )
+    regions = weights.regions.tolist()
+    categories = weights.categories
+    # Valeurs déjà typées : construction sans revalidation
+    return [
+        StoreImpact.model_construct(
+            id=str(store_id),
+            store=weights.names[i],
+            region=regions[i],
+            impact=ca_impact[i],
+            ca_prevu=ca_prevu[i],
+            ca_impact=ca_impact[i],
+            marge_prevue=marge_prevue[i],
+            marge_impact=marge_impact[i],
+            details=[
+                {'categorie': categories[j], 'ca_impact': value}
+                for j, value in enumerate(details[i].tolist()) if value
+            ]
+        )
+        for i, store_id in enumerate(weights.ids.tolist())
+    ]
+
+async def compute_store_impact(results: SimulationResult, parameters: Dict, period_months: int) -> List[StoreImpact]:
+    """Impact par magasin à partir de la matrice de poids en cache"""
+    weights = await get_weights()
+    return allocate_store_impact(weights, results, parameters, period_months)
@@ -0,0 +1,193 @@
+# ============================================
+# app/services/timeseries.py - Séries temporelles multi-granularité
+# ============================================
+"""
+CA, marge, transactions et objectif sur une période quelconque, au jour, à
+la semaine ISO, au mois, au trimestre ou à l'année.
+
+Une seule lecture des cumuls journaliers (un GROUP BY jour, au plus une
+ligne par jour de la période) :
+- magasin précis : rollup_ventes_magasin_jour, ou rollup_ventes_categorie_jour
+  avec un filtre catégorie
+- sinon : rollup_ventes_region_jour (catégorie 0 = toutes catégories)
+
+Les jours sans vente sont complétés à zéro et regroupés en périodes en une
+passe NumPy (np.add.reduceat). L'objectif vient de objectif_ca_mensuel,
+réparti uniformément sur les jours du mois, pour les magasins ouverts ce
+jour-là ; il n'existe pas par catégorie.
+"""
+from datetime import date, timedelta
+from typing import List, Optional
+
+import numpy as np
+
+from database import ANALYTICS, get_db
+from queries import register
+from models.timeseries import SeriesPoint, SeriesResponse
+
+GRANULARITES = ("jour", "semaine", "mois", "trimestre", "annee")
+
+MAGASIN_SQL = register("series.magasin", """
+    SELECT jour, SUM(ca_ht) as ca, SUM(cout) as cout, SUM(nb_transactions) as transactions
+    FROM rollup_ventes_magasin_jour
+    WHERE magasin_id = $1 AND jour BETWEEN $2 AND $3
+    GROUP BY jour
+    ORDER BY jour
+""")
+
+MAGASIN_CATEGORIE_SQL = register("series.magasin_categorie", """
+    SELECT jour, SUM(ca_ht) as ca, SUM(cout) as cout, SUM(nb_transactions) as transactions
+    FROM rollup_ventes_categorie_jour
+    WHERE magasin_id = $1 AND categorie_id = $2 AND jour BETWEEN $3 AND $4
+    GROUP BY jour
+    ORDER BY jour
+""")
+
+REGION_SQL = register("series.region", """
+    SELECT jour, SUM(ca_ht) as ca, SUM(cout) as cout, SUM(nb_transactions) as transactions
+    FROM rollup_ventes_region_jour
+    WHERE categorie_id = $3 AND jour BETWEEN $1 AND $2
+      AND ($4::int IS NULL OR region_id = $4)
+    GROUP BY jour
+    ORDER BY jour
+""")
+
+OBJECTIFS_SQL = register("series.objectifs", """
+    SELECT date_ouverture, objectif_ca_mensuel
+    FROM magasins
+    WHERE statut = 'actif'
+      AND objectif_ca_mensuel IS NOT NULL
+      AND ($1::int IS NULL OR id = $1)
+      AND ($2::int IS NULL OR region_id = $2)
+""")
+
+def _days(debut: date, fin: date) -> np.ndarray:
+    return np.arange(np.datetime64(debut, "D"), np.datetime64(fin, "D") + 1)
+
+def _bucket_keys(days: np.ndarray, granularite: str) -> np.ndarray:
+    """Clé croissante de la période de chaque jour"""
+    if granularite == "jour":
+        return days.astype(np.int64)
+    if granularite == "semaine":
+        # 1970-01-01 est un jeudi : lundi de la semaine ISO
+        ordinal = days.astype(np.int64)
+        return ordinal - (ordinal + 3) % 7
+    months = days.astype("datetime64[M]").astype(np.int64)
+    if granularite == "mois":
+        return months
+    if granularite == "trimestre":
+        return months // 3
+    return days.astype("datetime64[Y]").astype(np.int64)
+
+def _label(start: date, granularite: str) -> str:
+    if granularite == "jour":
+        return start.isoformat()
+    if granularite == "semaine":
+        year, week, _ = start.isocalendar()
+        return f"{year}-W{week:02d}"
+    if granularite == "mois":
+        return f"{start.year}-{start.month:02d}"
+    if granularite == "trimestre":
+        return f"{start.year}-T{(start.month - 1) // 3 + 1}"
+    return str(start.year)
+
+def _daily_objectives(days: np.ndarray, stores: list) -> np.ndarray:
+    """Objectif journalier : somme des objectifs mensuels des magasins ouverts / jours du mois"""
+    if not stores:
+        return np.zeros(len(days))
+    # Magasins triés par ouverture : objectif cumulé des magasins déjà ouverts
+    openings = np.array(
+        [np.datetime64(s["date_ouverture"] or date.min, "D") for s in stores]
+    )
+    order = np.argsort(openings)
+    cumulative = np.concatenate(([0.0], np.cumsum(
+        np.array([float(s["objectif_ca_mensuel"]) for s in stores])[order]
+    )))
+    opened = np.searchsorted(openings[order], days, side="right")
+
+    months = days.astype("datetime64[M]")
+    days_in_month = ((months + 1).astype("datetime64[D]") - months.astype("datetime64[D]")).astype(np.int64)
+    return cumulative[opened] / days_in_month
+
+def build_series(
+    rows: list,
+    stores: Optional[list],
+    debut: date,
+    fin: date,
+    granularite: str,
+) -> List[SeriesPoint]:
+    """Complète les jours manquants et regroupe par période (stores None = pas d'objectif)"""
+    days = _days(debut, fin)
+    ca = np.zeros(len(days))
+    cout = np.zeros(len(days))
+    transactions = np.zeros(len(days), dtype=np.int64)
+    if rows:
+        index = np.array([(row["jour"] - debut).days for row in rows])
+        ca[index] = [float(row["ca"]) for row in rows]
+        cout[index] = [float(row["cout"]) for row in rows]
+        transactions[index] = [int(row["transactions"]) for row in rows]
+
+    keys = _bucket_keys(days, granularite)
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    ends = np.append(starts[1:], len(days)) - 1
+
+    ca_sum = np.add.reduceat(ca, starts)
+    cout_sum = np.add.reduceat(cout, starts)
+    tx_sum = np.add.reduceat(transactions, starts)
+    objectives = None
+    if stores is not None:
+        objectives = np.add.reduceat(_daily_objectives(days, stores), starts)
+
+    points = []
+    for i, (start, end) in enumerate(zip(starts, ends)):
+        first = debut + timedelta(days=int(start))
+        revenue = float(ca_sum[i])
+        margin = revenue - float(cout_sum[i])
+        points.append(SeriesPoint(
+            periode=_label(first, granularite),
+            debut=first,
+            fin=debut + timedelta(days=int(end)),
+            ca=round(revenue, 2),
+            marge=round(margin, 2),
+            taux_marge=round(margin / revenue * 100, 2) if revenue else None,
+            transactions=int(tx_sum[i]),
+            objectif=None if objectives is None else round(float(objectives[i]), 2),
+        ))
+    return points
+
+def point_count(debut: date, fin: date, granularite: str) -> int:
+    """Nombre de périodes entre deux dates"""
+    keys = _bucket_keys(np.array([np.datetime64(debut, "D"), np.datetime64(fin, "D")]), granularite)
+    if granularite == "semaine":
+        return int(keys[1] - keys[0]) // 7 + 1
+    return int(keys[1] - keys[0]) + 1
+
+async def fetch_series(
+    granularite: str,
+    debut: date,
+    fin: date,
+    magasin_id: Optional[int] = None,
+    region_id: Optional[int] = None,
+    categorie_id: Optional[int] = None,
+) -> SeriesResponse:
+    """Série d'une période et d'un périmètre (magasin, région, catégorie)"""
+    if magasin_id is not None:
+        region_id = None    # le magasin précise déjà le périmètre
+    async with get_db(ANALYTICS) as conn:
+        if magasin_id is None:
+            rows = await REGION_SQL.fetch(conn, debut, fin, categorie_id or 0, region_id)
+        elif categorie_id is None:
+            rows = await MAGASIN_SQL.fetch(conn, magasin_id, debut, fin)
+        else:
+            rows = await MAGASIN_CATEGORIE_SQL.fetch(conn, magasin_id, categorie_id, debut, fin)
+
+        stores = None
+        if categorie_id is None:
+            stores = await OBJECTIFS_SQL.fetch(conn, magasin_id, region_id)
+
+    return SeriesResponse(
+        granularite=granularite,
+        date_debut=debut,
+        date_fin=fin,
+        points=build_series(rows, stores, debut, fin, granularite),
+    )
@@ -0,0 +1,78 @@
+# ============================================
+# tests/test_analysis_queue.py - File d'analyses et flux SSE
+# ============================================
+import asyncio
+import time
+
+import pytest
+
+from config import settings
+from routers.analyses import stream_analysis
+from services import analysis_queue
+
+@pytest.fixture(autouse=True)
+def reset_queue(monkeypatch):
+    analysis_queue._entries.clear()
+    yield
+    analysis_queue._entries.clear()
+
+async def _collect(response):
+    return [chunk async for chunk in response.body_iterator]
+
+def test_stream_times_out_with_error_event(monkeypatch):
+    monkeypatch.setattr(settings, "ANALYSIS_STREAM_TIMEOUT_SECONDS", 0.2)
+    monkeypatch.setattr(settings, "ANALYSIS_STREAM_HEARTBEAT_SECONDS", 0.05)
+    # Entrée jamais traitée : workers arrêtés
+    entry = analysis_queue.AnalysisEntry(id="a1", payload={})
+    analysis_queue._entries["a1"] = entry
+
+    async def run():
+        response = await stream_analysis("a1")
+        return await asyncio.wait_for(_collect(response), 2)
+
+    chunks = asyncio.run(run())
+    assert chunks[0].startswith("event: status")
+    assert ": heartbeat\n\n" in chunks
+    assert chunks[-1].startswith("event: error")
+
+def test_stream_sends_result_when_done():
+    entry = analysis_queue.AnalysisEntry(id="a2", payload={})
+    analysis_queue._entries["a2"] = entry
+
+    async def run():
+        response = await stream_analysis("a2")
+        task = asyncio.create_task(_collect(response))
+        await asyncio.sleep(0.05)
+        entry.status, entry.result = analysis_queue.DONE, {"texte": "ok"}
+        entry.completed_at = time.monotonic()
+        entry.done.set()
+        return await asyncio.wait_for(task, 2)
+
+    chunks = asyncio.run(run())
+    assert chunks[-1].startswith("event: result")
+    assert '"texte":"ok"' in chunks[-1]
+
+def test_failed_entries_kept_for_ttl():
+    entry = analysis_queue.AnalysisEntry(id="a3", payload={}, status=analysis_queue.ERROR)
+    entry.completed_at = time.monotonic() - 1
+    analysis_queue._entries["a3"] = entry
+    assert analysis_queue.get("a3") is entry
+
+    entry.completed_at = time.monotonic() - settings.ANALYSIS_TTL_SECONDS - 1
+    assert analysis_queue.get("a3") is None
+
+def test_stop_workers_fails_pending_entries(monkeypatch):
+    async def never(payload):
+        await asyncio.Event().wait()
+    monkeypatch.setattr(analysis_queue, "send_to_n8n", never)
+
+    async def run():
+        analysis_queue.start_workers()
+        entry = analysis_queue.submit({"widget": "kpis"})
+        await asyncio.sleep(0.05)
+        await analysis_queue.stop_workers()
+        return entry
+
+    entry = asyncio.run(run())
+    assert entry.status == analysis_queue.ERROR
+    assert entry.done.is_set()
@@ -0,0 +1,49 @@
+# ============================================
+# tests/test_batch_calculations.py - Parité calcul vectorisé / scalaire
+# ============================================
+import random
+
+import pytest
+
+from models.scenario import ScenarioParameters
+from services.batch_calculations import RESULT_FIELDS, records_to_columns, run_batch
+from services.calculations import PERIOD_MULTIPLIERS, calculate_simulation_results
+
+PARAMETERS = {
+    'promotion': {'discount': (0, 60), 'marketing_budget': (0, 200000), 'traffic_increase': (0, 80)},
+    'new_store': {'monthly_revenue': (0, 400000), 'investment': (0, 1000000)},
+    'cost_optimization': {'cost_reduction': (0, 30), 'implementation_cost': (0, 100000)},
+    'price_change': {'price_change': (-30, 30)},
+}
+
+def _random_record(rng, ranges):
+    record = {}
+    for name, (low, high) in ranges.items():
+        draw = rng.random()
+        if draw < 0.1:
+            record[name] = None          # absent : valeur par défaut
+        elif draw < 0.2:
+            record[name] = 0             # nul : valeur par défaut aussi
+        else:
+            record[name] = rng.uniform(low, high)
+    record['period'] = rng.choice(list(PERIOD_MULTIPLIERS) + ['inconnue', None])
+    return record
+
+@pytest.mark.parametrize("simulation_type", sorted(PARAMETERS))
+def test_batch_matches_scalar(simulation_type):
+    rng = random.Random(simulation_type)
+    records = [_random_record(rng, PARAMETERS[simulation_type]) for _ in range(200)]
+
+    batch = run_batch(simulation_type, records_to_columns(records), default_period='3_months')
+
+    for i, record in enumerate(records):
+        parameters = ScenarioParameters(**{k: v for k, v in record.items() if k != 'period'})
+        expected = calculate_simulation_results(simulation_type, parameters, record['period'] or '3_months')
+        for name in RESULT_FIELDS:
+            assert batch[name][i] == pytest.approx(getattr(expected, name), rel=1e-12, abs=1e-9), (name, record)
+
+def test_batch_without_parameters_uses_defaults():
+    batch = run_batch('promotion', {}, default_period='12_months', size=3)
+    expected = calculate_simulation_results('promotion', ScenarioParameters(), '12_months')
+    for name in RESULT_FIELDS:
+        assert batch[name] == [pytest.approx(getattr(expected, name))] * 3
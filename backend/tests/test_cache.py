@@ -0,0 +1,96 @@
+# ============================================
+# tests/test_cache.py - Cache des réponses en mémoire
+# ============================================
+import asyncio
+
+from services import cache
+from services.cache import ResponseCache
+
+def test_single_flight_coalesces_concurrent_misses():
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"ca": 42}
+
+    async def run():
+        c = ResponseCache(10_000)
+        results = await asyncio.gather(*(c.get_or_load("kpis", loader, ttl=60) for _ in range(5)))
+        return c, results
+
+    c, results = asyncio.run(run())
+    assert calls == [1]
+    assert results == [{"ca": 42}] * 5
+    assert c.stats()["misses"] == 5
+    assert c.stats()["entries"] == 1
+
+def test_stale_value_served_while_refreshing(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    values = iter([1, 2])
+
+    async def loader():
+        return next(values)
+
+    async def run():
+        c = ResponseCache(10_000)
+        assert await c.get_or_load("kpis", loader, ttl=10, swr=20) == 1
+        now[0] += 15                      # périmée mais dans la fenêtre SWR
+        assert await c.get_or_load("kpis", loader, ttl=10, swr=20) == 1
+        assert "kpis" in c._inflight
+        await c._inflight["kpis"]
+        await asyncio.sleep(0)
+        assert await c.get_or_load("kpis", loader, ttl=10, swr=20) == 2
+        return c
+
+    c = asyncio.run(run())
+    assert c.stats()["stale_hits"] == 1
+    assert c.stats()["hits"] == 1
+
+def test_tag_invalidation_during_load_discards_result():
+    release = None
+
+    async def loader():
+        await release.wait()
+        return "avant écriture"
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        c = ResponseCache(10_000)
+        first = asyncio.ensure_future(c.get_or_load("scenarios", loader, ttl=60, tags=("scenarios",)))
+        await asyncio.sleep(0)
+        c.invalidate("scenarios")
+        # Le chargement lancé avant l'écriture n'est plus partagé
+        assert "scenarios" not in c._inflight
+        release.set()
+        assert await first == "avant écriture"
+        await asyncio.sleep(0)
+        return c
+
+    c = asyncio.run(run())
+    assert c.stats()["entries"] == 0
+
+def test_global_invalidation_during_load_with_unseen_tag():
+    release = None
+
+    async def loader():
+        await release.wait()
+        return "avant écriture"
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        c = ResponseCache(10_000)
+        # Tag jamais invalidé jusque-là : absent des versions de tags
+        first = asyncio.ensure_future(c.get_or_load("ventes", loader, ttl=60, tags=("ventes",)))
+        await asyncio.sleep(0)
+        c.invalidate()
+        release.set()
+        await first
+        await asyncio.sleep(0)
+        return c
+
+    c = asyncio.run(run())
+    assert c.stats()["entries"] == 0
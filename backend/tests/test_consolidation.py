@@ -0,0 +1,66 @@
+# ============================================
+# tests/test_consolidation.py - Consolidation plate et hiérarchique
+# ============================================
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from services import consolidation
+
+def _node_row(niveau, path, nom, ca, marge, magasins=1):
+    ids = list(path) + [None] * (4 - len(path))
+    return {
+        'niveau': niveau, 'groupe_id': ids[0], 'enseigne_id': ids[1], 'region_id': ids[2],
+        'magasin_id': ids[3], 'nom': nom, 'ca': ca, 'marge': marge, 'transactions': 10,
+        'objectif_mensuel': 30000, 'magasins': magasins,
+    }
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def fetch(self, sql, *args):
+        return self.rows
+
+@pytest.fixture
+def connection(monkeypatch):
+    def install(rows):
+        @asynccontextmanager
+        async def get_db(*args):
+            yield FakeConnection(rows)
+
+        monkeypatch.setattr(consolidation, "get_db", get_db)
+    return install
+
+def test_store_margin_matches_flat_consolidation(connection):
+    flat_row = {
+        'id': 45, 'nom': 'Paris Nord', 'code': 'PN', 'region': 'Île-de-France', 'ca': 40,
+        'objectif': 30, 'marge': Decimal('31.2'), 'taux_stock': 95, 'transactions': 10, 'clients': 8,
+    }
+    connection([flat_row])
+    flat = asyncio.run(consolidation.fetch_consolidation(date(2024, 5, 1), date(2024, 5, 30)))
+
+    connection([_node_row(4, (1, 2, 3, 45), 'Paris Nord', 40000, Decimal('31.2'))])
+    hierarchy = asyncio.run(consolidation.fetch_hierarchy(
+        date(2024, 5, 1), date(2024, 5, 30), noeud="g1/e2/r3/m45", profondeur=0
+    ))
+    assert hierarchy.noeud.marge == flat[0].marge == "31.2"
+
+def test_hierarchy_nests_children_with_their_margin(connection):
+    connection([
+        _node_row(0, (), 'Total', 90000, Decimal('28.4'), magasins=2),
+        _node_row(1, (1,), 'Groupe A', 60000, Decimal('30.0')),
+        _node_row(1, (0,), 'Sans groupe', 30000, None),
+    ])
+    hierarchy = asyncio.run(consolidation.fetch_hierarchy(date(2024, 5, 1), date(2024, 5, 30)))
+
+    root = hierarchy.noeud
+    assert (root.id, root.marge, root.objectif) == ("", "28.4", 30)
+    assert [(n.id, n.marge, n.a_enfants) for n in root.enfants] == [
+        ("g1", "30.0", True),
+        # Aucune ligne vendue : même taux par défaut que la vue plate
+        ("g0", consolidation.format_marge(None), True),
+    ]
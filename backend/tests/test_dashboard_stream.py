@@ -0,0 +1,120 @@
+# ============================================
+# tests/test_dashboard_stream.py - Flux dashboard (JSON Patch, abonnés)
+# ============================================
+import asyncio
+import copy
+import json
+
+import pytest
+
+from routers import dashboard
+from services import dashboard_stream
+from services.dashboard_stream import DashboardHub, Subscriber, json_diff
+
+def _unescape(token):
+    return token.replace("~1", "/").replace("~0", "~")
+
+def apply_patch(document, ops):
+    """Application minimale de JSON Patch (add, remove, replace)"""
+    document = copy.deepcopy(document)
+    for op in ops:
+        tokens = [_unescape(t) for t in op["path"].split("/")[1:]]
+        if not tokens:
+            document = op["value"]
+            continue
+        parent = document
+        for token in tokens[:-1]:
+            parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+        last = int(tokens[-1]) if isinstance(parent, list) else tokens[-1]
+        if op["op"] == "remove":
+            del parent[last]
+        elif op["op"] == "add" and isinstance(parent, list):
+            parent.insert(last, op["value"])
+        else:
+            parent[last] = op["value"]
+    return document
+
+@pytest.mark.parametrize("old, new", [
+    ({"ca": 1, "marge": 2}, {"ca": 3, "marge": 2}),
+    ({"a/b": 1, "c~d": [1, 2]}, {"c~d": [1], "e": None}),
+    ([{"id": 1}, {"id": 2}, {"id": 3}], [{"id": 1, "ca": 5}]),
+    ([1], [1, 2, 3]),
+    ({"top": [{"nom": "A", "ca": 1}]}, {"top": [{"nom": "B", "ca": 1}, {"nom": "C", "ca": 2}]}),
+    ({"ca": 1}, [1, 2]),
+    ({"ca": 1}, {"ca": 1}),
+])
+def test_json_diff_round_trip(old, new):
+    ops = json_diff(old, new)
+    assert apply_patch(old, ops) == new
+    assert (ops == []) == (old == new)
+
+def test_overflow_switches_subscriber_to_resync(monkeypatch):
+    monkeypatch.setattr(dashboard_stream.settings, "DASHBOARD_STREAM_BUFFER_BYTES", 100)
+    subscriber = Subscriber(["kpis"])
+    subscriber.push("ventes", "x" * 10)          # widget non suivi
+    subscriber.push("kpis", "x" * 60)
+    assert subscriber.size == 60 and not subscriber.resync
+    subscriber.push("kpis", "x" * 60)
+    assert subscriber.resync and subscriber.size == 0 and not subscriber.messages
+    subscriber.push("kpis", "x" * 10)
+    assert not subscriber.messages
+
+def _hub(results):
+    hub = DashboardHub()
+
+    async def run_widget(name):
+        return results[name]
+
+    hub.configure({name: None for name in results}, run_widget, {})
+    return hub
+
+def _event(message):
+    lines = message.strip().split("\n")
+    return lines[0].removeprefix("event: "), json.loads(lines[1].removeprefix("data: "))
+
+def test_stream_sends_snapshot_then_patch_or_resync():
+    magasins = [{"nom": f"Magasin {i}", "ca": i} for i in range(20)]
+    results = {"kpis": {"ca": 1, "magasins": magasins}}
+    hub = _hub(results)
+
+    async def run():
+        subscriber = await hub.subscribe(["kpis"])
+        stream = hub.stream(subscriber)
+        await anext(stream)                       # retry
+        snapshot = _event(await anext(stream))
+
+        results["kpis"] = {"ca": 5, "magasins": magasins}
+        await hub._compute(["kpis"])
+        patch = _event(await anext(stream))
+
+        subscriber.resync = True
+        subscriber.ready.set()
+        resync = _event(await anext(stream))
+        await stream.aclose()
+        return snapshot, patch, resync
+
+    snapshot, patch, resync = asyncio.run(run())
+    assert snapshot[0] == "snapshot" and snapshot[1]["kpis"]["version"] == 1
+    # Patch plus court que le résultat complet : envoyé à sa place
+    assert patch == ("patch", {"widget": "kpis", "version": 2, "ops": [{"op": "replace", "path": "/ca", "value": 5}]})
+    assert resync[0] == "snapshot"
+    assert resync[1]["kpis"]["version"] == 2 and resync[1]["kpis"]["result"]["ca"] == 5
+
+def test_endpoint_subscribes_only_once_streaming(monkeypatch):
+    hub = _hub({"kpis": {"ca": 1}})
+    monkeypatch.setattr(dashboard, "hub", hub)
+
+    async def run():
+        response = await dashboard.stream_dashboard(widgets=["kpis"])
+        # Client parti avant le premier message : aucun abonné créé
+        assert hub.subscribers == set()
+        await response.body_iterator.aclose()
+        assert hub.subscribers == set()
+
+        response = await dashboard.stream_dashboard(widgets=["kpis"])
+        await anext(response.body_iterator)
+        assert len(hub.subscribers) == 1
+        await response.body_iterator.aclose()
+        assert hub.subscribers == set()
+
+    asyncio.run(run())
@@ -0,0 +1,118 @@
+# ============================================
+# tests/test_exports.py - Exports en flux
+# ============================================
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from decimal import Decimal
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from routers import exports as exports_router
+from services import exports
+from services.consolidation import CONSOLIDATION_SQL
+
+class FakeConnection:
+    def __init__(self, column_exists):
+        self.column_exists = column_exists
+        self.checks = 0
+
+    async def fetchval(self, sql, *args):
+        self.checks += 1
+        return self.column_exists
+
+@pytest.fixture
+def connection(monkeypatch):
+    def install(column_exists):
+        conn = FakeConnection(column_exists)
+
+        @asynccontextmanager
+        async def get_db(*args):
+            yield conn
+
+        monkeypatch.setattr(exports, "get_db", get_db)
+        monkeypatch.setattr(exports, "_reference_column", False)
+        return conn
+    return install
+
+def test_sales_export_without_ingestion_schema(connection):
+    conn = connection(False)
+    sql = asyncio.run(exports.sales_export_sql())
+    assert "NULL::text AS reference_externe" in sql
+    assert "v.reference_externe" not in sql
+    # Recherchée de nouveau tant que la colonne est absente
+    asyncio.run(exports.sales_export_sql())
+    assert conn.checks == 2
+
+def test_sales_export_with_ingestion_schema(connection):
+    conn = connection(True)
+    sql = asyncio.run(exports.sales_export_sql())
+    assert "v.reference_externe AS reference_externe" in sql
+    asyncio.run(exports.sales_export_sql())
+    assert conn.checks == 1
+
+class Attribute:
+    def __init__(self, name, type_name):
+        self.name = name
+        self.type = type("Type", (), {"name": type_name})
+
+class Statement:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def get_attributes(self):
+        return [Attribute("magasin", "text"), Attribute("ca", "numeric")]
+
+    async def cursor(self, *args, prefetch):
+        for row in self.rows:
+            yield row
+
+class StreamConnection:
+    def __init__(self, rows):
+        self.rows = rows
+        self.prepared = []
+
+    @asynccontextmanager
+    async def transaction(self, readonly=False):
+        assert readonly
+        yield
+
+    async def prepare(self, query):
+        assert isinstance(query, str)
+        self.prepared.append(query)
+        return Statement(self.rows)
+
+@pytest.fixture
+def export_client(monkeypatch):
+    conn = StreamConnection([("Paris Nord", Decimal("1200.50")), ("Lyon Centre", Decimal("80")), ("Lille", None)])
+
+    @asynccontextmanager
+    async def get_db(*args):
+        yield conn
+
+    monkeypatch.setattr(exports, "get_db", get_db)
+    monkeypatch.setattr(exports.settings, "EXPORT_BATCH_ROWS", 2)
+    app = FastAPI()
+    app.include_router(exports_router.router, prefix="/api")
+    return TestClient(app), conn
+
+def test_consolidation_export_csv(export_client):
+    client, conn = export_client
+    response = client.get("/api/exports/consolidation?format=csv&date_debut=2024-05-01&date_fin=2024-05-30")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert 'consolidation_2024-05-01_2024-05-30.csv' in response.headers["content-disposition"]
+    assert response.text.splitlines() == ["magasin,ca", "Paris Nord,1200.50", "Lyon Centre,80", "Lille,"]
+    assert conn.prepared == [CONSOLIDATION_SQL.sql]
+
+def test_consolidation_export_ndjson(export_client):
+    client, _ = export_client
+    response = client.get("/api/exports/consolidation?format=ndjson")
+    assert response.status_code == 200
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        {"magasin": "Paris Nord", "ca": 1200.5},
+        {"magasin": "Lyon Centre", "ca": 80.0},
+        {"magasin": "Lille", "ca": None},
+    ]
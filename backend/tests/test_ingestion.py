@@ -0,0 +1,68 @@
+# ============================================
+# tests/test_ingestion.py - Lecture des lignes d'import de ventes
+# ============================================
+import asyncio
+import json
+from datetime import datetime
+
+from services.ingestion import SalesImport, iter_lines
+
+HEADER = "reference,magasin_id,client_id,date_vente,produit_id,quantite,prix_unitaire_ht"
+
+def _lines(*chunks):
+    async def stream():
+        for chunk in chunks:
+            yield chunk
+
+    async def collect():
+        return [line async for line in iter_lines(stream())]
+
+    return asyncio.run(collect())
+
+def test_iter_lines_across_chunks():
+    lines = _lines(b"a,b\r\nc", b",d\n", "é,f".encode("utf-8"))
+    assert lines == [(1, "a,b"), (2, "c,d"), (3, "é,f")]
+
+def test_csv_rows_group_lines_by_sale():
+    state = SalesImport(conn=None, format="csv")
+    state.add_csv(1, HEADER)
+    state.add_csv(2, "T-1,3,,2024-05-02T10:00:00,11,2,10.0")
+    state.add_csv(3, "T-1,3,,2024-05-02T10:00:00,12,1,5.5")
+
+    assert state.ventes == [(2, "T-1", 3, None, datetime(2024, 5, 2, 10), "validee")]
+    # Montants calculés à partir de la quantité et du prix, TVA à 20 %
+    assert state.lignes[0] == ("T-1", 11, 2, 10.0, 20.0, 24.0)
+    assert state.lignes[1][4] == 5.5
+    assert state.rejets_total == 0
+
+def test_csv_invalid_row_rejects_its_whole_sale():
+    state = SalesImport(conn=None, format="csv")
+    state.add_csv(1, HEADER)
+    state.add_csv(2, "T-1,3,,2024-05-02T10:00:00,11,2,10.0")
+    state.add_csv(3, "T-1,3,,2024-05-02T10:00:00,12,0,5.5")
+    state.add_csv(4, "T-2,3,,2024-05-02")
+
+    assert [(r.ligne, r.reference) for r in state.rejets] == [(3, "T-1"), (4, None)]
+    assert "quantite" in state.rejets[0].erreur
+    assert state.rejets[1].erreur == "4 colonnes au lieu de 7"
+    assert state.references_rejetees == {"T-1"}
+
+def test_ndjson_rejects_invalid_json_schema_and_duplicates():
+    vente = {
+        "reference": "C-9", "magasin_id": 1, "date_vente": "2024-05-02T10:00:00+00:00",
+        "lignes": [{"produit_id": 4, "quantite": 1, "prix_unitaire_ht": 8, "montant_total_ttc": 9.9}],
+    }
+    state = SalesImport(conn=None, format="ndjson")
+    state.add_ndjson(1, json.dumps(vente))
+    state.add_ndjson(2, "{pas du json")
+    state.add_ndjson(3, json.dumps({**vente, "reference": "C-10", "lignes": []}))
+    state.add_ndjson(4, json.dumps(vente))
+
+    assert len(state.ventes) == 1
+    # Horodatage avec fuseau ramené en heure locale sans fuseau
+    assert state.ventes[0][4].tzinfo is None
+    assert state.lignes == [("C-9", 4, 1, 8.0, 8.0, 9.9)]
+    assert [(r.ligne, r.reference) for r in state.rejets] == [(2, None), (3, "C-10"), (4, "C-9")]
+    assert state.rejets[0].erreur.startswith("JSON invalide")
+    assert state.rejets[1].erreur.startswith("lignes")
+    assert state.rejets[2].erreur == "référence en double dans le lot"
@@ -0,0 +1,46 @@
+# ============================================
+# tests/test_monte_carlo.py - Validation des lois Monte Carlo
+# ============================================
+import pytest
+
+from models.simulation import MonteCarloResult
+from services.monte_carlo import run_monte_carlo_sync
+
+def _run(simulation_type, parameters, distributions, draws=2000):
+    config = {'draws': draws, 'seed': 7, 'distributions': distributions}
+    return run_monte_carlo_sync(simulation_type, parameters, '3_months', config)
+
+@pytest.mark.parametrize("simulation_type, distributions, message", [
+    # price_change = -10 par défaut : une lognormale centrée dessus est invalide
+    ('price_change', {'price_change': {'kind': 'lognormal'}}, "lognormale"),
+    ('promotion', {'traffic_increase': {'kind': 'lognormal', 'mean': 0}}, "lognormale"),
+    ('promotion', {'traffic_increase': {'kind': 'uniform', 'low': 30, 'high': 30}}, "low < high"),
+    ('promotion', {'traffic_increase': {'kind': 'uniform', 'low': 40, 'high': 10}}, "low < high"),
+    ('promotion', {'traffic_increase': {'kind': 'triangular', 'low': 10, 'high': 40, 'mode': 50}}, "mode"),
+    ('promotion', {'traffic_increase': {'kind': 'normal', 'std': -1}}, "Écart-type"),
+    ('promotion', {'traffic_increase': {'kind': 'cauchy'}}, "inconnue"),
+    ('promotion', {'inconnu': {}}, "inconnue"),
+])
+def test_invalid_distributions_are_rejected(simulation_type, distributions, message):
+    with pytest.raises(ValueError, match=message):
+        _run(simulation_type, {}, distributions)
+
+def test_triangular_default_mode_is_clamped_into_bounds():
+    output = _run('promotion', {'traffic_increase': 25},
+                  {'traffic_increase': {'kind': 'triangular', 'low': 30, 'high': 60}})
+    assert output['draws'] == 2000
+    assert output['revenue_impact']['p10'] <= output['revenue_impact']['p50'] <= output['revenue_impact']['p90']
+
+def test_results_are_reproducible_with_a_seed():
+    first = _run('new_store', {'monthly_revenue': 150000, 'investment': 300000}, {})
+    second = _run('new_store', {'monthly_revenue': 150000, 'investment': 300000}, {})
+    assert first == second
+    assert 0 <= first['probability_positive_net_gain'] <= 1
+
+def test_net_gain_probability_accepts_the_former_name():
+    bands = {'p10': 0.0, 'p50': 1.0, 'p90': 2.0}
+    stored = {'draws': 100, 'probability_positive_roi': 0.8,
+              'revenue_impact': bands, 'margin_impact': bands, 'cost_impact': bands, 'roi': bands}
+    result = MonteCarloResult.model_validate(stored)
+    assert result.probability_positive_net_gain == 0.8
+    assert 'probability_positive_net_gain' in result.model_dump()
@@ -0,0 +1,107 @@
+# ============================================
+# tests/test_n8n_webhook.py - Client n8n et disjoncteur, contre un serveur local
+# ============================================
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from services import n8n_webhook
+from services.n8n_webhook import CircuitBreaker
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        stub = self.server
+        stub.calls += 1
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if stub.delay:
+            time.sleep(stub.delay)
+        payload = json.dumps({"recu": json.loads(body)}).encode()
+        self.send_response(stub.status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.calls, server.status, server.delay = 0, 200, 0
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/webhook"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def breaker(monkeypatch):
+    breaker = CircuitBreaker(threshold=2, cooldown=0.2)
+    monkeypatch.setattr(n8n_webhook, "breaker", breaker)
+    return breaker
+
+def _run(coro):
+    async def main():
+        try:
+            return await coro
+        finally:
+            await n8n_webhook.close_client()
+    return asyncio.run(main())
+
+def test_success(stub, breaker):
+    result = _run(n8n_webhook.send_to_n8n({"ca": 100}, stub.url))
+    assert result == {"recu": {"ca": 100}}
+    assert breaker.state == "closed"
+
+def test_opens_after_threshold_then_short_circuits(stub, breaker):
+    stub.status = 500
+
+    async def calls():
+        return [await n8n_webhook.send_to_n8n({}, stub.url) for _ in range(4)]
+
+    results = _run(calls())
+    assert results[0] == results[1] == {"error": "Impossible d'appeler n8n"}
+    assert results[2] == results[3] == {"error": "n8n indisponible (circuit ouvert)"}
+    assert stub.calls == 2
+    assert breaker.state == "open"
+
+def test_half_open_trial_closes_circuit(stub, breaker):
+    stub.status = 500
+    _run(n8n_webhook.send_to_n8n({}, stub.url))
+    _run(n8n_webhook.send_to_n8n({}, stub.url))
+    assert breaker.state == "open"
+
+    time.sleep(breaker.cooldown)
+    stub.status = 200
+    assert _run(n8n_webhook.send_to_n8n({"ca": 1}, stub.url)) == {"recu": {"ca": 1}}
+    assert breaker.state == "closed"
+    assert stub.calls == 3
+
+def test_cancelled_trial_releases_half_open(stub, breaker):
+    stub.status = 500
+    _run(n8n_webhook.send_to_n8n({}, stub.url))
+    _run(n8n_webhook.send_to_n8n({}, stub.url))
+    time.sleep(breaker.cooldown)
+
+    # Essai demi-ouvert annulé pendant l'appel (timeout d'un widget par exemple)
+    stub.status, stub.delay = 200, 0.5
+
+    async def cancelled_trial():
+        task = asyncio.create_task(n8n_webhook.send_to_n8n({}, stub.url))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    _run(cancelled_trial())
+    assert breaker.state == "half-open"
+
+    stub.delay = 0
+    assert _run(n8n_webhook.send_to_n8n({"ca": 2}, stub.url)) == {"recu": {"ca": 2}}
+    assert breaker.state == "closed"
@@ -0,0 +1,80 @@
+# ============================================
+# tests/test_rollups.py - Rafraîchissement incrémental des cumuls
+# ============================================
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from services import rollups
+
+class FakeConnection:
+    def __init__(self, nb_jours):
+        self.nb_jours = nb_jours
+        self.executed = []
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+    async def execute(self, sql, *args):
+        self.executed.append((" ".join(sql.split()), args))
+
+    async def fetchval(self, sql, *args):
+        return self.nb_jours
+
+@pytest.fixture
+def connection(monkeypatch):
+    def install(nb_jours):
+        conn = FakeConnection(nb_jours)
+
+        @asynccontextmanager
+        async def get_db(*args):
+            yield conn
+
+        monkeypatch.setattr(rollups, "get_db", get_db)
+        return conn
+    return install
+
+def test_refresh_without_marked_days_does_nothing(connection):
+    conn = connection(0)
+    assert asyncio.run(rollups.refresh_rollups()) == 0
+    assert not any(sql.startswith("DELETE FROM rollup_ventes") for sql, _ in conn.executed)
+    assert not any("pg_notify" in sql for sql, _ in conn.executed)
+
+def test_refresh_recomputes_marked_days_and_notifies(connection):
+    conn = connection(4)
+    assert asyncio.run(rollups.refresh_rollups()) == 4
+    statements = [sql for sql, _ in conn.executed]
+    for table in ("rollup_ventes_magasin_jour", "rollup_ventes_produit_jour",
+                  "rollup_ventes_categorie_jour", "rollup_ventes_region_jour"):
+        assert any(sql.startswith(f"DELETE FROM {table}") for sql in statements)
+        assert any(sql.startswith(f"INSERT INTO {table}") for sql in statements)
+    # Notification en dernier, dans la transaction du rafraîchissement
+    assert "pg_notify" in statements[-1]
+    assert conn.executed[-1][1] == ("ventes",)
+
+def test_refresh_loop_invalidates_and_survives_errors(monkeypatch):
+    results = iter([3, 0, RuntimeError("base indisponible"), 2])
+    invalidated, sleeps = [], []
+
+    async def refresh():
+        result = next(results)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def sleep(delay):
+        sleeps.append(delay)
+        if len(sleeps) == 4:
+            raise asyncio.CancelledError
+
+    monkeypatch.setattr(rollups, "refresh_rollups", refresh)
+    monkeypatch.setattr(rollups, "invalidate", lambda *tags: invalidated.append(tags))
+    monkeypatch.setattr(asyncio, "sleep", sleep)
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(rollups._refresh_loop(60))
+    # Cache invalidé seulement quand des jours ont été recalculés
+    assert invalidated == [("ventes",), ("ventes",)]
+    assert sleeps == [60, 60, 60, 60]
@@ -0,0 +1,47 @@
+# ============================================
+# tests/test_scenario_etag.py - ETag / 304 du détail d'un scénario
+# ============================================
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from models.scenario import ScenarioDetail
+from routers import scenarios
+
+DETAIL = ScenarioDetail(
+    id="SCN-1", name="Promo été", description=None, scenario_type="what_if",
+    simulation_type="promotion", period="3_months", parameters={}, revenue_impact=1.0,
+    cost_impact=0.0, margin_impact=1.0, probability=50.0, status="draft",
+    created_at=1714640000000, created_by="system", version=3,
+)
+
+@pytest.fixture
+def client(monkeypatch):
+    async def load_scenario(scenario_id):
+        return DETAIL if scenario_id == DETAIL.id else None
+
+    monkeypatch.setattr(scenarios, "load_scenario", load_scenario)
+    app = FastAPI()
+    app.include_router(scenarios.router, prefix="/api")
+    return TestClient(app)
+
+def test_detail_carries_the_version_etag(client):
+    response = client.get("/api/scenarios/SCN-1")
+    assert response.status_code == 200
+    assert response.headers["etag"] == '"SCN-1-3"'
+    assert response.json()["version"] == 3
+
+@pytest.mark.parametrize("if_none_match", ['"SCN-1-3"', 'W/"SCN-1-3"', '"SCN-1-2", "SCN-1-3"', '*'])
+def test_matching_etag_returns_304(client, if_none_match):
+    response = client.get("/api/scenarios/SCN-1", headers={"If-None-Match": if_none_match})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == '"SCN-1-3"'
+
+def test_stale_etag_returns_the_detail(client):
+    response = client.get("/api/scenarios/SCN-1", headers={"If-None-Match": '"SCN-1-2"'})
+    assert response.status_code == 200
+    assert response.json()["id"] == "SCN-1"
+
+def test_unknown_scenario_is_404(client):
+    assert client.get("/api/scenarios/SCN-9", headers={"If-None-Match": "*"}).status_code == 404
@@ -0,0 +1,77 @@
+# ============================================
+# tests/test_scenarios.py - Pagination des scénarios
+# ============================================
+import asyncio
+import base64
+from contextlib import asynccontextmanager
+
+import pytest
+
+from services import scenarios
+from services.scenarios import decode_cursor, encode_cursor
+
+def _row(created_at, scenario_id):
+    return {
+        'id': scenario_id, 'name': f"Scénario {scenario_id}", 'description': None,
+        'scenario_type': 'what_if', 'simulation_type': 'promotion', 'period': '3_months',
+        'revenue_impact': 1, 'cost_impact': 0, 'margin_impact': 1, 'probability': 50,
+        'status': 'draft', 'created_at': created_at, 'created_by': 'system',
+    }
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    async def fetch(self, sql, *args):
+        self.calls.append((sql, args))
+        return self.rows[:args[-1]]
+
+@pytest.fixture
+def connection(monkeypatch):
+    def install(rows):
+        conn = FakeConnection(rows)
+
+        @asynccontextmanager
+        async def get_db(*args):
+            yield conn
+
+        monkeypatch.setattr(scenarios, "get_db", get_db)
+        return conn
+    return install
+
+def test_cursor_round_trip():
+    # L'identifiant peut lui-même contenir ':'
+    cursor = encode_cursor(1714640000000, "SCN:042")
+    assert decode_cursor(cursor) == (1714640000000, "SCN:042")
+    assert "/" not in cursor and "+" not in cursor
+
+@pytest.mark.parametrize("cursor", [
+    "pas-du-base64!",
+    base64.urlsafe_b64encode(b"sans-separateur").decode(),
+    base64.urlsafe_b64encode(b"abc:SCN-1").decode(),
+    base64.urlsafe_b64encode(b"\xff\xfe:SCN-1").decode(),
+])
+def test_invalid_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+def test_pages_resume_after_the_last_row(connection):
+    conn = connection([_row(300, "C"), _row(200, "B"), _row(100, "A")])
+
+    page = asyncio.run(scenarios.list_scenarios(limit=2, status="draft"))
+    assert [item.id for item in page.items] == ["C", "B"]
+    assert decode_cursor(page.next_cursor) == (200, "B")
+
+    sql, args = conn.calls[0]
+    assert "status = $1" in sql and "LIMIT $2" in sql
+    assert args == ("draft", 3)
+
+    conn.rows = [_row(100, "A")]
+    page = asyncio.run(scenarios.list_scenarios(limit=2, cursor=page.next_cursor, status="draft"))
+    assert [item.id for item in page.items] == ["A"]
+    assert page.next_cursor is None
+
+    sql, args = conn.calls[1]
+    assert "(created_at, id) < ($2, $3)" in sql and "LIMIT $4" in sql
+    assert args == ("draft", 200, "B", 3)
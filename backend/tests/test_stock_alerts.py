@@ -0,0 +1,34 @@
+# ============================================
+# tests/test_stock_alerts.py - Alertes de stock en mémoire
+# ============================================
+from services.stock_alerts import AlertSet
+
+def _alert(magasin_id, produit_id, disponible, niveau="attention"):
+    return {"magasin_id": magasin_id, "produit_id": produit_id,
+            "disponible": disponible, "niveau_alerte": niveau}
+
+def test_top_orders_critical_first():
+    alerts = AlertSet()
+    alerts.apply([_alert(1, 10, 2), _alert(1, 11, 5, "critique"), _alert(2, 10, 0)], None)
+
+    assert [(a["magasin_id"], a["produit_id"]) for a in alerts.top()] == [(1, 11), (2, 10), (1, 10)]
+    assert [a["produit_id"] for a in alerts.top(1, limit=1)] == [11]
+
+def test_unknown_store_is_not_cached():
+    alerts = AlertSet()
+    alerts.apply([_alert(1, 10, 2)], None)
+
+    for magasin_id in range(1000, 1100):
+        assert alerts.top(magasin_id) == []
+    alerts.top(1)
+    assert set(alerts._sorted) == {1}
+
+def test_changes_invalidate_sorted_lists():
+    alerts = AlertSet()
+    alerts.apply([_alert(1, 10, 2)], None)
+    assert len(alerts.top(1)) == 1
+
+    changes = alerts.apply([], {(1, 10)})
+    assert [kind for kind, _ in changes] == ["fin"]
+    assert alerts.top(1) == []
+    assert alerts.top() == []
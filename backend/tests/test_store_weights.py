@@ -0,0 +1,66 @@
+# ============================================
+# tests/test_store_weights.py - Répartition des impacts par magasin
+# ============================================
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from models.simulation import SimulationResult
+from services import store_weights
+
+RESULTS = SimulationResult(
+    revenue_impact=1000.0, margin_impact=300.0, cost_impact=0.0,
+    revenue_percent=0.0, margin_percent=0.0, cost_percent=0.0, roi=0.0,
+    optimistic_revenue=0.0, optimistic_margin=0.0, realistic_revenue=0.0,
+    realistic_margin=0.0, pessimistic_revenue=0.0, pessimistic_margin=0.0,
+)
+
+def _weights():
+    return store_weights.StoreWeights(
+        ids=np.array([1, 2], dtype=np.int64),
+        names=["Paris Nord", "Lyon Centre"],
+        regions=np.array(["Île-de-France", "Rhône"], dtype=object),
+        monthly_revenue=np.array([300.0, 100.0]),
+        margin_rate=np.array([0.3, 0.4]),
+        categories=["Épicerie"],
+        category_revenue=np.array([[300.0], [100.0]]),
+        loaded_at=time.monotonic(),
+    )
+
+@pytest.fixture
+def loader(monkeypatch):
+    outcomes = []
+
+    async def load_weights():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(store_weights, "load_weights", load_weights)
+    monkeypatch.setattr(store_weights, "_weights", None)
+    monkeypatch.setattr(store_weights, "_refresh_task", None)
+    monkeypatch.setattr(store_weights, "_lock", asyncio.Lock())
+    return outcomes
+
+def test_failed_first_load_gives_an_empty_allocation(loader):
+    loader.extend([ConnectionError("base indisponible"), _weights()])
+
+    async def run():
+        impact = await store_weights.compute_store_impact(RESULTS, {}, 3)
+        # Matrice vide périmée : rechargée en arrière-plan au prochain appel
+        await store_weights.get_weights()
+        await store_weights._refresh_task
+        return impact, await store_weights.compute_store_impact(RESULTS, {}, 3)
+
+    first, second = asyncio.run(run())
+    assert first == []
+    assert [(s.id, s.ca_impact) for s in second] == [("1", 750.0), ("2", 250.0)]
+
+def test_allocation_restricted_to_a_region():
+    impact = store_weights.allocate_store_impact(_weights(), RESULTS, {'city': 'rhône'}, 3)
+    assert [(s.id, s.ca_impact, s.marge_impact) for s in impact] == [("1", 0.0, 0.0), ("2", 1000.0, 300.0)]
+    assert impact[1].ca_prevu == 300.0
+    assert impact[1].marge_prevue == 120.0
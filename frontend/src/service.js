@@ -127,6 +127,22 @@ export async function fetchDashboard() {
  */
 export const fetchDashboardData = fetchDashboard;
 
+/**
+ * Récupère plusieurs widgets du dashboard en un seul appel
+ * @param {Array<string>} widgets - Noms des widgets (tous si vide)
+ * @returns {Promise<Object>} { nom: { status, data, error, duration_ms } }
+ */
+export async function fetchDashboardWidgets(widgets = []) {
+  try {
+    const query = widgets.length ? `?widgets=${widgets.join(',')}` : '';
+    const response = await fetchAPI(`/dashboard${query}`);
+    return response.widgets;
+  } catch (error) {
+    console.error("Erreur fetchDashboardWidgets:", error);
+    return {};
+  }
+}
+
 // =============================================
 // PERFORMANCE PAR MAGASIN
 // =============================================
@@ -287,15 +303,35 @@ export async function fetchClientsActifs() {
 // SCÉNARIOS WHAT-IF
 // =============================================
 /**
- * Récupérer tous les scénarios
+ * Récupérer une page de scénarios
+ * @param {Object} filters - status, scenario_type, simulation_type, created_by, search, limit
+ * @param {string} cursor - next_cursor de la page précédente (optionnel)
+ * @returns {Promise<Object>} { items, next_cursor }
+ */
+export const getScenariosPageService = async (filters = {}, cursor = null) => {
+  const params = new URLSearchParams(
+    Object.entries(filters).filter(([, value]) => value !== null && value !== undefined && value !== '')
+  );
+  if (cursor) params.set('cursor', cursor);
+  const query = params.toString();
+  return fetchAPI(`/scenarios${query ? `?${query}` : ''}`);
+};
+
+/**
+ * Récupérer tous les scénarios (parcourt toutes les pages)
  * @param {string} status - Filtrer par statut (optionnel): 'draft', 'active', 'archived'
  * @returns {Promise<Array>} Liste des scénarios
  */
 export const getScenariosService = async (status = null) => {
   try {
-    return status 
-    ? fetchAPI(`/scenarios?status=${status}`)
-    : fetchAPI('/scenarios');
+    const scenarios = [];
+    let cursor = null;
+    do {
+      const page = await getScenariosPageService({ status, limit: 200 }, cursor);
+      scenarios.push(...page.items);
+      cursor = page.next_cursor;
+    } while (cursor);
+    return scenarios;
 
   } catch (error) {
     console.error('Erreur lors de la récupération des scénarios:', error);
@@ -708,6 +744,7 @@ export default {
   // Scénarios
   // CRUD de base
   getScenarios: getScenariosService,
+  getScenariosPage: getScenariosPageService,
   getScenarioById: getScenarioByIdService,
   createScenario: createScenarioService,
   updateScenario: updateScenarioService,